@@ -13,6 +13,8 @@ import numpy as np
 import os
 import importlib.util
 from utils.ui import mobile_container, mobile_spacer, mobile_header
+from utils.coin_utils import get_query_engine
+from utils.clustering import panel_version
 
 # --- Inject PWA manifest and meta tags for mobile/PWA support ---
 st.markdown("""
@@ -334,6 +336,7 @@ elif page == "Meme Coin Feed":
     refresh = st.button("")
     if 'meme_coins' not in st.session_state or refresh:
         st.session_state['meme_coins'] = fetch_live_meme_coins()
+        st.session_state.pop('meme_coins_version', None)
     meme_coins = st.session_state['meme_coins']
 
     if meme_coins:
@@ -350,11 +353,15 @@ elif page == "Meme Coin Feed":
         search = st.sidebar.text_input("", "")
         sort_col = st.sidebar.selectbox("", df.columns.tolist(), index=3)
         ascending = st.sidebar.checkbox("", value=False)
-        filtered_df = df[(df["Price (USD)"] >= min_price) & (df["Price (USD)"] <= max_price) &
-                         (df["Market Cap (USD)"] >= min_mcap) & (df["Market Cap (USD)"] <= max_mcap)]
-        if search:
-            filtered_df = filtered_df[(filtered_df["Name"].str.contains(search, case=False)) | (filtered_df["Symbol"].str.contains(search, case=False))]
-        filtered_df = filtered_df.sort_values(by=sort_col, ascending=ascending)
+        if 'meme_coins_version' not in st.session_state:
+            st.session_state['meme_coins_version'] = panel_version(df)  # hashed once per fetch, not per rerun
+        # Indexed query over the snapshot (utils/query.py) instead of masks and a full sort per change
+        filtered_df = (get_query_engine(st.session_state['meme_coins_version'], df).query()
+                       .between("Price (USD)", min_price, max_price)
+                       .between("Market Cap (USD)", min_mcap, max_mcap)
+                       .search(search)
+                       .sort(sort_col, ascending=ascending)
+                       .run())
         st.dataframe(filtered_df, use_container_width=True)
         # Download CSV
         csv = filtered_df.to_csv(index=False).encode('utf-8')
@@ -1,4 +1,5 @@
 import sys
+import json
 from rich.console import Console
 from rich.table import Table
 from typing import Tuple
@@ -8,6 +9,8 @@ import yfinance as yf
 import pandas as pd
 import numpy as np
 from scipy.stats import norm
+from utils.scoring import factor_record, score_record, forecast_label
+from utils.batch import run_batch
 
 console = Console()
 
@@ -170,8 +173,8 @@ def fetch_large_cap_coins(limit=15):
 
 # --- Data Fetching ---
 def fetch_coin_history(coin_id, days=30, vs_currency="usd"): 
-    """Fetch historical price and volume for a coin from CoinGecko.
-    Returns a DataFrame with columns: date, price, volume.
+    """Fetch historical price, volume and market cap for a coin from CoinGecko.
+    Returns a DataFrame with columns: date, price, volume, market_cap.
     Used by: CorrelationTools, Backtesting, AdvancedCharts, VolumeLiquidity, etc.
     """
     url = f"https://api.coingecko.com/api/v3/coins/{coin_id}/market_chart"
@@ -181,24 +184,45 @@ def fetch_coin_history(coin_id, days=30, vs_currency="usd"):
         data = resp.json()
         prices = data.get("prices", [])
         volumes = data.get("total_volumes", [])
+        market_caps = data.get("market_caps", [])
         df = pd.DataFrame({
             "date": [pd.to_datetime(p[0], unit="ms") for p in prices],
             "price": [p[1] for p in prices],
-            "volume": [v[1] for v in volumes]
+            "volume": [v[1] for v in volumes],
+            "market_cap": [m[1] for m in market_caps] if len(market_caps) == len(prices) else None
         })
         return df
     except Exception as e:
         console.print(f"[red]Failed to fetch history for {coin_id}: {e}[/red]")
         return None
 
+def fetch_coin_ohlc(coin_id, days=30, vs_currency="usd"):
+    """Fetch OHLC candles for a coin from CoinGecko.
+    Returns a DataFrame with columns: date, open, high, low, close.
+    CoinGecko picks the candle size from `days` (1-2: 30 min, 3-30: 4 hours, 31+: 4 days).
+    Used by: volatility estimators (utils/volatility.py), DerivativesCalculator.
+    """
+    url = f"https://api.coingecko.com/api/v3/coins/{coin_id}/ohlc"
+    params = {"vs_currency": vs_currency, "days": days}
+    try:
+        resp = requests.get(url, params=params, timeout=10)
+        data = resp.json()
+        df = pd.DataFrame(data, columns=["date", "open", "high", "low", "close"])
+        df["date"] = pd.to_datetime(df["date"], unit="ms")
+        return df
+    except Exception as e:
+        console.print(f"[red]Failed to fetch OHLC for {coin_id}: {e}[/red]")
+        return None
+
 # --- Correlation Matrix ---
 def compute_correlation_matrix(price_dict):
     """
-    Given a dict {name: price_series}, compute the correlation matrix DataFrame.
+    Given a dict {name: price_series}, compute the correlation matrix of daily returns
+    (prices themselves are trending, so their correlation is mostly spurious).
     Used by: CorrelationTools, Backtesting, portfolio analytics, etc.
     """
     df = pd.DataFrame(price_dict)
-    return df.corr()
+    return df.pct_change(fill_method=None).corr()
 
 def align_and_normalize_series(series_dict):
     """Given {name: pd.Series}, align on date and normalize to 1 at start."""
@@ -207,6 +231,20 @@ def align_and_normalize_series(series_dict):
     normed = df / df.iloc[0]
     return normed
 
+def align_price_panel(series_dict, freq="D"):
+    """
+    Given {name: pd.Series}, outer-join on date without dropping rows, so every coin keeps
+    its full history (NaN before it was listed). Timestamps are floored to `freq` and the
+    last value per period is kept, so daily series fetched at different times line up.
+    Used by: portfolio backtests (utils/portfolio_backtest.py).
+    """
+    cols = {}
+    for name, s in series_dict.items():
+        s = s.copy()
+        s.index = pd.DatetimeIndex(s.index).floor(freq)
+        cols[name] = s.groupby(level=0).last()
+    return pd.DataFrame(cols).sort_index()
+
 def rolling_volatility(series, window=7):
     return series.pct_change().rolling(window=window).std() * (window ** 0.5)
 
@@ -281,77 +319,12 @@ def prompt_factors(coin_name=None, prefill=None):
     return utility, tokenomics, whale_concentration, liquidity, social, macro, security, red_flags
 
 def weighted_score(utility, tokenomics, whale_concentration, liquidity, social, macro, security, red_flags):
-    breakdown = {}
-    total = 0
-    # Utility (1)
-    u_score = 1 if utility else 0
-    breakdown['Utility/Use Case'] = u_score
-    total += u_score
-    # Tokenomics & Fundamentals (1)
-    t_score = (
-        0.3 * tokenomics['deflationary'] +
-        0.2 * (tokenomics['staking_apy'] >= 50) +
-        0.3 * tokenomics['team_locked'] +
-        0.2 * tokenomics['fair_distribution']
-    )
-    breakdown['Tokenomics & Fundamentals'] = t_score
-    total += t_score
-    # Whale concentration (-1 if yes)
-    w_score = -1 if whale_concentration else 0
-    breakdown['Whale Concentration'] = w_score
-    total += w_score
-    # Liquidity & Trading Volume (1)
-    l_score = (
-        0.4 * (liquidity['liquidity_usd'] >= 500000) +
-        0.2 * liquidity['liquidity_locked'] +
-        0.2 * (liquidity['daily_volume'] >= 100000) +
-        0.2 * liquidity['organic']
-    )
-    breakdown['Liquidity & Trading Volume'] = l_score
-    total += l_score
-    # Social Sentiment & Community (2)
-    s_score = (
-        0.4 * social['trending'] +
-        0.4 * social['active_community'] +
-        0.4 * (social['meme_virality'] / 5) +
-        0.4 * social['growth'] -
-        0.4 * social['hype_volatility']
-    )
-    breakdown['Social Sentiment & Community'] = s_score
-    total += s_score
-    # Macroeconomic Tailwinds (1)
-    m_score = (
-        0.34 * macro['interest_rates_low'] +
-        0.33 * macro['favorable_inflation'] +
-        0.33 * macro['regulatory_news']
-    )
-    breakdown['Macroeconomic Tailwinds'] = m_score
-    total += m_score
-    # Transparency & Security (2)
-    sec_score = (
-        0.3 * security['audited'] +
-        0.2 * security['doxxed_team'] +
-        0.2 * security['open_source'] +
-        0.2 * security['verified_contract'] +
-        0.1 * security['active_dev']
-    ) * 2
-    breakdown['Transparency & Security'] = sec_score
-    total += sec_score
-    # Red Flags (-2 per flag)
-    rf_score = -2 * (red_flags['renounced_ownership'] + red_flags['honeypot'] + red_flags['rugpull_pattern'])
-    breakdown['Red Flags'] = rf_score
-    total += rf_score
-    # Normalize to 0-10
-    total = max(0, min(10, total))
-    return total, breakdown
+    # Weights live in data/scoring_weights.json (defaults in utils/scoring.py); total is clipped to 0-10
+    record = factor_record(utility, tokenomics, whale_concentration, liquidity, social, macro, security, red_flags)
+    return score_record(record)
 
 def forecast(score):
-    if score >= 8:
-        return "High breakout potential with strong macro tailwinds."
-    elif score >= 6:
-        return "Moderate potential; monitor market conditions."
-    else:
-        return "High risk; weak macro support."
+    return forecast_label(score)
 
 def calc_returns(series):
     return series.pct_change()
@@ -498,8 +471,9 @@ def black_scholes_greeks(S, K, T, r, sigma, option_type="call"):
     delta = Nd1
     gamma = pdf_d1 / (S * sigma * np.sqrt(T))
     vega = S * pdf_d1 * np.sqrt(T) / 100
-    theta = (-S * pdf_d1 * sigma / (2 * np.sqrt(T)) - r * K * np.exp(-r * T) * Nd2) / 365 if option_type == "call" else (-S * pdf_d1 * sigma / (2 * np.sqrt(T)) + r * K * np.exp(-r * T) * Nd2) / 365
-    rho = K * T * np.exp(-r * T) * Nd2 / 100 if option_type == "call" else -K * T * np.exp(-r * T) * Nd2 / 100
+    # Nd2 already carries the put sign (-N(-d2)), so one expression covers calls and puts
+    theta = (-S * pdf_d1 * sigma / (2 * np.sqrt(T)) - r * K * np.exp(-r * T) * Nd2) / 365
+    rho = K * T * np.exp(-r * T) * Nd2 / 100
     return {"delta": delta, "gamma": gamma, "vega": vega, "theta": theta, "rho": rho}
 
 # --- Binomial Tree Option Pricing (simple version) ---
@@ -523,7 +497,15 @@ def kelly_criterion(win_prob, win_loss_ratio):
     return max(0, win_prob - (1 - win_prob) / win_loss_ratio)
 
 # --- Monte Carlo Simulation for Option Pricing ---
-def monte_carlo_option_price(S, K, T, r, sigma, n_sim=10000, option_type="call"):
+def monte_carlo_option_price(S, K, T, r, sigma, n_sim=10000, option_type="call", sampling="pseudo"):
+    """
+    Monte Carlo price of a European option.
+    sampling="sobol" uses randomized quasi-Monte Carlo (see utils/montecarlo.py), which
+    reaches a given accuracy with far fewer simulations than the default pseudo-random mode.
+    """
+    if sampling != "pseudo":
+        from utils.montecarlo import price_terminal_option
+        return price_terminal_option(S, K, T, r, sigma, n_sim, option_type, sampling)[0]
     np.random.seed(42)
     ST = S * np.exp((r - 0.5 * sigma ** 2) * T + sigma * np.sqrt(T) * np.random.randn(n_sim))
     if option_type == "call":
@@ -540,11 +522,35 @@ def price_to_ath(series, ath):
 def price_to_volume(series, volume_series):
     return series / volume_series
 
+def run_batch_cli(path, workers=4, fetch=True):
+    """Headless scoring (see utils/batch.py); returns the process exit code."""
+    global console
+    console = Console(stderr=True)  # stdout carries only NDJSON, so fetch warnings go to stderr
+
+    def write(result):
+        sys.stdout.write(json.dumps(result) + "\n")
+        sys.stdout.flush()
+
+    source = sys.stdin if path == '-' else open(path)
+    try:
+        summary = run_batch(source, write, fetch=fetch_coingecko_data if fetch else None, max_workers=max(1, workers))
+    finally:
+        if source is not sys.stdin:
+            source.close()
+    console.print(f"Scored {summary['scored']}/{summary['coins']} coins in {summary['seconds']:.1f}s "
+                  f"({summary['coins_per_second']:.2f} coins/s), {summary['failed']} failed")
+    return 1 if summary['failed'] else 0
+
 def main():
     parser = argparse.ArgumentParser(description="Meme Coin Resilience Analyzer")
     parser.add_argument('--coin', type=str, help='Coin name')
     parser.add_argument('--auto', action='store_true', help='Auto fetch and use CoinGecko data')
+    parser.add_argument('--batch', type=str, metavar='FILE', help="Score the coins listed in FILE ('-' for stdin) without prompts; NDJSON to stdout")
+    parser.add_argument('--workers', type=int, default=4, help='Parallel CoinGecko fetches in batch mode')
+    parser.add_argument('--no-fetch', action='store_true', help='Batch mode: score from defaults and overrides only')
     args = parser.parse_args()
+    if args.batch:
+        sys.exit(run_batch_cli(args.batch, args.workers, fetch=not args.no_fetch))
 
     console.print("[bold cyan]Meme Coin Resilience Analyzer[/bold cyan]")
     coin_name = args.coin or input("Enter coin name: ")
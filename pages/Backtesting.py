@@ -2,7 +2,215 @@ import streamlit as st
 import pandas as pd
 from utils.coin_utils import get_coin_choices, get_price_history
 from utils.ui import mobile_container, mobile_spacer
-from main import calc_returns, moving_average, calc_rsi
+from main import moving_average, calc_rsi
+from utils.backtest import run_backtest, sma_crossover_positions, rsi_threshold_positions, volatility_target_size
+from utils.sweep import METRICS, sweep_sma, sweep_rsi, heatmap, top_k
+from utils.walkforward import run_walk_forward
+from utils.portfolio_backtest import REBALANCE_FREQUENCIES, target_weights, load_weights_csv, run_portfolio_backtest
+from main import align_price_panel
+from utils.streaming import (
+    SmaCrossStrategy, RsiStrategy, history_path, list_history, save_history, stream_bars, run_streaming_backtest
+)
+import plotly.express as px
+
+METRIC_LABELS = {
+    "sharpe": "Sharpe",
+    "total_return": "Total Return",
+    "cagr": "CAGR",
+    "max_drawdown": "Max Drawdown",
+    "trades": "Trades",
+    "exposure": "Time in Market",
+}
+
+def render_sweep(price, strategy, fee_bps, slippage_bps, size):
+    """Parameter Sweep mode: whole grid in one vectorized run, heat map + top-k settings."""
+    metric = st.selectbox("Rank By", METRICS, format_func=METRIC_LABELS.get, help="Metric shown in the heat map and used to rank settings.")
+    k = st.slider("Top Settings to Show", 5, 50, 10)
+    if strategy == "SMA Crossover":
+        fast_range = st.slider("Fast SMA Windows", 3, 30, (3, 30))
+        slow_range = st.slider("Slow SMA Windows", 10, 90, (10, 90))
+        with st.spinner("Sweeping SMA grid..."):
+            results = sweep_sma(price, range(fast_range[0], fast_range[1] + 1), range(slow_range[0], slow_range[1] + 1),
+                                fee_bps=fee_bps, slippage_bps=slippage_bps, size=size)
+        x, y = "slow", "fast"
+    else:
+        window_range = st.slider("RSI Windows", 7, 30, (7, 30))
+        ob_range = st.slider("Overbought Thresholds", 60, 90, (60, 90))
+        os_range = st.slider("Oversold Thresholds", 10, 40, (10, 40))
+        with st.spinner("Sweeping RSI grid..."):
+            results = sweep_rsi(price, range(window_range[0], window_range[1] + 1), range(ob_range[0], ob_range[1] + 1),
+                                range(os_range[0], os_range[1] + 1), fee_bps=fee_bps, slippage_bps=slippage_bps, size=size)
+        x, y = "overbought", "oversold"
+    results = results.dropna(subset=[metric])
+    if results.empty:
+        st.warning("No valid parameter combinations for this history. Try more backtest days or shorter windows.")
+        return
+    best = top_k(results, metric, k)
+    st.subheader("Parameter Sweep Results")
+    st.caption(f"{len(results):,} combinations evaluated.")
+    if strategy == "SMA Crossover":
+        grid = heatmap(results, x, y, metric)
+        title = f"{METRIC_LABELS[metric]} by Fast/Slow SMA"
+    else:
+        windows = sorted(results["window"].unique())
+        window = st.select_slider("Heat Map RSI Window", options=windows, value=best["window"].iloc[0])
+        grid = heatmap(results[results["window"] == window], x, y, metric)
+        title = f"{METRIC_LABELS[metric]} by RSI Thresholds (window {window})"
+    fig = px.imshow(grid, aspect="auto", origin="lower", color_continuous_scale="RdYlGn_r" if metric == "max_drawdown" else "RdYlGn",
+                    labels={"x": x.title(), "y": y.title(), "color": METRIC_LABELS[metric]}, title=title)
+    st.plotly_chart(fig, use_container_width=True)
+    st.write(f"Top {k} Settings:")
+    st.dataframe(best, use_container_width=True, hide_index=True)
+    st.caption("Every setting uses the same costs and sizing. The best in-sample setting is usually optimistic out of sample.")
+
+def render_walk_forward(price, asset, coin_choices, strategy, days, fee_bps, slippage_bps):
+    """Walk-Forward mode: optimise on each train fold, trade the next test fold, stitch the OOS results."""
+    extra = st.multiselect("Additional Coins", [c for c in coin_choices if c != asset], format_func=lambda x: coin_choices[x],
+                           help="Validate the same strategy on several coins; coins and folds run in parallel.")
+    train_days = st.slider("Train Window (days)", 20, max(21, days - 10), min(60, max(20, days - 30)))
+    test_days = st.slider("Test Window (days)", 5, 60, 15)
+    metric = st.selectbox("Optimise For", ["sharpe", "total_return", "cagr"], format_func=METRIC_LABELS.get)
+    anchored = st.checkbox("Anchored (expanding) train window", value=False)
+    panel = {coin_choices[asset]: price}
+    for coin in extra:
+        hist = get_price_history(coin, days=days)
+        if hist is not None and not hist.empty:
+            panel[coin_choices[coin]] = hist.set_index("date")["price"]
+    prices = pd.DataFrame(panel).sort_index()
+    if train_days + test_days > len(prices):
+        st.warning("Not enough history for one train/test fold. Increase backtest days or shorten the windows.")
+        return
+    with st.spinner("Running walk-forward folds..."):
+        result = run_walk_forward(prices, "sma" if strategy == "SMA Crossover" else "rsi", train_bars=train_days,
+                                  test_bars=test_days, anchored=anchored, metric=metric, fee_bps=fee_bps, slippage_bps=slippage_bps)
+    st.subheader("Out-of-Sample Results")
+    metrics = result["metrics"]
+    st.dataframe(metrics.style.format({"total_return": "{:.1%}", "cagr": "{:.1%}", "sharpe": "{:.2f}", "max_drawdown": "{:.1%}",
+                                       "win_rate": "{:.0%}", "exposure": "{:.0%}"}), use_container_width=True)
+    oos_index = result["equity"].index
+    buy_hold = prices.loc[oos_index] / prices.loc[oos_index].bfill().iloc[0]
+    chart = result["equity"].add_suffix(" (OOS Strategy)").join(buy_hold.add_suffix(" (Buy & Hold)"))
+    st.line_chart(chart)
+    st.caption("Only test-window bars are traded, each with parameters chosen on the preceding train window. Equity starts at 1.0.")
+    st.write("Folds:")
+    st.dataframe(result["folds"], use_container_width=True, hide_index=True)
+
+WEIGHT_SCHEME_LABELS = {
+    "equal": "Equal Weight",
+    "inverse_vol": "Inverse Volatility",
+    "market_cap": "Market Cap",
+    "custom": "Custom (CSV)",
+}
+
+def render_portfolio(asset, coin_choices, days, fee_bps, slippage_bps):
+    """Portfolio mode: rebalanced multi-coin backtest on the aligned (outer-joined) price panel."""
+    coins = st.multiselect("Portfolio Coins", list(coin_choices.keys()), default=[asset], format_func=lambda x: coin_choices[x],
+                           help="Coins listed after the start join the portfolio at the next rebalance.")
+    scheme = st.selectbox("Weight Scheme", list(WEIGHT_SCHEME_LABELS), format_func=WEIGHT_SCHEME_LABELS.get)
+    frequency = st.selectbox("Rebalance Frequency", list(REBALANCE_FREQUENCIES), index=2, format_func=str.title)
+    vol_window = st.slider("Volatility Window (days)", 7, 90, 30) if scheme == "inverse_vol" else 30
+    user_weights = None
+    if scheme == "custom":
+        upload = st.file_uploader("Upload weights CSV (columns: asset, weight)", type=["csv"])
+        if upload is None:
+            st.info("Upload a CSV with one row per coin id (or name) and its weight.")
+            return
+        user_weights = load_weights_csv(upload)
+        by_name = {v: k for k, v in coin_choices.items()}
+        user_weights.index = [by_name.get(a, a) for a in user_weights.index]
+        coins = list(dict.fromkeys(coins + [c for c in user_weights.index if c in coin_choices]))
+    if not coins:
+        st.info("Select at least one coin.")
+        return
+    prices, caps = {}, {}
+    with st.spinner("Fetching portfolio history..."):
+        for coin in coins:
+            hist = get_price_history(coin, days=days)
+            if hist is not None and not hist.empty:
+                prices[coin] = hist.set_index("date")["price"]
+                if "market_cap" in hist:
+                    caps[coin] = hist.set_index("date")["market_cap"]
+    if not prices:
+        st.warning("No price history available for the selected coins.")
+        return
+    panel = align_price_panel(prices)
+    market_caps = align_price_panel(caps).reindex_like(panel) if caps else None
+    targets = target_weights(panel, scheme, market_caps=market_caps, weights=user_weights, vol_window=vol_window)
+    result = run_portfolio_backtest(panel, targets, frequency, fee_bps=fee_bps, slippage_bps=slippage_bps)
+    labels = {c: coin_choices.get(c, c) for c in panel.columns}
+    m = result["metrics"]
+    st.subheader("Portfolio Results")
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Total Return", f"{m['total_return']:.1%}")
+    c2.metric("CAGR", f"{m['cagr']:.1%}")
+    c3.metric("Sharpe", "-" if pd.isna(m['sharpe']) else f"{m['sharpe']:.2f}")
+    c4.metric("Max Drawdown", f"{m['max_drawdown']:.1%}")
+    c5, c6, c7 = st.columns(3)
+    c5.metric("Rebalances", int(m['rebalances']))
+    c6.metric("Avg Turnover", f"{m['avg_turnover']:.0%}")
+    c7.metric("Total Costs", f"{result['costs'].sum():.2%}")
+    st.line_chart(result["equity"].rename("Portfolio Equity"))
+    weights = result["weights"].rename(columns=labels)
+    fig = px.area(weights, labels={"value": "Weight", "index": "Date", "variable": "Coin"}, title="Portfolio Weights (drifting between rebalances)")
+    st.plotly_chart(fig, use_container_width=True)
+    listed = panel.apply(lambda s: s.first_valid_index()).rename("First Price").to_frame()
+    listed.index = [labels[c] for c in listed.index]
+    st.dataframe(listed, use_container_width=True)
+    st.caption("History is outer-joined by date: each coin keeps its own history and joins at the first rebalance after listing. Costs are charged on rebalance turnover.")
+
+def render_streaming(hist, asset, coin_choices, strategy, fee_bps, slippage_bps, size):
+    """Event-Driven mode: streams bars from data/history/<coin>.csv with stop orders."""
+    st.caption("Streams bars from the on-disk history file (data/history/<coin id>.csv with timestamp, open, high, low, close, volume), "
+               "so minute-level histories of any length run in bounded memory.")
+    if st.button("Save fetched history to disk", help="Appends the bars fetched above to this coin's history file."):
+        written = save_history(asset, hist)
+        st.success(f"Appended {written} new bars to {asset}.csv")
+    available = list_history()
+    if not available:
+        st.info("No on-disk history yet. Save the fetched history or add CSV files to data/history.")
+        return
+    source = st.selectbox("History File", available, index=available.index(asset) if asset in available else 0,
+                          format_func=lambda x: coin_choices.get(x, x))
+    if strategy == "SMA Crossover":
+        fast = st.slider("Fast SMA Window (bars)", 3, 500, 7)
+        slow = st.slider("Slow SMA Window (bars)", 10, 2000, 21)
+        engine_strategy = SmaCrossStrategy(fast, slow)
+    else:
+        window = st.slider("RSI Window (bars)", 7, 200, 14)
+        overbought = st.slider("Overbought Threshold", 60, 90, 70)
+        oversold = st.slider("Oversold Threshold", 10, 40, 30)
+        engine_strategy = RsiStrategy(window, overbought, oversold)
+    c1, c2, c3 = st.columns(3)
+    stop_loss = c1.number_input("Stop-Loss %", min_value=0.0, max_value=99.0, value=0.0, step=0.5, help="0 disables the order.")
+    take_profit = c2.number_input("Take-Profit %", min_value=0.0, value=0.0, step=0.5, help="0 disables the order.")
+    trailing_stop = c3.number_input("Trailing Stop %", min_value=0.0, max_value=99.0, value=0.0, step=0.5, help="0 disables the order.")
+    fraction = 1.0 if isinstance(size, (pd.Series, pd.DataFrame)) else size
+    with st.spinner("Streaming bars..."):
+        result = run_streaming_backtest(
+            stream_bars(history_path(source)), engine_strategy,
+            stop_loss=stop_loss / 100 or None, take_profit=take_profit / 100 or None, trailing_stop=trailing_stop / 100 or None,
+            size=fraction, fee_bps=fee_bps, slippage_bps=slippage_bps,
+        )
+    if result["bars"] == 0:
+        st.warning("The history file has no bars.")
+        return
+    m = result["metrics"]
+    st.subheader("Event-Driven Results")
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Total Return", f"{m['total_return']:.1%}")
+    c2.metric("Sharpe", "-" if pd.isna(m['sharpe']) else f"{m['sharpe']:.2f}")
+    c3.metric("Max Drawdown", f"{m['max_drawdown']:.1%}")
+    c4.metric("Trades", int(m['trades']))
+    c5, c6, c7 = st.columns(3)
+    c5.metric("Win Rate", "-" if pd.isna(m['win_rate']) else f"{m['win_rate']:.0%}")
+    c6.metric("Bars", f"{result['bars']:,}")
+    c7.metric("Throughput", f"{result['bars_per_sec']:,.0f} bars/sec")
+    st.line_chart(result["equity"].rename("Strategy Equity"))
+    if isinstance(size, (pd.Series, pd.DataFrame)):
+        st.caption("Volatility-target sizing is not available in streaming mode; positions use the full fraction of capital.")
+    if not result["trades"].empty:
+        st.write("Trade List (most recent):")
+        st.dataframe(result["trades"], use_container_width=True, hide_index=True)
 
 with mobile_container():
     st.title("Backtesting & Strategy Simulation")
@@ -30,31 +238,57 @@ with mobile_container():
                     if hist is not None and not hist.empty:
                         price = hist.set_index("date")["price"]
                         st.line_chart(price)
-                        if strategy == "SMA Crossover":
-                            fast = st.slider("Fast SMA Window", 3, 30, 7)
-                            slow = st.slider("Slow SMA Window", 10, 90, 21)
-                            sma_fast = moving_average(price, window=fast, kind="sma")
-                            sma_slow = moving_average(price, window=slow, kind="sma")
-                            signals = (sma_fast > sma_slow).astype(int).diff().fillna(0)
-                            st.line_chart(pd.DataFrame({"Price": price, "SMA Fast": sma_fast, "SMA Slow": sma_slow}))
-                            st.write("Buy signals:", signals[signals == 1].count())
-                            st.write("Sell signals:", signals[signals == -1].count())
-                            returns = calc_returns(price)
-                            strat_returns = returns * (signals.shift(1).fillna(0) > 0)
-                            st.write("Backtested Return:", strat_returns.sum())
-                        elif strategy == "RSI Overbought/Oversold":
-                            window = st.slider("RSI Window", 7, 30, 14)
-                            rsi = calc_rsi(price, window=window)
-                            overbought = st.slider("Overbought Threshold", 60, 90, 70)
-                            oversold = st.slider("Oversold Threshold", 10, 40, 30)
-                            buy_signals = (rsi < oversold).astype(int).diff().fillna(0)
-                            sell_signals = (rsi > overbought).astype(int).diff().fillna(0)
-                            st.line_chart(pd.DataFrame({"Price": price, "RSI": rsi}))
-                            st.write("Buy signals:", buy_signals[buy_signals == 1].count())
-                            st.write("Sell signals:", sell_signals[sell_signals == 1].count())
-                            returns = calc_returns(price)
-                            strat_returns = returns * (buy_signals.shift(1).fillna(0) > 0)
-                            st.write("Backtested Return:", strat_returns.sum())
+                        with st.expander("Costs & Position Sizing"):
+                            fee_bps = st.number_input("Fee (bps per trade)", min_value=0.0, value=10.0, step=1.0, help="Exchange fee charged on every change in position. 10 bps = 0.1%.")
+                            slippage_bps = st.number_input("Slippage (bps per trade)", min_value=0.0, value=5.0, step=1.0, help="Expected price impact per trade. Meme coins with thin order books often need more.")
+                            sizing = st.radio("Position Sizing", ["Fixed Fraction", "Volatility Target"], horizontal=True)
+                            if sizing == "Fixed Fraction":
+                                size = st.slider("Fraction of Capital", 0.1, 1.0, 1.0, step=0.05)
+                            else:
+                                target_vol = st.slider("Target Volatility (annualised)", 0.1, 2.0, 0.5, step=0.05)
+                                size = volatility_target_size(price, target_vol=target_vol)
+                        mode = st.radio("Mode", ["Single Run", "Parameter Sweep", "Walk-Forward", "Portfolio", "Event-Driven"], horizontal=True, help="Parameter Sweep backtests the whole parameter grid at once and ranks the settings. Walk-Forward re-optimises on rolling train windows and reports out-of-sample results. Portfolio backtests a rebalanced multi-coin portfolio. Event-Driven streams on-disk history bar by bar with stop orders.")
+                        if mode == "Parameter Sweep":
+                            render_sweep(price, strategy, fee_bps, slippage_bps, size)
+                        elif mode == "Walk-Forward":
+                            render_walk_forward(price, asset, coin_choices, strategy, days, fee_bps, slippage_bps)
+                        elif mode == "Portfolio":
+                            render_portfolio(asset, coin_choices, days, fee_bps, slippage_bps)
+                        elif mode == "Event-Driven":
+                            render_streaming(hist, asset, coin_choices, strategy, fee_bps, slippage_bps, size)
+                        else:
+                            if strategy == "SMA Crossover":
+                                fast = st.slider("Fast SMA Window", 3, 30, 7)
+                                slow = st.slider("Slow SMA Window", 10, 90, 21)
+                                sma_fast = moving_average(price, window=fast, kind="sma")
+                                sma_slow = moving_average(price, window=slow, kind="sma")
+                                st.line_chart(pd.DataFrame({"Price": price, "SMA Fast": sma_fast, "SMA Slow": sma_slow}))
+                                positions = sma_crossover_positions(price, fast, slow)
+                            elif strategy == "RSI Overbought/Oversold":
+                                window = st.slider("RSI Window", 7, 30, 14)
+                                rsi = calc_rsi(price, window=window)
+                                overbought = st.slider("Overbought Threshold", 60, 90, 70)
+                                oversold = st.slider("Oversold Threshold", 10, 40, 30)
+                                st.line_chart(pd.DataFrame({"Price": price, "RSI": rsi}))
+                                positions = rsi_threshold_positions(price, window, overbought, oversold)
+                            result = run_backtest(price, positions, fee_bps=fee_bps, slippage_bps=slippage_bps, size=size)
+                            metrics = result["metrics"].iloc[0]
+                            st.subheader("Results")
+                            c1, c2, c3, c4 = st.columns(4)
+                            c1.metric("Total Return", f"{metrics['total_return']:.1%}")
+                            c2.metric("CAGR", f"{metrics['cagr']:.1%}")
+                            c3.metric("Sharpe", f"{metrics['sharpe']:.2f}")
+                            c4.metric("Max Drawdown", f"{metrics['max_drawdown']:.1%}")
+                            c5, c6, c7 = st.columns(3)
+                            c5.metric("Win Rate", "-" if pd.isna(metrics['win_rate']) else f"{metrics['win_rate']:.0%}")
+                            c6.metric("Trades", int(metrics['trades']))
+                            c7.metric("Time in Market", f"{metrics['exposure']:.0%}")
+                            buy_hold = price / price.iloc[0]
+                            st.line_chart(pd.DataFrame({"Strategy Equity": result["equity"].iloc[:, 0], "Buy & Hold": buy_hold}))
+                            st.caption("Equity starts at 1.0. Positions are taken at the close after a signal and include fees and slippage.")
+                            if not result["trades"].empty:
+                                st.write("Trade List:")
+                                st.dataframe(result["trades"].drop(columns="asset"), use_container_width=True, hide_index=True)
                     else:
                         st.warning(f"No data found for: {coin_choices[asset]}")
                         st.info("Please check the asset name or try again later. Data may be unavailable due to API limits.")
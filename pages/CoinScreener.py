@@ -1,28 +1,25 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-from utils.coin_utils import get_coin_choices, get_price_history
+import hashlib
+import plotly.express as px
+from utils.coin_utils import get_coin_choices, get_price_history, get_risk_model, get_screener_features, get_screener_models, get_query_engine
 from utils.ui import mobile_container, mobile_spacer
-from sklearn.ensemble import RandomForestClassifier
 from sklearn.preprocessing import MinMaxScaler
-import shap
 
-@st.cache_data(ttl=600)
-def get_demo_features():
-    # This would be replaced by actual API calls and feature engineering
-    np.random.seed(42)
+def get_features():
+    # Real features from the cached 90-day histories (utils/features.py); there is no
+    # sentiment feed yet, so sentiment is neutral for every coin
     coins = get_coin_choices()
-    n = len(coins)
-    df = pd.DataFrame({
-        'symbol': list(coins.keys()),
-        'name': list(coins.values()),
-        'volatility': np.random.uniform(0.05, 0.8, n),
-        'avg_volume': np.random.uniform(1e5, 1e8, n),
-        'sentiment': np.random.uniform(-1, 1, n),
-        'correlation_btc': np.random.uniform(-1, 1, n),
-        'recent_return': np.random.uniform(-0.5, 2.0, n)
-    })
-    return df
+    df = pd.DataFrame({'symbol': list(coins.keys()), 'name': list(coins.values())})
+    features = get_screener_features(tuple(df['symbol']), days=90)
+    if features is None:
+        return df.iloc[0:0]
+    df = df.join(features.drop(columns='obs'), on='symbol')
+    df['sentiment'] = 0.0
+    df.attrs['as_of'] = features.attrs.get('as_of', 'latest')
+    df.attrs['data_version'] = features.attrs.get('data_version', 'latest')
+    return df.dropna(subset=['volatility', 'correlation_btc', 'recent_return']).reset_index(drop=True)
 
 def score_coins(df, risk_level):
     # Simple scoring logic for demo; replace with ML model in production
@@ -33,49 +30,76 @@ def score_coins(df, risk_level):
     }[risk_level]
     scaler = MinMaxScaler()
     features = ['volatility', 'sentiment', 'correlation_btc', 'recent_return']
-    df_scaled = pd.DataFrame(scaler.fit_transform(df[features]), columns=features)
+    df_scaled = pd.DataFrame(scaler.fit_transform(df[features]), columns=features, index=df.index)
     score = sum(df_scaled[f] * w for f, w in weights.items())
     return score
 
-def explain_scores(df, score):
-    # Use SHAP for simple explainability (demo)
-    clf = RandomForestClassifier(n_estimators=10, random_state=42)
-    y = (score > np.median(score)).astype(int)  # Fix: use np.median for correct threshold
-    clf.fit(df, y)
-    explainer = shap.Explainer(clf, df)
-    shap_values = explainer(df)
-    return shap_values
+def explain_scores(universe, score, model_name):
+    # One random forest per risk level and data version, trained on the whole universe and
+    # persisted with TreeSHAP rows for every coin (utils/screener_model.py); reruns only look up.
+    # The features include the still-forming latest bar, so the version is the day plus a hash
+    # of the feature matrix itself (coins and values): a changed intraday bar retrains the model
+    features = ['volatility', 'sentiment', 'correlation_btc', 'recent_return']
+    X = universe.set_index('symbol')[features]
+    y = (score > np.median(score)).astype(int).to_numpy()
+    data = hashlib.md5(pd.util.hash_pandas_object(X).to_numpy().tobytes()).hexdigest()[:8]
+    store = get_screener_models()
+    bundle, current = store.get(f"{model_name}_{universe.attrs.get('as_of', 'latest')}_{data}", X, y)
+    return store.attributions(bundle, X), current
 
 with mobile_container():
     st.title("AI-Powered Coin Screener")
     st.markdown("""
     Discover meme coins tailored to your risk appetite, using AI to blend risk, sentiment, and correlation factors. All suggestions are for educational purposes only.
     """)
-    st.caption("ℹ️ Screener uses demo data for now. In production, it will use live sentiment, volume, and price feeds.")
+    st.caption("ℹ️ Volatility, volume, BTC correlation and recent return are computed from the last 30 days of price history. Sentiment is neutral until a live sentiment feed is connected.")
     mobile_spacer(8)
     try:
         risk = st.selectbox("Select Risk Appetite", ["Low", "Medium", "High"], help="Low = stable, High = moonshot.")
         filter_sentiment = st.slider("Minimum Sentiment", -1.0, 1.0, -0.2, step=0.05, help="Filter for coins with at least this sentiment score.")
         filter_corr = st.slider("Max Correlation to BTC", -1.0, 1.0, 0.8, step=0.05, help="Screen out coins that move too closely with BTC.")
-        df = get_demo_features()
-        df = df[df['sentiment'] >= filter_sentiment]
-        df = df[df['correlation_btc'] <= filter_corr]
-        features = ['volatility', 'sentiment', 'correlation_btc', 'recent_return']
-        score = score_coins(df, risk)
-        df['AI Score'] = score
-        top = df.sort_values("AI Score", ascending=False).head(10)
+        use_live_risk = st.checkbox("Use live risk model volatility", value=False, help="Replaces 30-day realised volatility with annualised volatility from the shared Ledoit-Wolf/PCA risk model and adds each coin's idiosyncratic share of risk.")
+        df = get_features()
+        if df.empty:
+            st.info("No price history available for the screener universe.")
+            st.stop()
+        # Everything the snapshot below is derived from, so its query engine is cached by version
+        snapshot_version = f"{df.attrs['data_version']}_{risk}"
+        if use_live_risk:
+            model = get_risk_model(tuple(df['symbol']), days=90)
+            if model is not None:
+                snapshot_version += f"_live-{model['data_version']}"
+                df['volatility'] = df['symbol'].map(model["risk"]["total_vol"]).fillna(df['volatility'])
+                df['idio_share'] = df['symbol'].map(model["risk"]["idio_share"])
+            else:
+                st.info("Not enough price history for the risk model; showing 30-day realised volatility.")
+        # Scores are scaled over the whole universe so a coin's score does not depend on the filters
+        df['AI Score'] = score_coins(df, risk)
+        top = (get_query_engine(snapshot_version, df, ("name", "symbol")).query()
+               .where('sentiment', '>=', filter_sentiment)
+               .where('correlation_btc', '<=', filter_corr)
+               .sort("AI Score", ascending=False)
+               .limit(10)
+               .run())
         st.subheader("Top Coin Suggestions")
-        st.dataframe(top[["name", "symbol", "AI Score", "volatility", "sentiment", "correlation_btc", "recent_return"]], use_container_width=True, hide_index=True)
+        show_cols = ["name", "symbol", "AI Score", "volatility", "avg_volume", "sentiment", "correlation_btc", "recent_return"] + (["idio_share"] if "idio_share" in top else [])
+        st.dataframe(top[show_cols], use_container_width=True, hide_index=True)
         st.caption("Scores are relative and for educational/demo purposes only.")
         # Explainability (SHAP summary)
         st.subheader("Why these coins?")
-        st.markdown("Feature importances are shown for the top-ranked coin.")
+        st.markdown("SHAP attributions from a random forest that separates the top half of the universe by AI Score.")
         try:
-            shap_values = explain_scores(top[features], top["AI Score"])
-            shap.plots.bar(shap_values[0], show=False)
-            st.pyplot(shap.plots.bar(shap_values[0], show=False))
+            model_name = risk.lower() + ("-live" if use_live_risk else "")
+            attributions, current = explain_scores(df, df['AI Score'], model_name)
+            coin = st.selectbox("Explain coin", top["symbol"].tolist(), format_func=dict(zip(top["symbol"], top["name"])).get)
+            contrib = attributions.loc[coin].sort_values(key=abs)
+            fig = px.bar(x=contrib.values, y=contrib.index, orientation="h", labels={"x": "SHAP value (top-half probability)", "y": ""},
+                         title=f"Feature contributions: {coin}")
+            st.plotly_chart(fig, use_container_width=True)
+            if not current:
+                st.caption("Newer market data arrived; the model is retraining in the background and these explanations come from the previous version.")
         except Exception as e:
-            st.info(f"Explainability demo not available: {e}")
+            st.info(f"Explainability not available: {e}")
     except Exception as e:
         st.error(f"An error occurred in the Coin Screener: {e}")
         st.info("Please check your internet connection, data sources, or try again later. If the issue persists, contact support.")
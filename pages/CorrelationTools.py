@@ -4,6 +4,12 @@ import plotly.express as px
 import plotly.figure_factory as ff
 from main import compute_correlation_matrix, fetch_coin_history, fetch_live_meme_coins, fetch_large_cap_coins
 from utils.ui import mobile_container, mobile_spacer
+from utils.coin_utils import get_price_panel, get_clustering, get_risk_model, get_optimal_weights
+from utils.optimiser import METHOD_LABELS
+from utils.clustering import LINKAGE_METHODS, panel_version, cluster_assignments
+from utils.pair_scanner import scan_pairs
+from utils.pairs import scan_cointegrated_pairs, backtest_pair
+from utils.network import correlation_mst, threshold_graph, node_stats, spring_layout, network_figure, graph_key
 from functools import lru_cache
 
 @st.cache_data(ttl=600)
@@ -18,6 +24,14 @@ def get_coin_choices():
 def get_price_history(asset_id, days=90):
     return fetch_coin_history(asset_id, days=days)
 
+@st.cache_data(ttl=600, show_spinner=False)
+def get_pair_scan(data_version, window, lookback, top_k, direction, rank_by, _prices):
+    return scan_pairs(_prices, window=window, lookback=lookback, top_k=top_k, direction=direction, rank_by=rank_by)
+
+@st.cache_data(ttl=600, show_spinner=False)
+def get_cointegrated_pairs(data_version, min_corr, max_pvalue, max_half_life, _prices):
+    return scan_cointegrated_pairs(_prices, min_corr=min_corr, max_pvalue=max_pvalue, max_half_life=max_half_life)
+
 with mobile_container():
     st.title("Correlation & Diversification Tools")
     st.markdown("""
@@ -60,14 +74,14 @@ with mobile_container():
         if data:
             df = pd.DataFrame(data)
             st.subheader("Correlation Matrix")
-            corr = df.corr()
+            corr = compute_correlation_matrix(data)
             st.dataframe(corr)
             st.write("Download Correlation Matrix:")
             st.download_button("Download CSV", corr.to_csv(), "correlation_matrix.csv", "text/csv")
 
             # --- Correlation Heatmap ---
             st.subheader("Correlation Heatmap")
-            fig = px.imshow(corr, text_auto=True, color_continuous_scale="RdBu", zmin=-1, zmax=1)
+            fig = px.imshow(corr, text_auto=len(corr) <= 20, color_continuous_scale="RdBu", zmin=-1, zmax=1)
             st.plotly_chart(fig, use_container_width=True)
 
             # --- Rolling Correlation: Pairwise ---
@@ -92,26 +106,29 @@ with mobile_container():
             st.subheader("Diversification Score")
             div_score = 1 - corr.abs().mean().mean()
             st.metric("Diversification Score (0-1, higher=better)", f"{div_score:.2f}")
+            if len(selected_assets) >= 2:
+                with st.expander("Suggested Weights"):
+                    method = st.selectbox("Optimisation", list(METHOD_LABELS), index=3, format_func=METHOD_LABELS.get)
+                    opt = get_optimal_weights(tuple(sorted(selected_assets)), method, days=90, min_obs=10)
+                    if opt is None:
+                        st.info("Not enough price history to optimise.")
+                    else:
+                        suggested = pd.DataFrame({"Weight": opt["weights"], "Risk Contribution": opt["risk_contributions"]}).rename(index=coin_choices)
+                        st.dataframe(suggested.style.format("{:.1%}"), use_container_width=True)
+                        st.metric("Diversification Ratio", f"{opt['diversification_ratio']:.2f}", help="Weighted average volatility over portfolio volatility; higher means more diversification.")
             # Historical Diversification Score
             st.subheader("Historical Diversification Score")
-            hist_score = 1 - df.rolling(window_sizes[0]).corr().abs().mean(axis=1)
+            hist_score = 1 - df.rolling(window_sizes[0]).corr().abs().groupby(level=0).mean().mean(axis=1)
             st.line_chart(hist_score)
 
             # --- Advanced Analytics: Clustering ---
             st.subheader("Asset Clustering (Correlation Dendrogram)")
             try:
-                import scipy.cluster.hierarchy as sch
-                import scipy.spatial.distance as ssd
-                dist = 1 - corr.abs()
-                linkage = sch.linkage(ssd.squareform(dist), method='average')
-                import matplotlib.pyplot as plt
-                import io
-                fig2, ax = plt.subplots(figsize=(8, 3))
-                sch.dendrogram(linkage, labels=list(data.keys()), ax=ax)
-                buf = io.BytesIO()
-                fig2.savefig(buf, format="png")
-                st.image(buf.getvalue(), caption="Hierarchical clustering dendrogram", use_column_width=True)
-                plt.close(fig2)
+                if len(df.columns) >= 3:
+                    clustering = get_clustering(panel_version(df), None, "average", df)
+                    st.image(clustering["dendrogram_png"], caption="Hierarchical clustering dendrogram", use_column_width=True)
+                else:
+                    st.info("Select at least three assets to cluster.")
             except Exception as e:
                 st.info(f"Clustering not available: {e}")
 
@@ -131,6 +148,133 @@ with mobile_container():
             """)
         else:
             st.info("Select assets above to begin analysis. Example: DOGE, SHIB, PEPE, WBTC, ETH.")
+
+        # --- Universe Clustering ---
+        st.subheader("Universe Clustering")
+        st.caption("Clusters every supported coin by correlation of daily log returns. The linkage and dendrogram are computed once per data refresh and reused on every click.")
+        if st.checkbox("Cluster the whole coin universe", value=False, help="Fetches price history for every supported coin (cached for 10 minutes)."):
+            c1, c2, c3 = st.columns(3)
+            uni_days = c1.selectbox("History (days)", [30, 90, 180, 365], index=1)
+            uni_window = c2.selectbox("Return Window (days)", [None, 14, 30, 60, 90], format_func=lambda w: "All history" if w is None else f"Last {w}")
+            method = c3.selectbox("Linkage Method", LINKAGE_METHODS)
+            with st.spinner("Fetching universe price history..."):
+                panel = get_price_panel(tuple(coin_choices.keys()), days=uni_days)
+            panel = panel.rename(columns=coin_choices)
+            if panel.shape[1] < 3:
+                st.warning("Not enough coins with price history to cluster.")
+            else:
+                universe = get_clustering(panel_version(panel), uni_window, method, panel)
+                n_clusters = st.slider("Number of Clusters", 2, min(20, len(universe["labels"])), min(5, len(universe["labels"])))
+                assignments = cluster_assignments(universe, n_clusters)
+                st.image(universe["dendrogram_png"], caption=f"{len(universe['labels'])} coins, {method} linkage", use_column_width=True)
+                view = st.radio("View", ["Network (minimum spanning tree)", "Network (threshold)", "Heatmap"], horizontal=True,
+                                help="Heatmaps get unreadable past ~40 coins; the network keeps only the strongest links.")
+                if view == "Heatmap":
+                    ordered = [universe["labels"][i] for i in universe["order"]]
+                    fig_u = px.imshow(universe["corr"].loc[ordered, ordered], color_continuous_scale="RdBu", zmin=-1, zmax=1,
+                                      title="Correlation (dendrogram order)")
+                    st.plotly_chart(fig_u, use_container_width=True)
+                else:
+                    if view.endswith("(threshold)"):
+                        threshold = st.slider("Min |Correlation| for a Link", 0.3, 0.95, 0.7, step=0.05)
+                        edges = threshold_graph(universe["corr"], threshold)
+                    else:
+                        edges = correlation_mst(universe["corr"])
+                    stats = node_stats(universe["labels"], edges)
+                    # Layout is reused as is while the graph is unchanged and warm-started when it changes
+                    layouts = st.session_state.setdefault("network_layouts", {})
+                    key = graph_key(universe["labels"], edges)
+                    stored = layouts.get(view)
+                    if stored is None or stored["key"] != key:
+                        stored = layouts[view] = {"key": key, "pos": spring_layout(universe["labels"], edges, previous=stored and stored["pos"])}
+                    st.plotly_chart(network_figure(stored["pos"], edges, stats, clusters=assignments), use_container_width=True)
+                    st.caption("Node size = number of links, colour = cluster. The most connected coins (hubs) are labelled.")
+                    hubs = stats.head(10).rename_axis("coin").reset_index().merge(assignments.rename_axis("coin").reset_index(), on="coin")
+                    st.dataframe(hubs.style.format({"strength": "{:.2f}"}), use_container_width=True, hide_index=True)
+                members = assignments.rename_axis("coin").reset_index().sort_values(["cluster", "coin"])
+                st.dataframe(members, use_container_width=True, hide_index=True)
+                if universe["dropped"]:
+                    st.caption(f"Left out (too little history in the window): {', '.join(universe['dropped'])}")
+
+        # --- Pair Scanner ---
+        st.subheader("Correlation Breakdown Scanner")
+        st.caption("Scans every pair of supported coins for the largest change in rolling correlation: pairs that are decoupling or converging.")
+        if st.checkbox("Scan all pairs in the universe", value=False, help="Uses daily log returns of every supported coin (cached for 10 minutes)."):
+            c1, c2, c3 = st.columns(3)
+            scan_window = c1.selectbox("Correlation Window (days)", [14, 30, 60], index=1)
+            scan_lookback = c2.selectbox("Compare With (days ago)", [7, 14, 30], index=2)
+            direction = c3.selectbox("Direction", ["both", "decoupling", "convergence"], format_func=str.title)
+            c4, c5 = st.columns(2)
+            scan_k = c4.slider("Top Pairs", 5, 100, 20)
+            rank_by = c5.radio("Rank By", ["latest", "peak"], horizontal=True, format_func=lambda r: "Latest change" if r == "latest" else "Largest change in history")
+            with st.spinner("Fetching universe price history..."):
+                scan_panel = get_price_panel(tuple(coin_choices.keys()), days=180).rename(columns=coin_choices)
+            if scan_panel.shape[1] < 2 or len(scan_panel) <= scan_window + scan_lookback:
+                st.warning("Not enough coins or history to scan pairs.")
+            else:
+                with st.spinner(f"Scanning {scan_panel.shape[1] * (scan_panel.shape[1] - 1) // 2:,} pairs..."):
+                    pairs = get_pair_scan(panel_version(scan_panel), scan_window, scan_lookback, scan_k, direction, rank_by, scan_panel)
+                if pairs.empty:
+                    st.info("No pairs with enough overlapping history.")
+                else:
+                    st.dataframe(pairs.style.format({"corr_before": "{:.2f}", "corr_now": "{:.2f}", "change": "{:+.2f}"}), use_container_width=True, hide_index=True)
+
+        # --- Pairs Trading Scanner ---
+        st.subheader("Pairs Trading Scanner (Cointegration)")
+        st.caption("Finds mean-reverting pairs: candidates are pre-filtered by return correlation, then tested for Engle-Granger cointegration in parallel. Pairs are ranked by how stretched their spread is today.")
+        if st.checkbox("Scan the universe for cointegrated pairs", value=False, help="Uses 180 days of daily prices for every supported coin (cached for 10 minutes)."):
+            c1, c2, c3 = st.columns(3)
+            min_corr = c1.slider("Min Return Correlation", 0.0, 0.95, 0.6, step=0.05)
+            max_pvalue = c2.selectbox("Max p-value", [0.01, 0.05, 0.1], index=1)
+            max_hl = c3.slider("Max Half-Life (days)", 1, 60, 30)
+            with st.spinner("Fetching universe price history..."):
+                pairs_panel = get_price_panel(tuple(coin_choices.keys()), days=180).rename(columns=coin_choices)
+            with st.spinner("Testing candidate pairs..."):
+                coint_pairs = get_cointegrated_pairs(panel_version(pairs_panel), min_corr, max_pvalue, max_hl, pairs_panel)
+            if coint_pairs.empty:
+                st.info("No cointegrated pairs at these settings. Try a lower correlation filter or a higher p-value.")
+            else:
+                st.dataframe(coint_pairs.style.format({"corr": "{:.2f}", "pvalue": "{:.4f}", "t_stat": "{:.2f}", "alpha": "{:.3f}", "beta": "{:.3f}",
+                                                       "half_life": "{:.1f}", "zscore": "{:+.2f}"}), use_container_width=True, hide_index=True)
+                labels = [f"{r.asset_a} / {r.asset_b}" for r in coint_pairs.itertuples()]
+                pick = st.selectbox("Backtest Pair", range(len(labels)), format_func=lambda i: labels[i])
+                c4, c5, c6 = st.columns(3)
+                z_window = c4.slider("Z-Score Window (days)", 10, 90, 30)
+                entry_z = c5.slider("Entry |z|", 1.0, 3.0, 2.0, step=0.25)
+                exit_z = c6.slider("Exit |z|", 0.0, 1.5, 0.5, step=0.25)
+                row = coint_pairs.iloc[pick]
+                bt = backtest_pair(pairs_panel, row["asset_a"], row["asset_b"], window=z_window, entry_z=entry_z, exit_z=exit_z)
+                m = bt["metrics"]
+                c7, c8, c9, c10 = st.columns(4)
+                c7.metric("Total Return", f"{m['total_return']:.1%}")
+                c8.metric("Sharpe", "-" if pd.isna(m['sharpe']) else f"{m['sharpe']:.2f}")
+                c9.metric("Max Drawdown", f"{m['max_drawdown']:.1%}")
+                c10.metric("Trades", int(m['trades']))
+                st.line_chart(pd.DataFrame({"Spread Z-Score": bt["zscore"]}))
+                st.line_chart(bt["equity"].rename("Pair Strategy Equity"))
+                st.caption("Long the spread buys the first coin and shorts beta units of the second (gross exposure 1). Includes 10 bps fees and 5 bps slippage per leg. "
+                           "The hedge ratio is re-estimated each day from earlier prices only (flat for the first 60 days), but the pair itself was picked by a "
+                           "cointegration test on the whole 180 days, so the backtest is still partly in-sample and flatters the strategy.")
+
+        # --- Risk Model ---
+        st.subheader("Risk Model (Shrinkage Covariance & PCA Factors)")
+        st.caption("Ledoit-Wolf shrinkage keeps the covariance of hundreds of short-history coins well conditioned; PCA splits each coin's risk into common factors and idiosyncratic risk.")
+        if st.checkbox("Build the universe risk model", value=False, help="Uses daily returns of every supported coin; the model is cached and updated with new bars."):
+            n_factors = st.slider("Number of Factors", 1, 10, 3)
+            model = get_risk_model(tuple(coin_choices.keys()), days=90, n_factors=n_factors)
+            if model is None:
+                st.warning("Not enough price history for a risk model.")
+            else:
+                c1, c2, c3 = st.columns(3)
+                c1.metric("Coins Modelled", len(model["covariance"]))
+                c2.metric("Shrinkage Intensity", f"{model['shrinkage']:.2f}")
+                c3.metric(f"Variance Explained ({n_factors} factors)", f"{model['explained_variance']['cumulative'].iloc[-1]:.0%}")
+                ev = model["explained_variance"]
+                st.plotly_chart(px.bar(ev, y="ratio", labels={"index": "Factor", "ratio": "Share of Variance"}, title="Explained Variance"), use_container_width=True)
+                loadings = model["loadings"].rename(index=coin_choices)
+                st.plotly_chart(px.imshow(loadings.T, aspect="auto", color_continuous_scale="RdBu", title="Factor Loadings"), use_container_width=True)
+                risk_table = model["risk"].rename(index=coin_choices).sort_values("idio_share", ascending=False)
+                st.dataframe(risk_table.style.format({"total_vol": "{:.0%}", "factor_vol": "{:.0%}", "idio_vol": "{:.0%}", "idio_share": "{:.0%}"}), use_container_width=True)
     except Exception as e:
         st.error(f"Error loading correlation tools: {e}")
         st.info("Please check your internet connection, data sources, or try again later. If the issue persists, contact support.")
@@ -1,12 +1,24 @@
 import streamlit as st
-from main import black_scholes_price, binomial_tree_price, kelly_criterion, monte_carlo_option_price, black_scholes_greeks
+from main import black_scholes_price, binomial_tree_price, kelly_criterion, black_scholes_greeks
 import plotly.graph_objs as go
 import plotly.express as px
-from utils.coin_utils import get_coin_choices
+from utils.coin_utils import get_coin_choices, get_price_history, get_volatility_term_structure
+from utils.volatility import ESTIMATORS, ESTIMATOR_LABELS
+from utils.option_book import GREEKS, load_positions, price_book, aggregate_greeks, shock_grid, shock_matrix
+from utils.kelly import kelly_fraction_grid, simulate_bankroll, kelly_multi_outcome, return_panel, kelly_multi_asset
+from utils.montecarlo import (
+    SAMPLING_MODES, standard_normals, gbm_terminal_prices, price_terminal_option,
+    price_path_option, asian_payoff, qmc_convergence_benchmark
+)
 from utils.ui import mobile_container, mobile_spacer
-from io import BytesIO
-import base64
+from utils.export import image_download_button, csv_payload
 import pandas as pd
+import numpy as np
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def cached_bankroll_simulation(win_prob, win_loss_ratio, fractions, n_paths, n_bets):
+    """simulate_bankroll, reused across reruns while the Kelly inputs are unchanged."""
+    return simulate_bankroll(win_prob, win_loss_ratio, fractions, n_paths=n_paths, n_bets=n_bets)
 
 with mobile_container():
     st.title("Derivatives & Options Calculator")
@@ -22,11 +34,34 @@ with mobile_container():
         format_func=lambda x: coin_choices[x],
         help="Start typing to search for supported coins."
     )
+    # --- Historical volatility of the selected asset prefills sigma ---
+    sigma_default = 0.5
+    vol_table = get_volatility_term_structure(asset) if asset else None
+    if vol_table is not None:
+        with st.expander("Historical Volatility (prefills sigma)"):
+            available = [e for e in ESTIMATORS if vol_table.loc[e, "volatility"].notna().any()] if not vol_table.empty else []
+            vol_estimator = st.selectbox(
+                "Volatility Estimator", available, format_func=ESTIMATOR_LABELS.get,
+                index=available.index("yang_zhang") if "yang_zhang" in available else 0,
+                help="Range-based estimators (Parkinson, Garman-Klass, Yang-Zhang) use high/low prices and are more efficient than close-to-close."
+            )
+            windows = vol_table.loc[vol_estimator].dropna().index.tolist() if vol_estimator else []
+            if windows:
+                vol_window = st.select_slider("Estimation Window (days)", options=windows, value=30 if 30 in windows else windows[-1])
+                sigma_default = round(float(vol_table.loc[(vol_estimator, vol_window), "volatility"]), 4)
+                term_fig = go.Figure()
+                for est in available:
+                    curve = vol_table.loc[est, "volatility"].dropna()
+                    term_fig.add_trace(go.Scatter(x=curve.index, y=curve.values, mode='lines+markers', name=ESTIMATOR_LABELS[est]))
+                term_fig.update_layout(xaxis_title='Window (days)', yaxis_title='Annualised Volatility', title=f'Volatility Term Structure: {coin_choices[asset]}')
+                st.plotly_chart(term_fig, use_container_width=True)
+                st.caption(f"Sigma inputs below default to {sigma_default:.2%} ({ESTIMATOR_LABELS[vol_estimator]}, {vol_window}d).")
     model = st.selectbox("Choose Model", [
         "Black-Scholes (European Option)",
         "Binomial Tree (American Option)",
         "Kelly Criterion (Position Sizing)",
-        "Monte Carlo (Option Pricing)"
+        "Monte Carlo (Option Pricing)",
+        "Option Book (Portfolio Greeks)"
     ], help="Select a derivatives model. See the Education page for details.")
 
     try:
@@ -35,7 +70,7 @@ with mobile_container():
             K = st.number_input("Strike Price (K)", min_value=0.0, value=100.0, help="Strike price of the option contract.")
             T = st.number_input("Time to Expiry (years, T)", min_value=0.01, value=0.5, help="Time until expiry, in years.")
             r = st.number_input("Risk-Free Rate (r, decimal)", min_value=0.0, value=0.01, help="Annualized risk-free interest rate. E.g., 0.05 for 5%.")
-            sigma = st.number_input("Volatility (sigma, decimal)", min_value=0.0, value=0.5, help="Annualized volatility of the underlying asset. E.g., 0.7 for 70%.")
+            sigma = st.number_input("Volatility (sigma, decimal)", min_value=0.0, value=sigma_default, help="Annualized volatility of the underlying asset. E.g., 0.7 for 70%.")
             option_type = st.selectbox("Option Type", ["call", "put"], help="Call = right to buy, Put = right to sell.")
             if st.button("Calculate Black-Scholes Price", help="Compute the theoretical option price using Black-Scholes model."):
                 try:
@@ -65,8 +100,7 @@ with mobile_container():
             fig.update_layout(xaxis_title='Spot Price', yaxis_title='Option Price', title='Option Price vs Spot Price')
             st.plotly_chart(fig, use_container_width=True)
             # Download option price scenario
-            csv = "Spot,OptionPrice\n" + "\n".join(f"{s},{p}" for s,p in zip(spot_prices, prices))
-            st.download_button("Download Price Scenario (CSV)", csv.encode(), file_name="option_price_scenario.csv", mime="text/csv")
+            st.download_button("Download Price Scenario (CSV)", csv_payload(pd.DataFrame({"Spot": spot_prices, "OptionPrice": prices})), file_name="option_price_scenario.csv", mime="text/csv")
             # Greeks scenario
             greeks_data = {g: [] for g in ["delta", "gamma", "vega", "theta", "rho"]}
             for s in spot_prices:
@@ -80,15 +114,10 @@ with mobile_container():
             st.plotly_chart(greeks_fig, use_container_width=True)
             # Download Greeks scenario
             greeks_df = pd.DataFrame({"Spot": spot_prices, **greeks_data})
-            greeks_csv = greeks_df.to_csv(index=False)
-            st.download_button("Download Greeks Scenario (CSV)", greeks_csv.encode(), file_name="option_greeks_scenario.csv", mime="text/csv")
+            st.download_button("Download Greeks Scenario (CSV)", csv_payload(greeks_df), file_name="option_greeks_scenario.csv", mime="text/csv")
             # Export chart as PNG
-            buf = BytesIO()
-            fig.write_image(buf, format="png")
-            st.download_button("Download Option Price Chart (PNG)", buf.getvalue(), file_name="option_price_chart.png", mime="image/png")
-            buf2 = BytesIO()
-            greeks_fig.write_image(buf2, format="png")
-            st.download_button("Download Greeks Chart (PNG)", buf2.getvalue(), file_name="option_greeks_chart.png", mime="image/png")
+            image_download_button(fig, "Download Option Price Chart (PNG)", "option_price_chart.png", key="option_price_chart")
+            image_download_button(greeks_fig, "Download Greeks Chart (PNG)", "option_greeks_chart.png", key="option_greeks_chart")
             st.caption("You can download scenario data and charts for further analysis or reporting.")
             st.markdown("---")
             st.caption("Try adjusting expiry or interest rate for advanced scenario analysis.")
@@ -99,9 +128,7 @@ with mobile_container():
             fig3.update_layout(xaxis_title='Days to Expiry', yaxis_title='Option Price', title='Option Price vs Expiry')
             st.plotly_chart(fig3, use_container_width=True)
             st.caption("See how the option price decays as expiry approaches (theta decay). Download for further analysis.")
-            buf3 = BytesIO()
-            fig3.write_image(buf3, format="png")
-            st.download_button("Download Expiry Chart (PNG)", buf3.getvalue(), file_name="option_expiry_chart.png", mime="image/png")
+            image_download_button(fig3, "Download Expiry Chart (PNG)", "option_expiry_chart.png", key="option_expiry_chart")
             st.markdown("---")
             st.subheader("Advanced: 3D Surface Plot - Option Price vs Spot & Volatility")
             st.caption("Visualize how option price changes with both spot price and volatility. Useful for sensitivity analysis and risk management. See the Education page for interpretation.")
@@ -120,16 +147,14 @@ with mobile_container():
             )
             st.plotly_chart(fig4, use_container_width=True)
             st.caption("Hover to see exact values. Download for presentations or research.")
-            buf4 = BytesIO()
-            fig4.write_image(buf4, format="png")
-            st.download_button("Download 3D Surface Chart (PNG)", buf4.getvalue(), file_name="option_surface_chart.png", mime="image/png")
+            image_download_button(fig4, "Download 3D Surface Chart (PNG)", "option_surface_chart.png", key="option_surface_chart")
 
         elif model == "Binomial Tree (American Option)":
             S = st.number_input("Spot Price (S)", min_value=0.0, value=100.0, key="bin_s", help="Current price of the underlying asset.")
             K = st.number_input("Strike Price (K)", min_value=0.0, value=100.0, key="bin_k", help="Strike price of the option contract.")
             T = st.number_input("Time to Expiry (years, T)", min_value=0.01, value=0.5, key="bin_t", help="Time until expiry, in years.")
             r = st.number_input("Risk-Free Rate (r, decimal)", min_value=0.0, value=0.01, key="bin_r", help="Annualized risk-free interest rate. E.g., 0.05 for 5%.")
-            sigma = st.number_input("Volatility (sigma, decimal)", min_value=0.0, value=0.5, key="bin_sigma", help="Annualized volatility of the underlying asset. E.g., 0.7 for 70%.")
+            sigma = st.number_input("Volatility (sigma, decimal)", min_value=0.0, value=sigma_default, key="bin_sigma", help="Annualized volatility of the underlying asset. E.g., 0.7 for 70%.")
             steps = st.slider("Tree Steps", 10, 200, 50, help="Number of steps in the binomial tree.")
             option_type = st.selectbox("Option Type", ["call", "put"], key="bin_type", help="Call = right to buy, Put = right to sell.")
             if st.button("Calculate Binomial Tree Price", help="Compute the theoretical option price using binomial tree model."):
@@ -148,33 +173,43 @@ with mobile_container():
             fig.update_layout(xaxis_title='Spot Price', yaxis_title='Option Price', title='Binomial Option Price vs Spot Price')
             st.plotly_chart(fig, use_container_width=True)
             # Download option price scenario
-            csv = "Spot,OptionPrice\n" + "\n".join(f"{s},{p}" for s,p in zip(spot_prices, prices))
-            st.download_button("Download Price Scenario (CSV)", csv.encode(), file_name="binomial_option_price_scenario.csv", mime="text/csv")
+            st.download_button("Download Price Scenario (CSV)", csv_payload(pd.DataFrame({"Spot": spot_prices, "OptionPrice": prices})), file_name="binomial_option_price_scenario.csv", mime="text/csv")
             # Export chart as PNG
-            buf = BytesIO()
-            fig.write_image(buf, format="png")
-            st.download_button("Download Binomial Option Price Chart (PNG)", buf.getvalue(), file_name="binomial_option_price_chart.png", mime="image/png")
+            image_download_button(fig, "Download Binomial Option Price Chart (PNG)", "binomial_option_price_chart.png", key="binomial_option_price_chart")
 
         elif model == "Monte Carlo (Option Pricing)":
             S = st.number_input("Spot Price (S)", min_value=0.0, value=100.0, key="mc_s", help="Current price of the underlying asset.")
             K = st.number_input("Strike Price (K)", min_value=0.0, value=100.0, key="mc_k", help="Strike price of the option contract.")
             T = st.number_input("Time to Expiry (years, T)", min_value=0.01, value=0.5, key="mc_t", help="Time until expiry, in years.")
             r = st.number_input("Risk-Free Rate (r, decimal)", min_value=0.0, value=0.01, key="mc_r", help="Annualized risk-free interest rate. E.g., 0.05 for 5%.")
-            sigma = st.number_input("Volatility (sigma, decimal)", min_value=0.0, value=0.5, key="mc_sigma", help="Annualized volatility of the underlying asset. E.g., 0.7 for 70%.")
+            sigma = st.number_input("Volatility (sigma, decimal)", min_value=0.0, value=sigma_default, key="mc_sigma", help="Annualized volatility of the underlying asset. E.g., 0.7 for 70%.")
             n_sim = st.number_input("Simulations", min_value=100, max_value=100000, value=10000, step=100, help="Number of simulations for Monte Carlo pricing.")
             option_type = st.selectbox("Option Type", ["call", "put"], key="mc_type", help="Call = right to buy, Put = right to sell.")
+            sampling = st.selectbox(
+                "Sampling", SAMPLING_MODES, key="mc_sampling",
+                format_func=lambda x: {"pseudo": "Pseudo-random (plain MC)", "sobol": "Sobol (quasi-Monte Carlo)"}[x],
+                help="Sobol sampling spreads points evenly and typically needs far fewer simulations for the same accuracy."
+            )
+            payoff_kind = st.selectbox("Payoff", ["European", "Asian (arithmetic average)"], key="mc_payoff", help="Asian options are path-based: the payoff uses the average price over the option's life.")
             if st.button("Run Monte Carlo Simulation", help="Compute the theoretical option price using Monte Carlo simulation."):
                 try:
-                    price = monte_carlo_option_price(S, K, T, r, sigma, int(n_sim), option_type)
-                    st.success(f"Monte Carlo {option_type.capitalize()} Price: {price:.4f}")
+                    if payoff_kind == "European":
+                        price, stderr, used = price_terminal_option(S, K, T, r, sigma, int(n_sim), option_type, sampling)
+                    else:
+                        price, stderr, used = price_path_option(asian_payoff(K, option_type), S, T, r, sigma, 64, int(n_sim), sampling)
+                    st.success(f"Monte Carlo {option_type.capitalize()} Price: {price:.4f} ± {stderr:.4f} (std. error, {used} samples)")
                 except Exception as e:
                     st.error(f"Error running Monte Carlo simulation: {e}")
+            with st.expander("Benchmark: samples needed, plain MC vs Sobol QMC"):
+                st.caption("Doubles the sample count until each method reaches the target standard error.")
+                target_se = st.number_input("Target standard error", min_value=0.001, value=0.05, step=0.01, format="%.3f", key="mc_target_se")
+                if st.button("Run Benchmark", key="mc_bench"):
+                    bench = qmc_convergence_benchmark(S, K, T, r, sigma, target_se)
+                    st.dataframe(pd.DataFrame(bench), use_container_width=True, hide_index=True)
             # --- Visualization: Price Distribution ---
             st.subheader("Scenario: Simulated Payoff Distribution")
             st.caption("Explore the distribution of simulated payoffs.")
-            import numpy as np
-            np.random.seed(42)
-            ST = S * np.exp((r - 0.5 * sigma ** 2) * T + sigma * np.sqrt(T) * np.random.randn(int(n_sim)))
+            ST = gbm_terminal_prices(S, T, r, sigma, standard_normals(int(n_sim), 1, sampling)[:, 0])
             if option_type == "call":
                 payoffs = np.maximum(ST - K, 0)
             else:
@@ -183,12 +218,11 @@ with mobile_container():
             fig.update_layout(xaxis_title='Payoff', yaxis_title='Frequency', title='Monte Carlo Simulated Payoff Distribution')
             st.plotly_chart(fig, use_container_width=True)
             # Download payoff distribution
-            csv = "Payoff,Frequency\n" + "\n".join(f"{p},{f}" for p,f in zip(fig.data[0].x, fig.data[0].y))
-            st.download_button("Download Payoff Distribution (CSV)", csv.encode(), file_name="monte_carlo_payoff_distribution.csv", mime="text/csv")
+            counts, edges = np.histogram(payoffs, bins=50)
+            payoff_hist = pd.DataFrame({"Payoff": (edges[:-1] + edges[1:]) / 2, "Frequency": counts})
+            st.download_button("Download Payoff Distribution (CSV)", csv_payload(payoff_hist), file_name="monte_carlo_payoff_distribution.csv", mime="text/csv")
             # Export chart as PNG
-            buf = BytesIO()
-            fig.write_image(buf, format="png")
-            st.download_button("Download Monte Carlo Payoff Distribution Chart (PNG)", buf.getvalue(), file_name="monte_carlo_payoff_distribution_chart.png", mime="image/png")
+            image_download_button(fig, "Download Monte Carlo Payoff Distribution Chart (PNG)", "monte_carlo_payoff_distribution_chart.png", key="monte_carlo_payoff_distribution_chart")
 
         elif model == "Kelly Criterion (Position Sizing)":
             win_prob = st.number_input("Win Probability (0-1)", min_value=0.0, max_value=1.0, value=0.55, help="Probability of winning the trade.")
@@ -208,12 +242,113 @@ with mobile_container():
             fig.update_layout(xaxis_title='Win Probability', yaxis_title='Kelly Fraction', title='Kelly Fraction vs Win Probability')
             st.plotly_chart(fig, use_container_width=True)
             # Download Kelly fraction scenario
-            csv = "WinProbability,KellyFraction\n" + "\n".join(f"{p},{f}" for p,f in zip(win_probs, fractions))
-            st.download_button("Download Kelly Fraction Scenario (CSV)", csv.encode(), file_name="kelly_fraction_scenario.csv", mime="text/csv")
+            st.download_button("Download Kelly Fraction Scenario (CSV)", csv_payload(pd.DataFrame({"WinProbability": win_probs, "KellyFraction": fractions})), file_name="kelly_fraction_scenario.csv", mime="text/csv")
             # Export chart as PNG
-            buf = BytesIO()
-            fig.write_image(buf, format="png")
-            st.download_button("Download Kelly Fraction Chart (PNG)", buf.getvalue(), file_name="kelly_fraction_chart.png", mime="image/png")
+            image_download_button(fig, "Download Kelly Fraction Chart (PNG)", "kelly_fraction_chart.png", key="kelly_fraction_chart")
+            st.markdown("---")
+            st.subheader("Bankroll Growth Simulation")
+            st.caption("Simulates thousands of bet sequences for full, half and quarter Kelly (plus custom fractions). All strategies see the same wins and losses.")
+            full_kelly = kelly_criterion(win_prob, win_loss_ratio)
+            custom_fraction = st.number_input("Custom Fraction (0 = none)", min_value=0.0, max_value=1.0, value=0.0, step=0.05, key="kelly_custom", help="Extra fixed fraction of bankroll to compare against Kelly sizing.")
+            n_paths = st.slider("Simulated Paths", 100, 10000, 2000, step=100, key="kelly_paths")
+            n_bets = st.slider("Bets per Path", 10, 1000, 250, step=10, key="kelly_bets")
+            fraction_grid = kelly_fraction_grid(full_kelly, custom=[custom_fraction] if custom_fraction > 0 else None)
+            with st.spinner("Simulating bankroll paths..."):
+                sim = cached_bankroll_simulation(win_prob, win_loss_ratio, fraction_grid, n_paths, n_bets)
+            growth_fig = go.Figure()
+            for label in fraction_grid:
+                curve = sim["percentiles"].xs(label, level="fraction")
+                growth_fig.add_trace(go.Scatter(x=curve.index, y=curve[95], mode='lines', line=dict(width=0), showlegend=False, hoverinfo='skip', legendgroup=label))
+                growth_fig.add_trace(go.Scatter(x=curve.index, y=curve[5], mode='lines', line=dict(width=0), fill='tonexty', opacity=0.2, name=f"{label} (5-95%)", legendgroup=label))
+                growth_fig.add_trace(go.Scatter(x=curve.index, y=curve[50], mode='lines', name=f"{label} (median)", legendgroup=label))
+            growth_fig.update_layout(xaxis_title='Bet Number', yaxis_title='Bankroll Multiple', yaxis_type='log', title='Bankroll Growth: Median and 5-95% Band')
+            st.plotly_chart(growth_fig, use_container_width=True)
+            st.dataframe(sim["summary"], use_container_width=True)
+            st.caption("Mean log growth averages the paths whose bankroll was not wiped out (-inf if none survive); prob_ruin is the share of paths that fell to 1% of the starting bankroll.")
+            dd_fig = go.Figure()
+            for label in fraction_grid:
+                dd_fig.add_trace(go.Histogram(x=sim["max_drawdowns"][label], name=label, opacity=0.6, nbinsx=50))
+            dd_fig.update_layout(barmode='overlay', xaxis_title='Maximum Drawdown', yaxis_title='Paths', title='Maximum Drawdown Distribution')
+            st.plotly_chart(dd_fig, use_container_width=True)
+            st.caption("Full Kelly maximises long-run growth but comes with deep drawdowns; fractional Kelly trades some growth for a much smoother ride.")
+
+            st.markdown("---")
+            st.subheader("Multi-Outcome Kelly")
+            st.caption("For bets with more than two outcomes. Returns are per unit staked: 2.0 = +200%, -1.0 = total loss.")
+            outcomes = st.data_editor(
+                pd.DataFrame({"probability": [0.2, 0.5, 0.3], "return": [3.0, 0.1, -1.0]}),
+                num_rows="dynamic", key="kelly_outcomes", use_container_width=True
+            ).dropna()
+            if not outcomes.empty and outcomes["probability"].sum() > 0:
+                multi_fraction, multi_growth = kelly_multi_outcome(outcomes["probability"], outcomes["return"])
+                st.success(f"Optimal Fraction: {multi_fraction:.4f} (expected log growth per bet: {multi_growth:.4f})")
+
+            st.markdown("---")
+            st.subheader("Multi-Asset Kelly (Historical Returns)")
+            st.caption("Growth-optimal long-only weights estimated from each coin's daily return history. Past returns are a noisy guide; consider scaling the result down.")
+            kelly_assets = st.multiselect(
+                "Assets", options=list(coin_choices.keys()), format_func=lambda x: coin_choices[x],
+                key="kelly_assets", help="Pick two or more coins."
+            )
+            kelly_days = st.slider("History (days)", 30, 365, 90, key="kelly_days")
+            if len(kelly_assets) >= 2:
+                histories = {a: get_price_history(a, days=kelly_days) for a in kelly_assets}
+                price_dict = {coin_choices[a]: h.set_index("date")["price"] for a, h in histories.items() if h is not None and not h.empty}
+                returns = return_panel(price_dict)
+                if len(returns) > len(price_dict):
+                    weights, growth = kelly_multi_asset(returns)
+                    st.dataframe(weights.to_frame(), use_container_width=True)
+                    st.caption(f"Mean daily log growth at these weights: {growth:.5f}. Unallocated weight stays in cash.")
+                else:
+                    st.info("Not enough overlapping history for the selected assets.")
+
+        elif model == "Option Book (Portfolio Greeks)":
+            st.caption("Price a whole book of option positions at once and aggregate Greeks by underlying and expiry. Negative quantity = short.")
+            uploaded_book = st.file_uploader("Upload Positions CSV", type=["csv"], help="Columns: underlying, option_type, strike, expiry, quantity, spot, sigma; optional r, style (european/american).")
+            today = pd.Timestamp.now().normalize()
+            if uploaded_book:
+                raw_positions = pd.read_csv(uploaded_book)
+            else:
+                raw_positions = pd.DataFrame({
+                    "underlying": [asset or "dogecoin"] * 3 + ["pepe"] * 2,
+                    "option_type": ["call", "put", "call", "call", "put"],
+                    "strike": [110.0, 90.0, 150.0, 100.0, 80.0],
+                    "expiry": [today + pd.Timedelta(days=d) for d in (30, 30, 90, 60, 60)],
+                    "quantity": [10, -5, -20, 8, 4],
+                    "spot": [100.0] * 5,
+                    "sigma": [sigma_default] * 3 + [1.2] * 2,
+                    "style": ["european", "american", "european", "european", "american"],
+                })
+            raw_positions = st.data_editor(raw_positions, num_rows="dynamic", key="book_positions", use_container_width=True)
+            book_model = st.selectbox("Valuation Model", ["black_scholes", "binomial"], format_func={"black_scholes": "Black-Scholes (European)", "binomial": "Binomial Lattice (honours American style)"}.get, key="book_model")
+            book_steps = st.slider("Lattice Steps", 20, 400, 100, key="book_steps") if book_model == "binomial" else 100
+            try:
+                positions = load_positions(raw_positions.dropna(how="all"), valuation_date=today)
+                book = price_book(positions, book_model, book_steps)
+                st.subheader("Priced Positions")
+                st.dataframe(book[["underlying", "option_type", "strike", "expiry", "quantity", "price", "market_value"] + GREEKS], use_container_width=True, hide_index=True)
+                st.download_button("Download Priced Book (CSV)", csv_payload(book), file_name="option_book.csv", mime="text/csv")
+                st.subheader("Book Greeks by Underlying")
+                st.dataframe(aggregate_greeks(book, by=["underlying"]), use_container_width=True)
+                st.subheader("Book Greeks by Underlying & Expiry")
+                st.dataframe(aggregate_greeks(book), use_container_width=True)
+                st.subheader("Shock Grid: Book P&L vs Spot & Volatility")
+                st.caption("Every underlying moves by the same relative spot shock; vol shocks are absolute changes in sigma.")
+                spot_max = st.slider("Spot Shock Range (±%)", 5, 90, 50, step=5, key="book_spot_range")
+                vol_max = st.slider("Vol Shock Range (± vol points)", 5, 100, 30, step=5, key="book_vol_range")
+                grid = shock_grid(positions, np.linspace(-spot_max, spot_max, 11) / 100, np.linspace(-vol_max, vol_max, 7) / 100, book_model, book_steps)
+                grid_underlying = st.selectbox("Show P&L for", ["Whole book"] + sorted(positions["underlying"].unique()), key="book_grid_underlying")
+                grid_view = grid if grid_underlying == "Whole book" else grid[grid["underlying"] == grid_underlying]
+                matrix = shock_matrix(grid_view)
+                grid_fig = px.imshow(
+                    matrix.values, x=[f"{v:+.0%}" for v in matrix.columns], y=[f"{s:+.0%}" for s in matrix.index],
+                    color_continuous_scale="RdYlGn", color_continuous_midpoint=0, text_auto=".1f", aspect="auto",
+                    labels={"x": "Vol Shock", "y": "Spot Shock", "color": "P&L"}, title=f"Shocked P&L: {grid_underlying}"
+                )
+                st.plotly_chart(grid_fig, use_container_width=True)
+                st.download_button("Download Shock Grid (CSV)", csv_payload(grid), file_name="option_book_shock_grid.csv", mime="text/csv")
+            except Exception as e:
+                st.error(f"Error pricing option book: {e}")
 
         st.caption("Learn more about these models on the [Education page](/Education). Calculators are for educational purposes only.")
         st.markdown("""
@@ -1,25 +1,65 @@
 import streamlit as st
 import pandas as pd
-import os
-from datetime import datetime
+import plotly.express as px
 from main import fetch_coin_history, fetch_large_cap_coins, fetch_live_meme_coins
-from utils.coin_utils import get_coin_choices
+from utils.coin_utils import get_coin_choices, get_risk_model, get_portfolio_store, get_portfolio_nav, get_portfolio_summary, get_optimal_weights, get_portfolio_var, get_stress_tests
+from utils.risk_model import portfolio_risk
+from utils.optimiser import METHOD_LABELS
+from utils.stress import SCENARIO_TYPES, load_scenarios, save_scenarios
 from utils.ui import mobile_container, mobile_spacer
 
-DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
-PORTFOLIO_CSV = os.path.join(DATA_DIR, 'portfolios.csv')
+def render_stress_tests(store):
+    st.caption("Apply shock scenarios to every holding of every saved portfolio. Beta scenarios spread a driver's move to all coins through the risk-model factor loadings; historical ones replay a past window.")
+    library = load_scenarios()
+    names = [s["name"] for s in library]
+    chosen = st.multiselect("Scenarios", names, default=names)
+    holdings = store.holdings()
+    if st.button("Run Stress Tests") and chosen and not holdings.empty:
+        try:
+            stress = get_stress_tests(holdings, [s for s in library if s["name"] in chosen], days=90)
+        except ValueError as e:
+            stress = None
+            st.warning(str(e))
+        if stress is not None:
+            fig = px.imshow(stress["pnl_pct"], text_auto=".1%", color_continuous_scale="RdYlGn", color_continuous_midpoint=0,
+                            labels={"x": "Scenario", "y": "Portfolio", "color": "P&L"}, title="Scenario P&L (% of portfolio value)")
+            st.plotly_chart(fig, use_container_width=True)
+            st.dataframe(stress["pnl"].style.format("${:,.2f}"), use_container_width=True)
+            with st.expander("Shock per coin"):
+                st.dataframe(stress["shocks"].T.style.format("{:+.1%}"), use_container_width=True)
 
-if not os.path.exists(DATA_DIR):
-    os.makedirs(DATA_DIR)
-
-def load_portfolios():
-    if os.path.exists(PORTFOLIO_CSV):
-        return pd.read_csv(PORTFOLIO_CSV)
+    st.write("Add Scenario:")
+    kind = st.selectbox("Type", SCENARIO_TYPES, format_func=str.title)
+    name = st.text_input("Scenario Name")
+    coin_choices = get_coin_choices()
+    if kind in ("absolute", "beta"):
+        c1, c2 = st.columns(2)
+        coin = c1.selectbox("Coin", list(coin_choices.keys()), format_func=lambda x: coin_choices[x], key="stress_coin")
+        shock = c2.slider("Shock (%)", -90, 100, -30) / 100
+        if kind == "beta":
+            scenario = {"name": name, "type": "beta", "drivers": {coin: shock}, "multipliers": {},
+                        "meme_multiplier": st.number_input("Meme coin beta multiplier", 0.0, 5.0, 2.0, 0.5)}
+        else:
+            scenario = {"name": name, "type": "absolute", "shocks": {coin: shock}, "default": 0.0}
+    elif kind == "relative":
+        c1, c2 = st.columns(2)
+        scenario = {"name": name, "type": "relative", "sigmas": {}, "default": c1.slider("Move (sigmas)", -6.0, 6.0, -3.0, 0.5),
+                    "horizon": c2.selectbox("Horizon (days)", [1, 7, 30], key="stress_horizon")}
     else:
-        return pd.DataFrame(columns=["portfolio", "asset", "type", "amount", "added_on"])
-
-def save_portfolios(df):
-    df.to_csv(PORTFOLIO_CSV, index=False)
+        window = st.radio("Window", ["Worst window in history", "Dates"], horizontal=True)
+        if window == "Dates":
+            c1, c2 = st.columns(2)
+            scenario = {"name": name, "type": "historical", "start": str(c1.date_input("Start")), "end": str(c2.date_input("End"))}
+        else:
+            scenario = {"name": name, "type": "historical", "worst_window": st.selectbox("Window length (days)", [1, 7, 30])}
+    c1, c2 = st.columns(2)
+    if c1.button("Save Scenario") and name:
+        save_scenarios([s for s in library if s["name"] != name] + [scenario])
+        st.rerun()
+    drop = c2.selectbox("Delete Scenario", names)
+    if c2.button("Delete") and drop:
+        save_scenarios([s for s in library if s["name"] != drop])
+        st.rerun()
 
 def main():
     try:
@@ -31,17 +71,29 @@ def main():
             st.caption("ℹ️ Portfolio health and diversification tips are available on the Education page.")
             mobile_spacer(8)
 
-            df = load_portfolios()
-            portfolios = df['portfolio'].unique().tolist() if not df.empty else []
+            store = get_portfolio_store()
+            portfolios = store.list_portfolios()
+            if portfolios:
+                with st.expander(f"All Portfolios ({len(portfolios)})"):
+                    overview = []
+                    for name in portfolios:
+                        summary = get_portfolio_summary(name, days=90)
+                        if summary is not None:
+                            overview.append({"portfolio": name, **summary})
+                    if overview:
+                        st.dataframe(pd.DataFrame(overview).style.format({"nav": "${:,.2f}", "change_1d": "{:+.2%}", "total_pnl": "${:,.2f}", "total_return": "{:+.2%}"}),
+                                     use_container_width=True, hide_index=True)
+                    else:
+                        st.info("No holdings to value yet.")
+                with st.expander("Stress Tests (all portfolios)"):
+                    render_stress_tests(store)
             selected_portfolio = st.selectbox("Select Portfolio", portfolios + ["Create New"], index=0)
 
             if selected_portfolio == "Create New":
                 new_name = st.text_input("New Portfolio Name")
                 if st.button("Create Portfolio") and new_name:
-                    if new_name not in portfolios:
-                        df = pd.concat([df, pd.DataFrame([[new_name, '', '', 0, datetime.now()]], columns=df.columns)])
-                        save_portfolios(df)
-                        st.experimental_rerun()
+                    if store.create_portfolio(new_name):
+                        st.rerun()
                     else:
                         st.warning("Portfolio with this name already exists.")
                 st.stop()
@@ -56,18 +108,16 @@ def main():
             )
             amount = st.number_input("Amount Held", min_value=0.0, format="%f", help="How much of this asset do you hold?")
             if st.button("Add Asset") and add_asset:
-                df = pd.concat([df, pd.DataFrame([[selected_portfolio, add_asset, "coin", amount, datetime.now()]], columns=df.columns)])
-                save_portfolios(df)
-                st.experimental_rerun()
+                store.add_holding(selected_portfolio, add_asset, amount)
+                st.rerun()
 
-            port_df = df[df['portfolio'] == selected_portfolio & (df['asset'] != '')]
+            port_df = store.holdings(selected_portfolio)
             if not port_df.empty:
                 st.dataframe(port_df[['asset', 'amount', 'added_on']])
                 remove_asset = st.selectbox("Remove Asset", port_df['asset'].tolist())
                 if st.button("Remove Selected Asset"):
-                    df = df[~((df['portfolio'] == selected_portfolio) & (df['asset'] == remove_asset))]
-                    save_portfolios(df)
-                    st.experimental_rerun()
+                    store.remove_holding(selected_portfolio, remove_asset)
+                    st.rerun()
 
                 # Portfolio analytics
                 st.subheader("Portfolio Performance & Risk Metrics")
@@ -83,21 +133,97 @@ def main():
                     st.write("Historical Returns:")
                     returns = prices_df.pct_change().dropna()
                     st.dataframe(returns.describe().T)
-                    st.write("Portfolio Value (equal-weighted):")
-                    port_val = prices_df.mean(axis=1)
-                    st.line_chart(port_val)
+                    nav = get_portfolio_nav(selected_portfolio, days=90)
+                    if nav is not None and not nav["nav"].empty:
+                        summary = get_portfolio_summary(selected_portfolio, days=90)
+                        c1, c2, c3 = st.columns(3)
+                        c1.metric("Net Asset Value", f"${summary['nav']:,.2f}", f"{summary['change_1d']:+.2%}" if pd.notna(summary['change_1d']) else None)
+                        c2.metric("Total P&L", f"${summary['total_pnl']:,.2f}")
+                        c3.metric("Return (flow-adjusted)", f"{summary['total_return']:+.2%}" if pd.notna(summary['total_return']) else "-")
+                        st.write("Portfolio Value (holdings x price):")
+                        st.line_chart(nav["nav"])
+                        st.write("Cumulative P&L by Asset:")
+                        st.line_chart(nav["pnl"].cumsum())
+                        st.write("Return Contribution by Asset:")
+                        contrib = pd.DataFrame({"P&L": nav["total_pnl"], "Contribution": nav["contribution"].sum(), "Value": nav["values"].iloc[-1]})
+                        st.dataframe(contrib.style.format({"P&L": "${:,.2f}", "Contribution": "{:+.2%}", "Value": "${:,.2f}"}))
+                    model = get_risk_model(tuple(sorted(hist_data)), days=90, min_obs=10)
+                    if model is not None:
+                        st.write("Factor Risk (Ledoit-Wolf covariance, PCA factors):")
+                        holdings = port_df.groupby('asset')['amount'].sum()
+                        values = holdings * prices_df.ffill().iloc[-1].reindex(holdings.index)
+                        weights = values / values.sum() if values.sum() > 0 else holdings * 0 + 1 / len(holdings)
+                        risk = portfolio_risk(model, weights)
+                        c1, c2, c3 = st.columns(3)
+                        c1.metric("Portfolio Volatility", f"{risk['total_vol']:.0%}")
+                        c2.metric("Factor Volatility", f"{risk['factor_vol']:.0%}")
+                        c3.metric("Idiosyncratic Volatility", f"{risk['idio_vol']:.0%}")
+                    if len(hist_data) >= 2:
+                        st.subheader("Suggested Weights")
+                        c1, c2 = st.columns(2)
+                        method = c1.selectbox("Optimisation", list(METHOD_LABELS), format_func=METHOD_LABELS.get)
+                        max_weight = c2.slider("Max Weight per Coin", 0.1, 1.0, 1.0, step=0.05, help="Applies to minimum-variance and mean-variance.")
+                        risk_aversion = st.slider("Risk Aversion", 0.5, 50.0, 5.0) if method == "mean_variance" else 5.0
+                        max_weight = max(max_weight, 1 / len(hist_data))
+                        opt = get_optimal_weights(tuple(sorted(hist_data)), method, days=90, risk_aversion=risk_aversion,
+                                                  max_weight=max_weight, frontier_points=15, min_obs=10)
+                        if opt is None:
+                            st.info("Not enough price history to optimise.")
+                        else:
+                            current = weights.reindex(opt["weights"].index).fillna(0.0) if model is not None else None
+                            table = pd.DataFrame({"Suggested": opt["weights"], "Risk Contribution": opt["risk_contributions"]})
+                            if current is not None:
+                                table.insert(0, "Current", current)
+                            st.dataframe(table.style.format("{:.1%}"), use_container_width=True)
+                            c1, c2, c3 = st.columns(3)
+                            c1.metric("Expected Return (ann.)", f"{opt['expected_return']:.0%}")
+                            c2.metric("Volatility (ann.)", f"{opt['volatility']:.0%}")
+                            c3.metric("Diversification Ratio", f"{opt['diversification_ratio']:.2f}")
+                            frontier = opt["frontier"]
+                            fig = px.line(frontier, x="volatility", y="expected_return", markers=True, title="Efficient Frontier",
+                                          labels={"volatility": "Volatility (ann.)", "expected_return": "Expected Return (ann.)"})
+                            fig.add_scatter(x=[opt["volatility"]], y=[opt["expected_return"]], mode="markers", marker=dict(size=12, symbol="star"), name="Suggested")
+                            st.plotly_chart(fig, use_container_width=True)
+                            st.caption("Covariance: Ledoit-Wolf shrinkage. Expected returns are trailing 90-day averages and very noisy for meme coins; treat mean-variance weights with care.")
+                    if nav is not None and nav["values"].iloc[-1].sum() > 0:
+                        st.subheader("Value at Risk (Monte Carlo)")
+                        st.caption("Simulates correlated returns for the whole portfolio. Gaussian uses a Cholesky factor of the shrunk covariance; Filtered Historical resamples past days rescaled to today's volatility, keeping fat tails.")
+                        c1, c2, c3, c4 = st.columns(4)
+                        var_method = c1.selectbox("Method", ["gaussian", "fhs"], format_func={"gaussian": "Gaussian (Cholesky)", "fhs": "Filtered Historical"}.get)
+                        n_scenarios = c2.selectbox("Scenarios", [10_000, 100_000, 1_000_000], index=1, format_func="{:,}".format)
+                        confidence = c3.selectbox("Confidence", [0.95, 0.99], format_func="{:.0%}".format)
+                        horizon = c4.selectbox("Horizon (days)", [1, 5, 10, 30])
+                        if st.button("Run Simulation"):
+                            book = nav["values"].iloc[-1]
+                            book = tuple((a, float(v)) for a, v in book[book > 0].items())
+                            with st.spinner(f"Simulating {n_scenarios:,} scenarios..."):
+                                sim = get_portfolio_var(book, var_method, n_scenarios, confidence, horizon, days=90)
+                            if sim is None:
+                                st.info("Not enough price history to simulate.")
+                            else:
+                                c1, c2, c3 = st.columns(3)
+                                c1.metric(f"VaR {confidence:.0%} ({horizon}d)", f"${sim['var']:,.2f}", f"{sim['var_pct']:.1%} of value", delta_color="off")
+                                c2.metric(f"CVaR {confidence:.0%} ({horizon}d)", f"${sim['cvar']:,.2f}", f"{sim['cvar_pct']:.1%} of value", delta_color="off")
+                                c3.metric("Parametric VaR (normal)", f"${sim['parametric']['var']:,.2f}")
+                                fig = px.histogram(x=-sim["loss_sample"], nbins=100, labels={"x": "Simulated P&L ($)"}, title="Simulated P&L Distribution")
+                                fig.add_vline(x=-sim["var"], line_dash="dash", line_color="red", annotation_text="VaR")
+                                st.plotly_chart(fig, use_container_width=True)
+                                st.write("Risk by Holding:")
+                                st.dataframe(sim["components"].style.format({"value": "${:,.2f}", "weight": "{:.1%}", "marginal_var": "{:.3f}",
+                                                                             "component_var": "${:,.2f}", "component_cvar": "${:,.2f}", "var_share": "{:.1%}"}),
+                                             use_container_width=True)
+                                st.caption(f"{sim['scenarios']:,} scenarios in {sim['seconds']:.1f}s. Component VaR sums to the portfolio VaR; marginal VaR is the VaR added per $1 more of a holding.")
                     st.write("Download Portfolio CSV:")
-                    st.download_button("Download CSV", port_df.to_csv(index=False), f"{selected_portfolio}_portfolio.csv", "text/csv")
+                    st.download_button("Download CSV", store.export_csv(selected_portfolio), f"{selected_portfolio}_portfolio.csv", "text/csv")
                     st.write("Upload Portfolio CSV:")
                     uploaded = st.file_uploader("Upload Portfolio CSV", type=["csv"])
-                    if uploaded:
-                        new_df = pd.read_csv(uploaded)
-                        new_df['portfolio'] = selected_portfolio
-                        df = df[df['portfolio'] != selected_portfolio]
-                        df = pd.concat([df, new_df])
-                        save_portfolios(df)
+                    # The uploader keeps its file across reruns, so each upload is imported once
+                    imported = st.session_state.setdefault("imported_uploads", set())
+                    if uploaded and uploaded.file_id not in imported:
+                        imported.add(uploaded.file_id)
+                        store.import_csv(uploaded, portfolio=selected_portfolio, replace=True)
                         st.success("Portfolio imported!")
-                        st.experimental_rerun()
+                        st.rerun()
             else:
                 st.info("No assets in this portfolio yet.")
 
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+from main import moving_average, calc_rsi
+from utils.backtest import (
+    state_from_signals, run_backtest, sma_crossover_positions, rsi_panel, rsi_threshold_positions
+)
+
+def _prices(n=200, k=4, seed=1):
+    rng = np.random.default_rng(seed)
+    idx = pd.date_range("2025-01-01", periods=n, freq="D")
+    return pd.DataFrame(100 * np.exp(np.cumsum(rng.normal(0, 0.04, (n, k)), axis=0)), index=idx, columns=[f"c{i}" for i in range(k)])
+
+def test_state_from_signals_holds_until_exit():
+    idx = range(6)
+    entries = pd.DataFrame({"a": [False, True, False, False, True, False]}, index=idx)
+    exits = pd.DataFrame({"a": [False, False, False, True, True, False]}, index=idx)
+    assert state_from_signals(entries, exits)["a"].tolist() == [0, 1, 1, 0, 0, 0]
+
+def test_strategies_match_single_series_indicators():
+    prices = _prices()
+    p = prices["c0"]
+    expected = (moving_average(p, 5) > moving_average(p, 20)).astype(float)
+    assert np.array_equal(sma_crossover_positions(prices, 5, 20)["c0"].values, expected.values)
+    assert np.allclose(rsi_panel(prices, 14)["c0"], calc_rsi(p, 14), equal_nan=True)
+
+def test_no_lookahead_and_costs():
+    prices = pd.DataFrame({"a": [100.0, 110.0, 121.0, 121.0]})
+    positions = pd.DataFrame({"a": [0.0, 1.0, 1.0, 0.0]})
+    result = run_backtest(prices, positions, fee_bps=10, slippage_bps=0)
+    # Entered at the close of bar 1, so only the 10% move into bar 2 is earned
+    assert np.allclose(result["returns"]["a"].values, [0.0, -0.001, 0.1, -0.001])
+    trades = result["trades"]
+    assert len(trades) == 1
+    assert np.isclose(trades["return"].iloc[0], 0.999 * 1.1 * 0.999 - 1)
+    assert np.isclose(result["equity"]["a"].iloc[-1], 1 + trades["return"].iloc[0])
+
+def test_trade_returns_compound_to_equity_for_every_column():
+    prices = _prices()
+    result = run_backtest(prices, rsi_threshold_positions(prices, 7, 65, 35))
+    for col in prices.columns:
+        trades = result["trades"][result["trades"]["asset"] == col]
+        assert np.isclose(np.prod(1 + trades["return"]), result["equity"][col].iloc[-1])
+
+def test_metrics_shape_and_buy_and_hold():
+    prices = _prices()
+    result = run_backtest(prices, pd.DataFrame(1.0, index=prices.index, columns=prices.columns), fee_bps=0, slippage_bps=0)
+    metrics = result["metrics"]
+    assert list(metrics.index) == list(prices.columns)
+    assert np.allclose(metrics["total_return"], prices.iloc[-1] / prices.iloc[0] - 1)
+    assert (metrics["trades"] == 1).all()
+    assert ((metrics["max_drawdown"] >= 0) & (metrics["max_drawdown"] <= 1)).all()
@@ -0,0 +1,48 @@
+import threading
+import time
+from utils.batch import default_factors, parse_line, run_batch
+from utils.scoring import score_record
+
+PREFILL = {"symbol": "pep", "market_cap": 2e6, "volume": 5e5, "community_score": 7, "public_interest_score": 0, "staking_apy": 0}
+
+def test_parse_line_and_defaults():
+    assert parse_line("  # comment") is None and parse_line("") is None
+    assert parse_line("pepe\n") == ("pepe", {})
+    assert parse_line('{"coin": "doge", "utility": true}') == ("doge", {"utility": True})
+    for bad in ['{"utility": true}', '{"coin": "x", "moon": 1}', "{not json"]:
+        try:
+            parse_line(bad)
+            assert False, bad
+        except ValueError:
+            pass
+    record = default_factors(PREFILL)
+    assert record["liquidity_usd"] == 2e6 and record["trending"] and not record["active_community"]
+    assert default_factors()["meme_virality"] == 3
+
+def test_streams_results_with_bounded_concurrency():
+    active, peak, lock = [0], [0], threading.Lock()
+
+    def fetch(coin):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.6 if coin == "slow" else 0.02)
+        with lock:
+            active[0] -= 1
+        if coin == "missing":
+            return None
+        if coin == "boom":
+            raise RuntimeError("rate limited")
+        return PREFILL
+
+    lines = ["slow", "pepe", '{"coin": "doge", "utility": true, "audited": true}', "", "missing", "boom", "{bad"] + ["c"] * 20
+    out = []
+    summary = run_batch(iter(lines), out.append, fetch=fetch, max_workers=3)
+    assert peak[0] <= 3
+    assert summary["coins"] == len(out) == 26 and summary["failed"] == 3 and summary["scored"] == 23
+    assert out[0]["line"] == 7 and "error" in out[0]          # malformed input is reported right away
+    assert out[-1]["coin"] == "slow"                          # results stream in completion order
+    doge = next(r for r in out if r["coin"] == "doge")
+    assert doge["score"] == score_record({**default_factors(PREFILL), "utility": True, "audited": True})[0]
+    errors = {r["line"]: r["error"] for r in out if "error" in r}
+    assert "RuntimeError: rate limited" == errors[6] and "LookupError" in errors[5]
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+from utils.clustering import (
+    panel_version, log_returns, correlation_matrix, cluster_universe, cluster_assignments, render_dendrogram_png
+)
+
+def _panel(n=120, seed=6):
+    rng = np.random.default_rng(seed)
+    base = rng.normal(0, 0.04, (n, 2))
+    # Two groups of three coins driven by different factors
+    X = np.hstack([base[:, [0]] + rng.normal(0, 0.01, (n, 3)), base[:, [1]] + rng.normal(0, 0.01, (n, 3))])
+    idx = pd.date_range("2025-01-01", periods=n, freq="D")
+    return pd.DataFrame(100 * np.exp(np.cumsum(X, axis=0)), index=idx, columns=["a1", "a2", "a3", "b1", "b2", "b3"])
+
+def test_correlation_matches_pandas_with_listing_gaps():
+    prices = _panel()
+    prices.iloc[:50, 4] = np.nan
+    rets = log_returns(prices)
+    assert np.allclose(correlation_matrix(rets).values, rets.corr(min_periods=10).values, equal_nan=True)
+    full = log_returns(_panel())
+    assert np.allclose(correlation_matrix(full).values, full.corr().values)
+
+def test_clusters_recover_groups_and_drop_short_histories():
+    prices = _panel()
+    prices["new"] = np.nan
+    prices.iloc[-5:, -1] = 1.0
+    clustering = cluster_universe(prices, window=90)
+    assert clustering["dropped"] == ["new"]
+    ids = cluster_assignments(clustering, 2)
+    assert ids[["a1", "a2", "a3"]].nunique() == 1 and ids[["b1", "b2", "b3"]].nunique() == 1
+    assert ids["a1"] != ids["b1"]
+    assert render_dendrogram_png(clustering)[:4] == b"\x89PNG"
+
+def test_panel_version_changes_with_data():
+    prices = _panel()
+    v = panel_version(prices)
+    assert v == panel_version(prices.copy())
+    changed = prices.copy()
+    changed.iloc[-1, 0] *= 1.01
+    assert v != panel_version(changed)
@@ -0,0 +1,59 @@
+import threading
+import time
+import pandas as pd
+import plotly.graph_objs as go
+from utils.export import ExportCache, figure_key, csv_payload
+
+def test_figure_key_tracks_spec():
+    fig = go.Figure(data=go.Scatter(x=[1, 2, 3], y=[4, 5, 6]))
+    same = go.Figure(data=go.Scatter(x=[1, 2, 3], y=[4, 5, 6]))
+    other = go.Figure(data=go.Scatter(x=[1, 2, 3], y=[4, 5, 7]))
+    assert figure_key(fig) == figure_key(same)
+    assert figure_key(fig) != figure_key(other)
+    assert figure_key(fig, "png") != figure_key(fig, "svg")
+
+def test_export_cache_renders_once_in_background():
+    cache = ExportCache(max_workers=1, max_items=2)
+    calls = []
+    def render(x):
+        calls.append(x)
+        time.sleep(0.05)
+        return b"png"
+    first = cache.submit("a", render, 1)
+    second = cache.submit("a", render, 1)
+    assert first is second
+    assert first.result() == b"png"
+    assert calls == [1]
+    cache.put("b", b"1")
+    cache.put("c", b"2")
+    assert cache.get("a") is None  # evicted, least recently used
+
+def test_failed_render_is_retried():
+    cache = ExportCache(max_workers=1)
+    attempts = []
+    def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("kaleido crashed")
+        return b"png"
+    failed = cache.submit("a", flaky)
+    assert isinstance(failed.exception(), RuntimeError)
+    retry = cache.submit("a", flaky)
+    assert retry is not failed and retry.result() == b"png"
+    cache.discard("a", failed)  # stale entry: the retry stays
+    assert cache.get("a") is retry
+    cache.discard("a", retry)
+    assert cache.get("a") is None
+
+def test_pending_jobs_are_bounded():
+    cache = ExportCache(max_workers=1, max_items=3)
+    release = threading.Event()
+    futures = [cache.submit(f"k{i}", release.wait, 5) for i in range(10)]
+    assert len(cache._items) == 3 and cache.get("k0") is None and cache.get("k9") is futures[-1]
+    release.set()
+    cache.pool.shutdown(wait=True)
+
+def test_csv_payload():
+    df = pd.DataFrame({"Spot": [1, 2], "OptionPrice": [0.5, 0.25]})
+    assert csv_payload(df) == b"Spot,OptionPrice\n1,0.5\n2,0.25\n"
+    assert csv_payload(df) is csv_payload(df)
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+from utils.features import FeaturePipeline, compute_features
+
+def _panels(T=160, N=5, seed=3):
+    rng = np.random.default_rng(seed)
+    idx = pd.date_range("2024-01-01", periods=T, freq="D")
+    cols = ["bitcoin"] + [f"c{i}" for i in range(N - 1)]
+    market = rng.normal(0, 0.03, (T, 1))
+    R = market * np.linspace(0.5, 2.0, N) + rng.normal(0, 0.02, (T, N))
+    prices = pd.DataFrame(100 * np.cumprod(1 + R, axis=0), index=idx, columns=cols)
+    prices.iloc[:140, 2] = np.nan  # listed late
+    prices.iloc[150, 3] = np.nan   # one missing day
+    volumes = pd.DataFrame(rng.uniform(1e5, 1e8, (T, N)), index=idx, columns=cols)
+    return prices, volumes
+
+def _reference(prices, volumes, window=30, recent=30):
+    R = prices.pct_change(fill_method=None).iloc[-window:]
+    return pd.DataFrame({
+        "volatility": R.std() * np.sqrt(365),
+        "avg_volume": volumes.loc[prices.index].iloc[-window:].mean(),
+        "correlation_btc": R.corrwith(R["bitcoin"]),
+        "recent_return": prices.iloc[-1] / prices.iloc[-(recent + 1):].bfill().iloc[0] - 1,
+    })
+
+def test_matches_pandas_rolling_window():
+    prices, volumes = _panels()
+    f = compute_features(prices, volumes)
+    ref = _reference(prices, volumes)
+    pd.testing.assert_frame_equal(f[ref.columns], ref.rename_axis("coin"), check_names=False)
+    assert f.loc["c1", "obs"] == 19
+
+def test_incremental_updates_and_provisional_bar():
+    prices, volumes = _panels()
+    pipeline = FeaturePipeline()
+    for t in [2, 3, 50, 51, 90, 125, 160]:
+        intraday = prices.iloc[:t].copy()
+        intraday.iloc[-1] *= 1.05  # latest bar still moving
+        pipeline.update(intraday, volumes)
+        pipeline.update(prices.iloc[:t], volumes)
+        if t >= 50:
+            f = pipeline.features()
+            np.testing.assert_allclose(f[["volatility", "avg_volume", "correlation_btc", "recent_return"]].to_numpy(),
+                                       _reference(prices.iloc[:t], volumes).to_numpy(), rtol=1e-9)
+
+def test_new_coin_rebuilds_and_missing_anchor():
+    prices, volumes = _panels()
+    pipeline = FeaturePipeline.from_panels(prices[["bitcoin", "c0"]].iloc[:100], volumes)
+    pipeline.update(prices, volumes)
+    assert list(pipeline.features().index) == list(prices.columns)
+    np.testing.assert_allclose(pipeline.features()["volatility"], _reference(prices, volumes)["volatility"])
+    no_btc = compute_features(prices.drop(columns="bitcoin"))
+    assert no_btc["correlation_btc"].isna().all() and no_btc["avg_volume"].isna().all()
+    assert no_btc["volatility"].notna().all()
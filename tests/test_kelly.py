@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+from main import kelly_criterion
+from utils.kelly import kelly_fraction_grid, simulate_bankroll, kelly_multi_outcome, kelly_multi_asset
+
+def test_multi_outcome_matches_binary_closed_form():
+    fraction, growth = kelly_multi_outcome([0.55, 0.45], [2.0, -1.0])
+    assert np.isclose(fraction, kelly_criterion(0.55, 2.0), atol=1e-4)
+    assert growth > 0
+
+def test_multi_outcome_negative_edge_bets_nothing():
+    assert kelly_multi_outcome([0.4, 0.6], [1.0, -1.0]) == (0.0, 0.0)
+
+def test_simulate_bankroll_shapes_and_ordering():
+    grid = kelly_fraction_grid(kelly_criterion(0.55, 2.0))
+    sim = simulate_bankroll(0.55, 2.0, grid, n_paths=500, n_bets=100)
+    summary = sim["summary"]
+    assert list(summary.index) == ["Full Kelly", "Half Kelly", "Quarter Kelly"]
+    assert sim["max_drawdowns"].shape == (500, 3)
+    assert sim["percentiles"].shape == (300, 5)
+    # Smaller fractions give shallower drawdowns
+    assert summary["median_max_drawdown"].is_monotonic_decreasing
+
+def test_overbetting_is_ruinous():
+    sim = simulate_bankroll(0.55, 2.0, {"all-in": 1.0}, n_paths=200, n_bets=50)
+    assert sim["summary"].loc["all-in", "prob_ruin"] == 1.0
+    assert sim["summary"].loc["all-in", "mean_log_growth_per_bet"] == -np.inf
+
+def test_growth_is_defined_when_some_paths_are_wiped_out():
+    # Staking everything: a path survives only if it never loses
+    sim = simulate_bankroll(0.9, 2.0, {"all-in": 1.0, "half": 0.5}, n_paths=400, n_bets=5)
+    summary = sim["summary"]
+    survivors = 0.9 ** 5
+    assert 0 < summary.loc["all-in", "prob_ruin"] < 1
+    assert np.isclose(summary.loc["all-in", "mean_log_growth_per_bet"], np.log(3.0))
+    assert np.isfinite(summary.loc["half", "mean_log_growth_per_bet"])
+    assert np.isclose(summary.loc["all-in", "prob_ruin"], 1 - survivors, atol=0.06)
+
+def test_multi_asset_prefers_positive_growth_asset():
+    rng = np.random.default_rng(0)
+    returns = pd.DataFrame({"good": rng.normal(0.01, 0.02, 400), "bad": rng.normal(-0.01, 0.02, 400)})
+    weights, growth = kelly_multi_asset(returns)
+    assert weights["good"] > 0.9
+    assert weights["bad"] < 0.05
+    assert weights.sum() <= 1.0 + 1e-6
+    assert growth > 0
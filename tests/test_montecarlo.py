@@ -0,0 +1,31 @@
+import numpy as np
+from main import black_scholes_price, monte_carlo_option_price
+from utils.montecarlo import (
+    standard_normals, brownian_paths, price_terminal_option, price_path_option,
+    asian_payoff, samples_to_target_stderr
+)
+
+def test_sobol_normals_shape_and_moments():
+    z = standard_normals(1000, 3, sampling="sobol")
+    assert z.shape == (1024, 3)  # rounded up to a power of two
+    assert np.all(np.isfinite(z))
+    assert abs(z.mean()) < 0.01
+    assert abs(z.std() - 1) < 0.01
+
+def test_brownian_bridge_variance():
+    z = standard_normals(20000, 8, sampling="pseudo")
+    W = brownian_paths(z, T=2.0)
+    assert np.allclose(W.var(axis=0), np.linspace(0.25, 2.0, 8), rtol=0.05)
+
+def test_sobol_price_matches_black_scholes():
+    bs = black_scholes_price(100, 100, 0.5, 0.01, 0.8, "put")
+    price, stderr, used = price_terminal_option(100, 100, 0.5, 0.01, 0.8, 2 ** 16, "put", "sobol")
+    assert used == 2 ** 16
+    assert abs(price - bs) < 4 * stderr
+    assert np.isclose(monte_carlo_option_price(100, 100, 0.5, 0.01, 0.8, 2 ** 16, "put", sampling="sobol"), price)
+
+def test_qmc_needs_fewer_samples_than_mc():
+    fn = lambda n_sim, sampling: price_path_option(asian_payoff(100), 100, 0.5, 0.01, 0.8, 16, n_sim, sampling)
+    mc_n, _, _ = samples_to_target_stderr(fn, 0.1, "pseudo")
+    qmc_n, _, _ = samples_to_target_stderr(fn, 0.1, "sobol")
+    assert qmc_n < mc_n
@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+from utils.nav import NavEngine, compute_nav
+
+def _prices(T=120, seed=2):
+    rng = np.random.default_rng(seed)
+    idx = pd.date_range("2025-01-01", periods=T, freq="D")
+    prices = pd.DataFrame(100 * np.exp(np.cumsum(rng.normal(0, 0.03, (T, 3)), axis=0)), index=idx, columns=["a", "b", "c"])
+    prices.iloc[:30, 2] = np.nan  # c is listed later
+    return prices
+
+def _transactions():
+    return pd.DataFrame({
+        "id": [1, 2, 3, 4],
+        "asset": ["a", "b", "c", "a"],
+        "amount": [2.0, 5.0, 10.0, -1.0],
+        "ts": ["2024-12-01", "2025-01-20 15:30:00", "2025-02-15", "2025-03-10"],
+    })
+
+def test_nav_is_units_times_prices():
+    prices, tx = _prices(), _transactions()
+    res = compute_nav(prices, tx)
+    day = pd.Timestamp("2025-01-25")
+    expected = 2 * prices.loc[day, "a"] + 5 * prices.loc[day, "b"]
+    assert np.isclose(res["nav"][day], expected)
+    assert res["units"].to_dict() == {"a": 1.0, "b": 5.0, "c": 10.0}
+    # Intraday trade is booked on its own day
+    assert res["values"].loc["2025-01-20", "b"] > 0 and res["values"].loc["2025-01-19", "b"] == 0
+
+def test_pnl_excludes_flows_and_contributions_add_up():
+    prices, tx = _prices(), _transactions()
+    res = compute_nav(prices, tx)
+    flow_days = pd.DatetimeIndex(["2025-01-20", "2025-02-15", "2025-03-10"])
+    change = res["nav"].diff().drop(flow_days).iloc[1:]
+    assert np.allclose(change, res["pnl"].sum(axis=1).reindex(change.index))
+    prev_nav = res["nav"].shift(1)
+    assert np.allclose(res["returns"].iloc[1:], (res["pnl"].sum(axis=1) / prev_nav).iloc[1:])
+
+def test_incremental_updates_match_full_recompute():
+    prices, tx = _prices(), _transactions()
+    engine = NavEngine()
+    for end in [40, 41, 41, 90, len(prices)]:
+        engine.update(prices.iloc[:end], tx)
+    full = compute_nav(prices, tx)
+    inc = engine.result()
+    for key in ["values", "pnl", "contribution"]:
+        pd.testing.assert_frame_equal(inc[key], full[key])
+    pd.testing.assert_series_equal(inc["nav"], full["nav"])
+    summary = engine.summary()
+    assert np.isclose(summary["nav"], full["nav"].iloc[-1])
+    assert np.isclose(summary["total_pnl"], full["total_pnl"].sum())
+    assert np.isclose(summary["total_return"], (1 + full["returns"]).prod() - 1)
+
+def test_latest_bar_is_revalued_and_backdated_trades_recompute():
+    prices, tx = _prices(), _transactions()
+    engine = NavEngine()
+    engine.update(prices, tx)
+    moved = prices.copy()
+    moved.iloc[-1] *= 1.1  # today's price changes intraday
+    assert engine.update(moved, tx) == 0
+    pd.testing.assert_series_equal(engine.result()["nav"], compute_nav(moved, tx)["nav"])
+    backdated = pd.concat([tx, pd.DataFrame({"id": [5], "asset": ["b"], "amount": [1.0], "ts": ["2025-02-01"]})])
+    engine.update(moved, backdated)
+    pd.testing.assert_series_equal(engine.result()["nav"], compute_nav(moved, backdated)["nav"])
@@ -0,0 +1,78 @@
+import itertools
+import numpy as np
+import pandas as pd
+from utils.network import correlation_mst, threshold_graph, node_stats, spring_layout, network_figure, graph_key, marker_sizes
+
+def _corr(N=12, seed=4):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(0, 0.03, (120, 1)) * rng.random(N) + rng.normal(0, 0.02, (120, N))
+    cols = [f"c{i}" for i in range(N)]
+    return pd.DataFrame(X, columns=cols).corr()
+
+def _prim_weight(dist):
+    n = len(dist)
+    in_tree, best, total = {0}, dist[0].copy(), 0.0
+    while len(in_tree) < n:
+        best[list(in_tree)] = np.inf
+        j = int(np.argmin(best))
+        total += best[j]
+        in_tree.add(j)
+        best = np.minimum(best, dist[j])
+    return total
+
+def test_mst_is_minimal_spanning_tree():
+    corr = _corr()
+    edges = correlation_mst(corr)
+    assert len(edges) == len(corr) - 1
+    assert node_stats(list(corr.columns), edges)["component"].nunique() == 1
+    dist = 1 - np.abs(corr.to_numpy())
+    assert np.isclose(edges["distance"].sum(), _prim_weight(dist))
+
+def test_mst_links_perfectly_correlated_coins():
+    corr = pd.DataFrame(np.ones((3, 3)), index=list("abc"), columns=list("abc"))
+    assert len(correlation_mst(corr)) == 2
+
+def test_threshold_graph_and_hubs():
+    corr = _corr()
+    edges = threshold_graph(corr, 0.3)
+    c = corr.to_numpy()
+    expected = sum(abs(c[i, j]) >= 0.3 for i, j in itertools.combinations(range(len(c)), 2))
+    assert len(edges) == expected
+    stats = node_stats(list(corr.columns), edges)
+    assert stats["degree"].sum() == 2 * len(edges)
+    assert stats["degree"].is_monotonic_decreasing
+
+def test_layout_warm_start_keeps_known_nodes_close():
+    corr = _corr()
+    labels = list(corr.columns)
+    edges = correlation_mst(corr)
+    cold = spring_layout(labels, edges)
+    assert set(cold) == set(labels)
+    assert all(0 <= x <= 1 and 0 <= y <= 1 for x, y in cold.values())
+    # Add a coin: the existing ones barely move and the new one joins its neighbour
+    bigger = _corr(N=13)
+    warm = spring_layout(list(bigger.columns), correlation_mst(bigger), previous=cold)
+    moved = np.mean([np.hypot(cold[c][0] - warm[c][0], cold[c][1] - warm[c][1]) for c in labels])
+    assert moved < 0.25
+
+def test_graph_key_tracks_nodes_and_weighted_edges():
+    corr = _corr()
+    labels = list(corr.columns)
+    edges = correlation_mst(corr)
+    assert graph_key(labels, edges) == graph_key(list(labels), correlation_mst(corr.copy()))
+    shifted = edges.assign(corr=edges["corr"] + 0.01)
+    assert graph_key(labels, shifted) != graph_key(labels, edges)
+    assert graph_key(labels + ["new"], edges) != graph_key(labels, edges)
+
+def test_network_figure_has_edge_and_node_traces():
+    corr = _corr()
+    edges = correlation_mst(corr)
+    stats = node_stats(list(corr.columns), edges)
+    fig = network_figure(spring_layout(list(corr.columns), edges), edges, stats, top_hubs=3)
+    assert len(fig.data) == 2
+    assert sum(bool(t) for t in fig.data[1].text) == 3
+
+def test_marker_sizes_stay_bounded_for_hubs():
+    sizes = marker_sizes([0, 1, 4, 300])
+    assert sizes[0] == 6 and sizes[-1] == 30 and np.all(np.diff(sizes) > 0)
+    assert marker_sizes([1, 2, 3]).max() == 30 and marker_sizes([]).size == 0
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+from scipy.optimize import minimize
+from utils.optimiser import (PortfolioOptimiser, project_simplex, solve_quadratic, solve_risk_parity,
+                             risk_contributions, diversification_ratio, optimise_portfolio)
+
+def _returns(N=12, T=300, seed=5):
+    rng = np.random.default_rng(seed)
+    factors = rng.normal(0, 0.03, (T, 2))
+    loadings = rng.normal(1, 0.5, (2, N)) * rng.random((1, N))
+    R = factors @ loadings / 2 + rng.normal(0, 0.02, (T, N)) * rng.uniform(0.5, 2, N) + rng.normal(0.001, 0.002, N)
+    return pd.DataFrame(R, index=pd.date_range("2024-01-01", periods=T, freq="D"), columns=[f"c{i}" for i in range(N)])
+
+def _slsqp(objective, n, max_weight=1.0):
+    cons = ({"type": "eq", "fun": lambda w: w.sum() - 1},)
+    return minimize(objective, np.full(n, 1 / n), bounds=[(0, max_weight)] * n, constraints=cons,
+                    method="SLSQP", options={"ftol": 1e-15, "maxiter": 1000}).x
+
+def test_project_simplex():
+    v = np.array([0.9, 0.5, -0.2, 0.1])
+    w = project_simplex(v)
+    assert np.isclose(w.sum(), 1) and (w >= 0).all()
+    capped = project_simplex(v, max_weight=0.4)
+    assert np.isclose(capped.sum(), 1) and capped.max() <= 0.4 + 1e-12
+
+def test_quadratic_matches_slsqp_with_and_without_caps():
+    R = _returns()
+    S, mu = R.cov().to_numpy() * 365, R.mean().to_numpy() * 365
+    for gamma, m, cap in [(2.0, None, 1.0), (5.0, mu, 1.0), (5.0, mu, 0.2)]:
+        obj = lambda w: 0.5 * gamma * w @ S @ w - (0 if m is None else m @ w)
+        w, _ = solve_quadratic(S, m, gamma, max_weight=cap)
+        ref = _slsqp(obj, len(S), cap)
+        assert obj(w) <= obj(ref) + 1e-10
+        assert np.isclose(w.sum(), 1) and w.min() >= 0 and w.max() <= cap + 1e-12
+
+def test_risk_parity_equalises_contributions():
+    S = _returns().cov().to_numpy()
+    w, _ = solve_risk_parity(S)
+    assert np.allclose(risk_contributions(w, S), 1 / len(S), atol=1e-8)
+    budgets = np.arange(1, len(S) + 1)
+    wb, _ = solve_risk_parity(S, budgets=budgets)
+    assert np.allclose(risk_contributions(wb, S), budgets / budgets.sum(), atol=1e-8)
+
+def test_max_diversification_is_optimal():
+    R = _returns()
+    S = R.cov().to_numpy() * 365
+    res = optimise_portfolio(R, method="max_diversification")
+    ref = _slsqp(lambda w: -diversification_ratio(w, S), len(S))
+    assert res["diversification_ratio"] >= diversification_ratio(ref, S) - 1e-8
+
+def test_warm_start_across_days_and_frontier():
+    R = _returns(N=60, T=400)
+    opt = PortfolioOptimiser()
+    cold = opt.optimise(R.iloc[:-1], method="min_variance")
+    warm = opt.optimise(R, method="min_variance")
+    fresh = PortfolioOptimiser().optimise(R, method="min_variance")
+    assert np.allclose(warm["weights"], fresh["weights"], atol=1e-7)
+    assert warm["iterations"] <= cold["iterations"]
+    frontier, weights = opt.efficient_frontier(R, n_points=10)
+    assert len(frontier) == 10 and np.allclose(weights.sum(axis=1), 1)
+    assert frontier["volatility"].is_monotonic_increasing
+    assert np.isclose(frontier["volatility"].iloc[0], fresh["volatility"], rtol=0.05)
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+from main import black_scholes_price, black_scholes_greeks, binomial_tree_price
+from utils.option_book import (
+    load_positions, bs_price_greeks, binomial_price_greeks, price_book, aggregate_greeks, shock_grid, shock_matrix
+)
+
+def _positions():
+    return load_positions(pd.DataFrame({
+        "underlying": ["doge", "doge", "pepe"],
+        "option_type": ["call", "put", "put"],
+        "strike": [110.0, 90.0, 100.0],
+        "expiry": ["2026-03-01", "2026-03-01", "2026-06-01"],
+        "quantity": [10, -5, 4],
+        "spot": [100.0, 100.0, 50.0],
+        "sigma": [0.8, 0.9, 1.2],
+        "style": ["european", "american", "american"],
+    }), valuation_date="2026-01-01")
+
+@pytest.mark.parametrize("option_type", ["call", "put"])
+def test_vectorized_black_scholes_matches_scalar(option_type):
+    res = bs_price_greeks(100, 90, 0.5, 0.05, 0.8, option_type == "call")
+    assert np.isclose(res["price"], black_scholes_price(100, 90, 0.5, 0.05, 0.8, option_type))
+    for greek, value in black_scholes_greeks(100, 90, 0.5, 0.05, 0.8, option_type).items():
+        assert np.isclose(res[greek], value)
+
+def test_lattice_matches_scalar_tree_and_black_scholes():
+    res = binomial_price_greeks([100, 100], [90, 90], [0.5, 0.5], [0.05, 0.05], [0.8, 0.8], [False, False], [False, True], 200)
+    assert np.isclose(res["price"][0], binomial_tree_price(100, 90, 0.5, 0.05, 0.8, 200, "put"))
+    assert res["price"][1] >= res["price"][0]  # early exercise premium
+    bs = bs_price_greeks(100, 90, 0.5, 0.05, 0.8, False)
+    for greek in ["delta", "gamma", "vega", "theta", "rho"]:
+        assert np.isclose(res[greek][0], bs[greek], rtol=0.05, atol=1e-3)
+
+def test_missing_columns_raise():
+    with pytest.raises(ValueError):
+        load_positions(pd.DataFrame({"underlying": ["doge"]}))
+
+def test_book_aggregation_sums_position_greeks():
+    book = price_book(_positions())
+    by_underlying = aggregate_greeks(book, by=["underlying"])
+    assert np.isclose(by_underlying.loc["doge", "delta"], (book["delta"] * book["quantity"])[:2].sum())
+    assert np.isclose(by_underlying["market_value"].sum(), (book["price"] * book["quantity"]).sum())
+
+@pytest.mark.parametrize("model", ["black_scholes", "binomial"])
+def test_shock_grid_zero_shock_is_flat_and_matches_repricing(model):
+    positions = _positions()
+    grid = shock_grid(positions, [-0.2, 0.0, 0.2], [-0.1, 0.0, 0.1], model=model, steps=50)
+    matrix = shock_matrix(grid)
+    assert np.isclose(matrix.loc[0.0, 0.0], 0.0)
+    shocked = positions.assign(spot=positions["spot"] * 0.8, sigma=positions["sigma"] + 0.1)
+    expected = price_book(shocked, model, 50)["market_value"].sum() - price_book(positions, model, 50)["market_value"].sum()
+    assert np.isclose(matrix.loc[-0.2, 0.1], expected)
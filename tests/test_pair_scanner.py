@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+from utils.pair_scanner import BoundedTopK, RollingCorrelation, scan_pairs
+
+def _prices(T=150, N=8, seed=8):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(0, 0.03, (T, 1)) + rng.normal(0, 0.02, (T, N))
+    X[-20:, 0] = rng.normal(0, 0.05, 20)  # coin c0 decouples at the end
+    idx = pd.date_range("2025-01-01", periods=T, freq="D")
+    return pd.DataFrame(100 * np.exp(np.cumsum(X, axis=0)), index=idx, columns=[f"c{i}" for i in range(N)])
+
+def test_bounded_heap_keeps_best_per_key():
+    top = BoundedTopK(2)
+    for score, key in [(1, "a"), (5, "b"), (3, "c"), (4, "a"), (2, "d")]:
+        top.push(score, key, None)
+    assert [(s, k) for s, k, _ in top.ranked()] == [(5, "b"), (4, "a")]
+
+def test_streaming_correlation_matches_pandas_rolling():
+    prices = _prices()
+    prices.iloc[:30, 3] = np.nan
+    rets = np.log(prices).diff().iloc[1:]
+    roll = RollingCorrelation(rets.shape[1], 20)
+    for row in rets.to_numpy():
+        roll.update(row)
+    expected = rets.iloc[-20:].corr(min_periods=10).to_numpy()
+    assert np.allclose(roll.correlation(10), expected, equal_nan=True)
+
+def test_scan_ranks_latest_change_and_finds_decoupling_coin():
+    prices = _prices()
+    pairs = scan_pairs(prices, window=20, lookback=20, top_k=5, direction="decoupling")
+    assert len(pairs) == 5 and pairs["change"].is_monotonic_increasing
+    assert (pairs[["asset_a", "asset_b"]] == "c0").any(axis=1).all()
+    rets = np.log(prices).diff().iloc[1:]
+    now = rets.iloc[-20:].corr()
+    before = rets.iloc[-40:-20].corr()
+    a, b = pairs.iloc[0][["asset_a", "asset_b"]]
+    assert np.isclose(pairs.iloc[0]["change"], now.loc[a, b] - before.loc[a, b], atol=1e-6)
+
+def test_peak_mode_reports_event_dates():
+    pairs = scan_pairs(_prices(), window=20, lookback=10, top_k=3, rank_by="peak")
+    assert len(pairs) == 3 and pairs["change"].abs().is_monotonic_decreasing
+    assert pairs["date"].notna().all()
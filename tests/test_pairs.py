@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+from utils.pairs import half_life, hedge_ratio, prefilter_pairs, rolling_hedge_ratio, scan_cointegrated_pairs, backtest_pair
+
+def _prices(T=250, seed=3):
+    rng = np.random.default_rng(seed)
+    market = np.cumsum(rng.normal(0, 0.02, T))
+    x = market + np.cumsum(rng.normal(0, 0.01, T))
+    spread = np.zeros(T)
+    for t in range(1, T):  # AR(1) spread with a ~7 bar half-life
+        spread[t] = 0.9 * spread[t - 1] + rng.normal(0, 0.02)
+    y = 0.5 + 1.3 * x + spread
+    walks = market[:, None] + np.cumsum(rng.normal(0, 0.02, (T, 3)), axis=0)
+    idx = pd.date_range("2025-01-01", periods=T, freq="D")
+    cols = {"a": y, "b": x, "w0": walks[:, 0], "w1": walks[:, 1], "w2": walks[:, 2]}
+    return pd.DataFrame(np.exp(pd.DataFrame(cols, index=idx)))
+
+def test_hedge_ratio_and_half_life():
+    rng = np.random.default_rng(0)
+    x = rng.normal(size=500)
+    alpha, beta = hedge_ratio(2.0 + 0.7 * x, x)
+    assert np.isclose(alpha, 2.0) and np.isclose(beta, 0.7)
+    s = np.zeros(5000)
+    for t in range(1, len(s)):
+        s[t] = 0.9 * s[t - 1] + rng.normal()
+    assert abs(half_life(s) - np.log(2) / 0.1) < 2
+    assert half_life(np.cumsum(np.ones(50))) == np.inf
+
+def test_prefilter_keeps_only_correlated_pairs():
+    prices = _prices()
+    assert prefilter_pairs(prices, min_corr=1.01) == []
+    pairs = prefilter_pairs(prices, min_corr=0.0)
+    assert all(i < j for i, j, _ in pairs)
+
+def test_scan_finds_cointegrated_pair():
+    prices = _prices()
+    prices.iloc[:40, 4] = np.nan  # late listing is tested on its overlap
+    res = scan_cointegrated_pairs(prices, min_corr=0.0, max_pvalue=0.05, max_workers=0)
+    top = res[(res["asset_a"] == "a") & (res["asset_b"] == "b")]
+    assert len(top) == 1
+    assert np.isclose(top["beta"].iloc[0], 1.3, atol=0.1)
+    assert top["half_life"].iloc[0] < 20
+    assert res["zscore"].abs().is_monotonic_decreasing
+
+def test_pool_matches_serial():
+    prices = _prices()
+    serial = scan_cointegrated_pairs(prices, min_corr=0.0, max_pvalue=1.0, max_workers=0)
+    pooled = scan_cointegrated_pairs(prices, min_corr=0.0, max_pvalue=1.0, max_workers=2, chunks_per_worker=2)
+    pd.testing.assert_frame_equal(serial, pooled)
+    assert len(serial) == 10
+
+def test_backtest_pair_runs_through_engine():
+    prices = _prices()
+    bt = backtest_pair(prices, "a", "b", 1.3, window=20, entry_z=1.5, exit_z=0.5)
+    assert set(bt["positions"].columns) == {"a", "b"}
+    gross = bt["positions"].abs().sum(axis=1)
+    assert np.allclose(gross[gross > 0], 1.0)
+    assert bt["metrics"]["trades"] > 0
+    assert np.isclose(bt["equity"].iloc[-1], (1 + bt["returns"]).prod())
+
+def test_default_backtest_has_no_look_ahead():
+    prices = _prices()
+    beta = rolling_hedge_ratio(prices, "a", "b", min_obs=60)
+    assert beta.iloc[:59].isna().all()
+    assert np.isclose(beta.iloc[100], hedge_ratio(np.log(prices["a"].iloc[:101]).to_numpy(), np.log(prices["b"].iloc[:101]).to_numpy())[1])
+    bt = backtest_pair(prices, "a", "b", window=20, entry_z=1.5, exit_z=0.5)
+    assert (bt["positions"].iloc[:59] == 0).all().all() and bt["metrics"]["trades"] > 0
+    # Rewriting the second half of the history leaves every earlier position and return unchanged
+    shocked = prices.copy()
+    shocked.iloc[150:, 0] *= np.linspace(1, 3, len(prices) - 150)
+    late = backtest_pair(shocked, "a", "b", window=20, entry_z=1.5, exit_z=0.5)
+    pd.testing.assert_frame_equal(late["positions"].iloc[:150], bt["positions"].iloc[:150])
+    pd.testing.assert_series_equal(late["returns"].iloc[:150], bt["returns"].iloc[:150])
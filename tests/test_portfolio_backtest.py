@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+from main import align_price_panel
+from utils.portfolio_backtest import rebalance_mask, target_weights, run_portfolio_backtest
+
+def _panel(T=150, seed=2):
+    rng = np.random.default_rng(seed)
+    idx = pd.date_range("2025-01-01", periods=T, freq="D")
+    p = pd.DataFrame(100 * np.exp(np.cumsum(rng.normal(0, 0.05, (T, 4)), axis=0)), index=idx, columns=list("abcd"))
+    p.iloc[:40, 2] = np.nan
+    p.iloc[:100, 3] = np.nan
+    return p
+
+def _loop_equity(prices, targets, mask, cost):
+    px = prices.ffill().values
+    hold, cash, out = np.zeros(prices.shape[1]), 1.0, []
+    for t in range(len(px)):
+        if t:
+            hold = hold * np.nan_to_num(px[t] / px[t - 1])
+        value = hold.sum() + cash
+        if mask[t]:
+            tgt = np.nan_to_num(targets.values[t])
+            value *= 1 - np.abs(tgt - hold / value).sum() * cost
+            hold, cash = tgt * value, value - (tgt * value).sum()
+        out.append(value)
+    return np.array(out)
+
+def test_align_price_panel_keeps_full_history():
+    a = pd.Series([1.0, 2.0, 3.0], index=pd.to_datetime(["2025-01-01 00:00", "2025-01-02 00:00", "2025-01-03 15:00"]))
+    b = pd.Series([5.0], index=pd.to_datetime(["2025-01-03"]))
+    panel = align_price_panel({"a": a, "b": b})
+    assert len(panel) == 3 and panel["b"].isna().sum() == 2 and panel.loc["2025-01-03", "a"] == 3.0
+
+def test_rebalance_mask():
+    idx = pd.date_range("2025-01-30", periods=5, freq="D")
+    assert rebalance_mask(idx, "monthly").tolist() == [True, False, True, False, False]
+    assert rebalance_mask(idx, "never").tolist() == [True, False, False, False, False]
+
+def test_drift_and_costs_match_loop():
+    prices = _panel()
+    for scheme in ["equal", "inverse_vol"]:
+        targets = target_weights(prices, scheme)
+        res = run_portfolio_backtest(prices, targets, "weekly", fee_bps=25, slippage_bps=5)
+        expected = _loop_equity(prices, targets, rebalance_mask(prices.index, "weekly"), 30 / 1e4)
+        assert np.allclose(res["equity"].values, expected)
+
+def test_late_listings_join_at_rebalance():
+    prices = _panel()
+    res = run_portfolio_backtest(prices, target_weights(prices, "custom", weights={"a": 1, "d": 3}), "monthly")
+    w = res["weights"]
+    assert np.allclose(w.iloc[0], [1, 0, 0, 0])
+    first_rebalance_after_listing = w.index[(w.index >= prices["d"].first_valid_index()) & (w.index.day == 1)][0]
+    assert w.loc[first_rebalance_after_listing, "d"] == 0.75
+    assert (w.loc[:first_rebalance_after_listing - pd.Timedelta(days=1), "d"] == 0).all()
@@ -0,0 +1,82 @@
+import io
+import sqlite3
+import threading
+import pandas as pd
+from utils.portfolio_store import PortfolioStore, CSV_COLUMNS
+
+def _legacy_csv(path):
+    rows = [
+        ["Main", "", "", 0, "2024-01-01"],  # placeholder row written by "Create Portfolio"
+        ["Main", "dogecoin", "coin", 5, "2024-01-02"],
+        ["Main", "dogecoin", "coin", 3, "2024-01-03"],
+        ["Alt", "pepe", "coin", 1e6, "2024-01-02"],
+        ["Empty", "", "", 0, "2024-01-04"],
+    ]
+    pd.DataFrame(rows, columns=CSV_COLUMNS).to_csv(path, index=False)
+
+def test_migrates_legacy_csv_once(tmp_path):
+    _legacy_csv(tmp_path / "portfolios.csv")
+    store = PortfolioStore(str(tmp_path / "p.db"), str(tmp_path / "portfolios.csv"))
+    PortfolioStore(str(tmp_path / "p.db"), str(tmp_path / "portfolios.csv"))  # second start must not re-import
+    assert store.list_portfolios() == ["Main", "Alt", "Empty"]
+    main = store.holdings("Main")
+    assert main[["asset", "amount"]].values.tolist() == [["dogecoin", 8.0]]
+    assert len(store.transactions()) == 3
+    conn = sqlite3.connect(tmp_path / "p.db")
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+def test_add_remove_and_transaction_log(tmp_path):
+    store = PortfolioStore(str(tmp_path / "p.db"), legacy_csv="")
+    assert store.create_portfolio("Main")
+    assert not store.create_portfolio("Main")
+    store.add_holding("Main", "bonk", 10)
+    store.add_holding("Main", "bonk", 5)
+    store.add_holding("Main", "pepe", 1)
+    assert store.holdings("Main").set_index("asset")["amount"].to_dict() == {"bonk": 15.0, "pepe": 1.0}
+    assert store.remove_holding("Main", "bonk")
+    assert not store.remove_holding("Main", "bonk")
+    log = store.transactions("Main")
+    assert log["action"].tolist() == ["add", "add", "add", "remove"]
+    assert log["amount"].iloc[-1] == -15.0
+
+def test_concurrent_writers_do_not_lose_updates(tmp_path):
+    path = str(tmp_path / "p.db")
+    PortfolioStore(path, legacy_csv="").create_portfolio("Main")
+
+    def writer(i):
+        store = PortfolioStore(path, legacy_csv="")
+        for _ in range(25):
+            store.add_holding("Main", f"coin{i}", 1)
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    holdings = PortfolioStore(path, legacy_csv="").holdings("Main")
+    assert holdings["amount"].tolist() == [25.0] * 4
+
+def test_csv_round_trip_and_replace(tmp_path):
+    store = PortfolioStore(str(tmp_path / "p.db"), legacy_csv="")
+    store.add_holding("Main", "dogecoin", 2)
+    text = store.export_csv("Main")
+    assert pd.read_csv(io.StringIO(text)).columns.tolist() == CSV_COLUMNS
+    upload = pd.DataFrame({"asset": ["pepe", "bonk"], "amount": [1, 2]})
+    assert store.import_csv(upload, portfolio="Main", replace=True) == 2
+    assert sorted(store.holdings("Main")["asset"]) == ["bonk", "pepe"]
+    store.import_csv(io.StringIO(text))
+    assert sorted(store.holdings("Main")["asset"]) == ["bonk", "dogecoin", "pepe"]
+
+def test_replace_import_voids_history_at_every_date(tmp_path):
+    from utils.nav import compute_nav
+    store = PortfolioStore(str(tmp_path / "p.db"), legacy_csv="")
+    store.add_holding("Main", "dogecoin", 10, ts="2025-01-01 00:00:00")
+    store.add_holding("Main", "pepe", 4, ts="2025-01-02 00:00:00")
+    text = store.export_csv("Main")
+    for _ in range(3):  # re-importing the portfolio's own export changes nothing, however often
+        store.import_csv(io.StringIO(text), portfolio="Main", replace=True)
+    prices = pd.DataFrame(1.0, index=pd.date_range("2025-01-01", periods=5, freq="D"), columns=["dogecoin", "pepe"])
+    nav = compute_nav(prices, store.transactions("Main"))["nav"]
+    assert nav.tolist() == [10.0, 14.0, 14.0, 14.0, 14.0]
+    assert store.transactions("Main").groupby("asset")["amount"].sum().to_dict() == {"dogecoin": 10.0, "pepe": 4.0}
+    assert len(store.transactions("Main")) == 2 + 3 * 4
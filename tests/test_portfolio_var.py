@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+from utils.portfolio_var import build_model, simulate_var, cholesky_factor, ewma_volatility, parametric_var
+
+def _returns(N=6, T=300, seed=9):
+    rng = np.random.default_rng(seed)
+    common = rng.normal(0, 0.03, (T, 1))
+    R = common * rng.uniform(0.5, 1.5, N) + rng.normal(0, 0.02, (T, N))
+    return pd.DataFrame(R, index=pd.date_range("2024-01-01", periods=T, freq="D"), columns=[f"c{i}" for i in range(N)])
+
+def _values(cols):
+    return pd.Series(np.linspace(100, 600, len(cols)), index=cols)
+
+def test_cholesky_repairs_singular_covariance():
+    x = np.array([1.0, 2.0, 3.0])
+    cov = np.outer(x, x)  # rank one
+    L = cholesky_factor(cov)
+    assert np.allclose(L @ L.T, cov, atol=1e-6)
+
+def test_gaussian_var_matches_parametric():
+    R = _returns()
+    model = build_model(R, _values(R.columns), "gaussian")
+    model["mu"] = np.zeros_like(model["mu"])
+    res = simulate_var(model, 200_000, 0.99, chunk_size=30_000, max_workers=0)
+    ref = parametric_var(model["values"], model["cov"], 0.99)
+    assert abs(res["var"] / ref["var"] - 1) < 0.02
+    assert abs(res["cvar"] / ref["cvar"] - 1) < 0.03
+    comp = res["components"]
+    assert np.isclose(comp["component_var"].sum(), res["var"])
+    assert np.isclose(comp["component_cvar"].sum(), res["cvar"])
+    assert np.corrcoef(comp["component_var"], ref["component_var"])[0, 1] > 0.98
+    assert np.allclose(comp["marginal_var"] * comp["value"], comp["component_var"])
+
+def test_chunking_and_pool_do_not_change_results():
+    R = _returns()
+    model = build_model(R, _values(R.columns), "gaussian")
+    serial = simulate_var(model, 40_000, 0.95, chunk_size=10_000, max_workers=0)
+    pooled = simulate_var(model, 40_000, 0.95, chunk_size=10_000, max_workers=2)
+    assert serial["var"] == pooled["var"] and serial["cvar"] == pooled["cvar"]
+    pd.testing.assert_frame_equal(serial["components"], pooled["components"])
+    assert len(serial["loss_sample"]) == 40_000
+
+def test_ewma_volatility_and_fhs():
+    R = _returns()
+    R.iloc[:50, 0] = np.nan  # late listing
+    vol, forecast = ewma_volatility(R)
+    assert vol.iloc[:50, 0].isna().all() and vol.iloc[50:, 0].notna().all()
+    expected = np.sqrt(0.94 * vol.iloc[-1] ** 2 + 0.06 * R.iloc[-1] ** 2)
+    assert np.allclose(forecast, expected)
+    model = build_model(R, _values(R.columns), "fhs", horizon=5)
+    res = simulate_var(model, 50_000, 0.95, max_workers=0)
+    one_day = simulate_var(build_model(R, _values(R.columns), "fhs"), 50_000, 0.95, max_workers=0)
+    assert res["var"] > one_day["var"] > 0
+    assert res["cvar"] > res["var"]
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+from utils.query import QueryEngine
+
+WORDS = ["doge", "pepe", "shiba", "inu", "bonk", "floki", "cat", "wif", "moon", "baby"]
+
+def _snapshot(n=3000, seed=2):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "Name": [" ".join(rng.choice(WORDS, 2)).title() + f" {i}" for i in range(n)],
+        "Symbol": [f"sym{i}" for i in range(n)],
+        "Price (USD)": np.round(np.exp(rng.normal(-3, 2, n)), 3),  # rounding makes ties
+        "Market Cap (USD)": np.exp(rng.normal(15, 3, n)),
+    }, index=np.arange(n) * 10)
+    df.loc[df.index[::37], "Price (USD)"] = np.nan
+    return df
+
+def _pandas(df, lo, hi, search, col, ascending):
+    out = df[(df["Price (USD)"] >= lo) & (df["Price (USD)"] <= hi)]
+    for term in search.split():
+        out = out[out["Name"].str.contains(term, case=False) | out["Symbol"].str.contains(term, case=False)]
+    return out.sort_values(col, ascending=ascending, kind="stable")
+
+@pytest.mark.parametrize("lo,hi,search,col,ascending,k", [
+    (0.0, 1e9, "", "Market Cap (USD)", False, 10),      # unselective: walks the presorted order
+    (0.01, 0.02, "", "Price (USD)", True, None),        # selective range, ties in the sort column
+    (0.0, 1e9, "oge", "Name", True, 25),                # substring inside a word
+    (0.05, 0.5, "pepe cat", "Price (USD)", False, 5),   # several words, all must match
+    (0.0, 1e9, "SYM12", "Market Cap (USD)", True, None),
+    (5.0, 1.0, "", "Price (USD)", True, None),          # empty range
+])
+def test_matches_pandas_masks_and_sort(lo, hi, search, col, ascending, k):
+    df = _snapshot()
+    engine = QueryEngine(df)
+    q = engine.query().between("Price (USD)", lo, hi).search(search).sort(col, ascending=ascending)
+    expected = _pandas(df, lo, hi, search, col, ascending)
+    if k is not None:
+        q, expected = q.limit(k), expected.head(k)
+    pd.testing.assert_frame_equal(q.run(), expected)
+    assert q.count() == len(_pandas(df, lo, hi, search, col, ascending))
+
+def test_operators_nan_and_unsorted_results():
+    df = _snapshot(500)
+    engine = QueryEngine(df)
+    price = df["Price (USD)"]
+    assert len(engine.query().where("Price (USD)", ">", 0.05).run()) == (price > 0.05).sum()
+    assert len(engine.query().where("Price (USD)", "<", 0.05).run()) == (price < 0.05).sum()
+    exact = price.dropna().iloc[0]
+    assert len(engine.query().where("Price (USD)", "==", exact).run()) == (price == exact).sum()
+    # Without a sort, rows come back in snapshot order; NaN prices sort last either way
+    pd.testing.assert_frame_equal(engine.query().where("Price (USD)", ">=", 0.1).run(), df[price >= 0.1])
+    assert engine.query().sort("Price (USD)", ascending=False).run()["Price (USD)"].iloc[-1:].isna().all()
+    with pytest.raises(ValueError):
+        engine.query().where("Price (USD)", "!=", 1)
+
+def test_queries_are_immutable_and_shareable():
+    engine = QueryEngine(_snapshot(200))
+    base = engine.query().where("Price (USD)", "<=", 0.1)
+    narrowed = base.search("moon").sort("Market Cap (USD)").limit(3)
+    assert base.text == "" and base.k is None
+    assert len(narrowed.run()) <= 3 and len(base.run()) >= len(narrowed.run())
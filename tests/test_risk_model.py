@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+from sklearn.covariance import ledoit_wolf
+from main import compute_correlation_matrix
+from utils.risk_model import RiskModel, portfolio_risk
+
+def _returns(T=120, N=40, seed=7):
+    rng = np.random.default_rng(seed)
+    market = rng.normal(0, 0.03, (T, 1))
+    X = market * rng.uniform(0.5, 1.5, N) + rng.normal(0, 0.05, (T, N))
+    return pd.DataFrame(X, index=pd.date_range("2025-01-01", periods=T, freq="D"), columns=[f"c{i}" for i in range(N)])
+
+def test_ledoit_wolf_matches_sklearn():
+    rets = _returns()
+    cov, shrinkage = RiskModel.from_returns(rets).ledoit_wolf()
+    expected, expected_shrinkage = ledoit_wolf(rets.values)
+    assert np.isclose(shrinkage, expected_shrinkage) and np.allclose(cov.values, expected)
+
+def _pairwise_ledoit_wolf(panel):
+    """Reference: Ledoit-Wolf with every entry over its pair's joint rows (pairwise deletion)."""
+    X, p = panel.to_numpy(), panel.shape[1]
+    S, var = np.zeros((p, p)), np.zeros((p, p))
+    for i in range(p):
+        for j in range(p):
+            joint = np.isfinite(X[:, i]) & np.isfinite(X[:, j])
+            yi, yj = X[joint, i] - X[joint, i].mean(), X[joint, j] - X[joint, j].mean()
+            S[i, j] = (yi * yj).mean()
+            var[i, j] = ((yi * yj - S[i, j]) ** 2).mean() / joint.sum()
+    mu = np.trace(S) / p
+    delta = ((S - mu * np.eye(p)) ** 2).sum() / p
+    shrinkage = min(var.sum() / p, delta) / delta
+    return (1 - shrinkage) * S + shrinkage * mu * np.eye(p), shrinkage
+
+def test_incremental_updates_equal_batch_and_short_histories_are_excluded():
+    rets = _returns()
+    rets.iloc[:100, :5] = np.nan
+    model = RiskModel.from_returns(rets.iloc[:70, 10:])
+    model.update(rets.iloc[50:])  # overlapping rows are skipped, new coins are added
+    cov, shrinkage = model.ledoit_wolf(min_obs=30)
+    assert sorted(cov.columns) == sorted(rets.columns[5:])
+    # Coins first seen in the second update are missing before it; the first update's last
+    # row was provisional, so it is re-read from the second panel with all coins
+    expected = rets.copy()
+    expected.iloc[:69, :10] = np.nan
+    keep = list(cov.columns)
+    expected_cov, expected_shrinkage = _pairwise_ledoit_wolf(expected[keep])
+    assert np.isclose(shrinkage, expected_shrinkage) and np.allclose(cov.values, expected_cov)
+
+def test_short_histories_keep_their_volatility():
+    rets = _returns()
+    rets.iloc[:90, 0] = np.nan  # listed 30 days ago
+    rets["c1"] *= 3
+    fm = RiskModel.from_returns(rets).factor_model(min_obs=20)
+    young = rets["c0"].dropna()
+    assert np.isclose(fm["observations"]["c0"], 30)
+    # Pairwise normalisation: the new coin's variance is its own (not scaled by 30/120)
+    sample = RiskModel.from_returns(rets).sample_covariance()
+    assert np.isclose(sample[0, 0], young.var(ddof=0))
+    assert fm["risk"].loc["c0", "total_vol"] > 0.6 * fm["risk"]["total_vol"].drop(["c0", "c1"]).mean()
+    assert np.linalg.eigvalsh(fm["covariance"].to_numpy()).min() > -1e-12
+
+def test_latest_row_is_provisional_and_window_rolls():
+    rets = _returns()
+    model = RiskModel(window=60)
+    for t in [30, 31, 75, 76, 120]:
+        intraday = rets.iloc[:t].copy()
+        intraday.iloc[-1] *= 3.0  # today's return from an intraday price
+        model.update(intraday)
+        model.update(rets.iloc[:t])
+        cov, shrinkage = model.ledoit_wolf(min_obs=10)
+        expected, expected_shrinkage = ledoit_wolf(rets.iloc[max(0, t - 60):t].values)
+        assert np.isclose(shrinkage, expected_shrinkage) and np.allclose(cov.values, expected)
+    # Without a window the statistics cover every committed row and the provisional one
+    expanding = RiskModel()
+    intraday = rets.iloc[:50].copy()
+    intraday.iloc[-1] *= 3.0
+    expanding.update(intraday)
+    expanding.update(rets)
+    assert np.allclose(expanding.ledoit_wolf()[0].values, ledoit_wolf(rets.values)[0])
+
+def test_factor_model_and_portfolio_risk():
+    rets = _returns()
+    fm = RiskModel.from_returns(rets).factor_model(n_factors=3)
+    ev = fm["explained_variance"]
+    assert ev["ratio"].is_monotonic_decreasing and ev["ratio"].iloc[0] > 0.2
+    assert (fm["loadings"]["PC1"] > 0).mean() > 0.9  # market factor
+    risk = fm["risk"]
+    assert np.allclose(risk["total_vol"] ** 2, risk["factor_vol"] ** 2 + risk["idio_vol"] ** 2)
+    port = portfolio_risk(fm, {c: 1 / 40 for c in rets.columns})
+    assert np.isclose(port["total_vol"] ** 2, port["factor_vol"] ** 2 + port["idio_vol"] ** 2)
+    assert port["idio_vol"] < risk["idio_vol"].mean()  # diversified away
+
+def test_correlation_matrix_uses_returns():
+    idx = pd.date_range("2025-01-01", periods=50, freq="D")
+    rng = np.random.default_rng(0)
+    trend = pd.Series(np.linspace(1, 2, 50), index=idx)
+    a = trend * np.exp(rng.normal(0, 0.02, 50))
+    b = trend * np.exp(rng.normal(0, 0.02, 50))
+    # Prices share a trend but their returns are independent
+    assert abs(compute_correlation_matrix({"a": a, "b": b}).loc["a", "b"]) < 0.5
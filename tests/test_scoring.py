@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+from utils.scoring import DEFAULT_WEIGHTS, factor_fields, forecast_label, load_weights, save_weights, score_batch, score_record
+
+def _original(r):
+    """weighted_score as it was written before the weights became data."""
+    b = {
+        'Utility/Use Case': 1 if r['utility'] else 0,
+        'Tokenomics & Fundamentals': 0.3 * r['deflationary'] + 0.2 * (r['staking_apy'] >= 50) + 0.3 * r['team_locked'] + 0.2 * r['fair_distribution'],
+        'Whale Concentration': -1 if r['whale_concentration'] else 0,
+        'Liquidity & Trading Volume': 0.4 * (r['liquidity_usd'] >= 500000) + 0.2 * r['liquidity_locked'] + 0.2 * (r['daily_volume'] >= 100000) + 0.2 * r['organic'],
+        'Social Sentiment & Community': 0.4 * r['trending'] + 0.4 * r['active_community'] + 0.4 * (r['meme_virality'] / 5) + 0.4 * r['growth'] - 0.4 * r['hype_volatility'],
+        'Macroeconomic Tailwinds': 0.34 * r['interest_rates_low'] + 0.33 * r['favorable_inflation'] + 0.33 * r['regulatory_news'],
+        'Transparency & Security': (0.3 * r['audited'] + 0.2 * r['doxxed_team'] + 0.2 * r['open_source'] + 0.2 * r['verified_contract'] + 0.1 * r['active_dev']) * 2,
+        'Red Flags': -2 * (r['renounced_ownership'] + r['honeypot'] + r['rugpull_pattern']),
+    }
+    total = 0
+    for v in b.values():
+        total += v
+    return max(0, min(10, total)), b
+
+def _universe(n=2000, seed=5):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({f: rng.random(n) < 0.5 for f in factor_fields()}, index=[f"coin{i}" for i in range(n)])
+    df["staking_apy"] = rng.choice([0, 49.9, 50, 120], n)
+    df["liquidity_usd"] = rng.choice([0, 499999, 500000, 2e6], n)
+    df["daily_volume"] = rng.choice([0, 99999, 100000, 5e5], n)
+    df["meme_virality"] = rng.integers(0, 11, n)
+    bad = ["whale_concentration", "hype_volatility", "renounced_ownership", "honeypot", "rugpull_pattern"]
+    good = [f for f in factor_fields() if f not in bad + ["staking_apy", "liquidity_usd", "daily_volume", "meme_virality"]]
+    # A few perfect coins, so every forecast bucket is reached
+    df.loc[df.index[:10], bad] = False
+    df.loc[df.index[:10], good] = True
+    df.loc[df.index[:10], ["staking_apy", "liquidity_usd", "daily_volume", "meme_virality"]] = [50, 500000, 100000, 10]
+    return df
+
+def test_batch_is_identical_to_weighted_score():
+    df = _universe()
+    out = score_batch(df)
+    for i, (coin, row) in enumerate(df.iterrows()):
+        total, breakdown = _original(row.to_dict())
+        assert out["total"][i] == total and score_record(row.to_dict())[0] == total
+        assert out["breakdown"].loc[coin].tolist() == list(breakdown.values())
+        assert out["forecast"][i] == forecast_label(total)
+    assert list(out["breakdown"].columns) == [c["name"] for c in DEFAULT_WEIGHTS["categories"]]
+    assert set(out["forecast"]) == {label for _, label in DEFAULT_WEIGHTS["forecast"]} | {DEFAULT_WEIGHTS["forecast_default"]}
+
+def test_weights_are_data(tmp_path):
+    path = str(tmp_path / "weights.json")
+    weights = load_weights(path)
+    weights["categories"][0]["terms"][0]["weight"] = 3
+    weights["forecast"][1][0] = 3.5
+    save_weights(weights, path)
+    reloaded = load_weights(path)
+    df = _universe(200)
+    out = score_batch(df, reloaded)
+    ref = score_batch(df)
+    np.testing.assert_array_equal(out["breakdown"]["Utility/Use Case"], 3 * df["utility"])
+    assert (out["forecast"][(out["total"] >= 3.5) & (out["total"] < 8)] == weights["forecast"][1][1]).all()
+    assert (out["total"] >= ref["total"]).all()
+    with pytest.raises(ValueError):
+        score_batch(df.drop(columns="honeypot"))
+    with pytest.raises(ValueError):
+        save_weights({**weights, "forecast": [[1, "a"], [2, "b"]]}, path)
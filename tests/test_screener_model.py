@@ -0,0 +1,72 @@
+import itertools
+import math
+import time
+import numpy as np
+import pandas as pd
+import pytest
+from utils.screener_model import ScreenerModelStore, train_model, tree_shap, FEATURES
+
+def _data(n=120, seed=0):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.normal(size=(n, len(FEATURES))), columns=FEATURES, index=[f"coin{i}" for i in range(n)])
+    y = (X["volatility"] - X["recent_return"] * X["correlation_btc"] > 0).astype(int).to_numpy()
+    return X, y
+
+def _brute_force(model, x):
+    """Shapley values from the definition, with cover-weighted expectations over missing features."""
+    def value(tree, S):
+        t = tree.tree_
+        def rec(n):
+            if t.children_left[n] == -1:
+                return t.value[n, 0, 1] / t.value[n, 0].sum()
+            l, r, f = t.children_left[n], t.children_right[n], t.feature[n]
+            if f in S:
+                return rec(l) if np.float32(x[f]) <= t.threshold[n] else rec(r)
+            cover = t.weighted_n_node_samples
+            return (cover[l] * rec(l) + cover[r] * rec(r)) / cover[n]
+        return rec(0)
+    m = len(x)
+    phi = np.zeros(m)
+    for i in range(m):
+        others = [j for j in range(m) if j != i]
+        for k in range(m):
+            for S in itertools.combinations(others, k):
+                w = math.factorial(k) * math.factorial(m - k - 1) / math.factorial(m)
+                phi[i] += w * np.mean([value(t, set(S) | {i}) - value(t, set(S)) for t in model.estimators_])
+    return phi
+
+def test_tree_shap_is_exact_and_additive():
+    X, y = _data()
+    model = train_model(X.to_numpy(), y, n_estimators=8, max_depth=4)
+    values, expected = tree_shap(model, X.to_numpy())
+    np.testing.assert_allclose(values.sum(axis=1) + expected, model.predict_proba(X.to_numpy())[:, 1], atol=1e-12)
+    for row in [0, 7]:
+        np.testing.assert_allclose(values[row], _brute_force(model, X.to_numpy()[row]), atol=1e-12)
+
+def test_single_class_is_rejected():
+    X, _ = _data()
+    with pytest.raises(ValueError):
+        train_model(X.to_numpy(), np.ones(len(X)))
+
+def test_store_persists_and_serves_previous_version_while_retraining(tmp_path):
+    X, y = _data()
+    store = ScreenerModelStore(str(tmp_path))
+    bundle, current = store.get("low_20240101_u", X, y)
+    assert current and (tmp_path / "screener_low_20240101_u.joblib").exists()
+    # A fresh store (new process) loads from disk instead of retraining
+    reloaded = ScreenerModelStore(str(tmp_path))
+    again, current = reloaded.get("low_20240101_u", X, y)
+    assert current
+    pd.testing.assert_frame_equal(again["shap"], bundle["shap"])
+    # New data version: the previous bundle answers immediately, the new one trains in the background
+    previous, current = reloaded.get("low_20240102_u", X, y)
+    assert not current and previous["key"] == "low_20240101_u"
+    deadline = time.time() + 30
+    while reloaded.load("low_20240102_u") is None and time.time() < deadline:
+        time.sleep(0.05)
+    assert reloaded.get("low_20240102_u", X, y)[1]
+    # Coins the bundle has not seen are explained on demand and cached
+    extra = X.iloc[:2].rename(index=lambda c: c + "_new")
+    rows = reloaded.attributions(bundle, pd.concat([X.iloc[:3], extra]))
+    assert rows.notna().all().all() and "coin0_new" in bundle["shap"].index
+    np.testing.assert_allclose(rows.loc["coin0_new"], rows.loc["coin0"])
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+from utils.backtest import run_backtest, sma_crossover_positions, rsi_threshold_positions
+from utils.streaming import (
+    SmaCrossStrategy, RsiStrategy, EquitySampler, save_history, history_path, stream_bars, frame_bars,
+    run_streaming_backtest
+)
+
+def _prices(n=300, seed=4):
+    rng = np.random.default_rng(seed)
+    idx = pd.date_range("2025-01-01", periods=n, freq="D")
+    return pd.Series(100 * np.exp(np.cumsum(rng.normal(0, 0.04, n))), index=idx)
+
+class AlwaysLong:
+    __slots__ = ()
+
+    def on_close(self, close):
+        return 1
+
+def test_matches_vectorized_engine_without_stops():
+    p = _prices()
+    df = pd.DataFrame({"date": p.index, "price": p.values})
+    cols = ["total_return", "sharpe", "max_drawdown", "trades", "exposure", "win_rate"]
+    for strategy, positions in [(SmaCrossStrategy(5, 20), sma_crossover_positions(p, 5, 20)),
+                                (RsiStrategy(14, 70, 30), rsi_threshold_positions(p, 14, 70, 30))]:
+        streamed = run_streaming_backtest(frame_bars(df), strategy, fee_bps=0, slippage_bps=0)["metrics"]
+        vectorized = run_backtest(p, positions, fee_bps=0, slippage_bps=0)["metrics"].iloc[0]
+        assert np.allclose(streamed[cols].to_numpy(float), vectorized[cols].to_numpy(float))
+
+def test_stop_orders_fill_at_level_or_gap_open():
+    ts = pd.date_range("2025-01-01", periods=4, freq="min")
+    bars = pd.DataFrame({"timestamp": ts, "open": [100, 100, 104, 93], "high": [100, 106, 112, 95],
+                         "low": [100, 99, 103, 90], "close": [100, 105, 110, 94]})
+    trail = run_streaming_backtest(frame_bars(bars), AlwaysLong(), trailing_stop=0.1, fee_bps=0, slippage_bps=0)
+    # Peak high 112 -> trailing level 100.8, the last bar gaps below it and fills at the open
+    assert trail["trades"]["exit_reason"].iloc[0] == "trailing_stop"
+    assert trail["trades"]["exit_price"].iloc[0] == 93
+    take = run_streaming_backtest(frame_bars(bars), AlwaysLong(), take_profit=0.05, fee_bps=0, slippage_bps=0)
+    assert take["trades"]["exit_reason"].iloc[0] == "take_profit" and take["trades"]["exit_price"].iloc[0] == 105
+
+def test_streams_from_disk_in_chunks_with_bounded_outputs(tmp_path):
+    n = 20000
+    close = 100 * np.exp(np.cumsum(np.random.default_rng(0).normal(0, 0.002, n)))
+    bars = pd.DataFrame({"timestamp": pd.date_range("2025-01-01", periods=n, freq="min"), "close": close})
+    assert save_history("coin", bars.iloc[:15000], tmp_path) == 15000
+    assert save_history("coin", bars.iloc[10000:], tmp_path) == 5000  # overlap is skipped
+    result = run_streaming_backtest(stream_bars(history_path("coin", tmp_path), chunksize=3000), SmaCrossStrategy(10, 50),
+                                    stop_loss=0.01, max_points=500, max_trades=20)
+    assert result["bars"] == n and result["bars_per_sec"] > 0
+    assert len(result["equity"]) <= 501 and len(result["trades"]) == 20 < result["metrics"]["trades"]
+
+def test_equity_sampler_halves_resolution():
+    sampler = EquitySampler(max_points=8)
+    for i in range(100):
+        sampler.add(i, float(i))
+    assert len(sampler.points) < 8 and sampler.points[0] == (0, 0.0)
@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+import pytest
+from utils.stress import (scenario_shocks, shock_matrix, exposure_matrix, run_stress_tests, worst_window, scenario_assets, history_days,
+                          load_scenarios, save_scenarios, validate_scenario, DEFAULT_SCENARIOS)
+
+ASSETS = ["bitcoin", "ethereum", "dogecoin", "pepe"]
+
+def _prices(T=120, seed=4):
+    rng = np.random.default_rng(seed)
+    market = rng.normal(0, 0.03, T)
+    R = market[:, None] * np.array([1.0, 1.2, 1.8, 2.5]) + rng.normal(0, 0.01, (T, 4))
+    R[60:67] -= 0.05  # a crash week
+    idx = pd.date_range("2024-01-01", periods=T, freq="D")
+    return pd.DataFrame(100 * np.cumprod(1 + R, axis=0), index=idx, columns=ASSETS)
+
+def _loadings():
+    return pd.DataFrame({"f1": [0.02, 0.024, 0.036, 0.05], "f2": [0.0, 0.005, -0.01, 0.01]}, index=ASSETS)
+
+def _holdings():
+    return pd.DataFrame({"portfolio": ["a", "a", "b", "b", "c"],
+                         "asset": ["bitcoin", "pepe", "ethereum", "dogecoin", "bitcoin"],
+                         "amount": [1.0, 10.0, 2.0, 5.0, 3.0]})
+
+def test_absolute_and_relative_shocks():
+    s = scenario_shocks({"name": "x", "type": "absolute", "shocks": {"bitcoin": -0.3, "unknown": 0.5}, "default": -0.1}, ASSETS)
+    assert s.tolist() == pytest.approx([-0.3, -0.1, -0.1, -0.1])
+    vol = pd.Series([0.02, 0.03, 0.05, 0.08], index=ASSETS)
+    r = scenario_shocks({"name": "y", "type": "relative", "default": -2.0, "sigmas": {"pepe": -1.0}, "horizon": 4}, ASSETS, volatility=vol)
+    assert r.tolist() == pytest.approx([-0.08, -0.12, -0.2, -0.16])
+
+def test_beta_propagation_with_meme_multiplier():
+    L = _loadings()
+    scenario = {"name": "btc", "type": "beta", "drivers": {"bitcoin": -0.1}, "meme_multiplier": 2.0, "multipliers": {"pepe": 3.0}}
+    s = scenario_shocks(scenario, ASSETS, loadings=L, meme_coins=["dogecoin", "pepe"])
+    assert s["bitcoin"] == pytest.approx(-0.1)
+    # One driver: min-norm factor move along bitcoin's loadings, scaled onto the others
+    f = -0.1 * L.loc["bitcoin"].to_numpy() / (L.loc["bitcoin"] ** 2).sum()
+    assert s["ethereum"] == pytest.approx(L.loc["ethereum"].to_numpy() @ f)
+    assert s["dogecoin"] == pytest.approx(2 * L.loc["dogecoin"].to_numpy() @ f)
+    assert s["pepe"] == pytest.approx(3 * L.loc["pepe"].to_numpy() @ f)
+    crash = scenario_shocks(dict(scenario, drivers={"bitcoin": -0.3}), ASSETS, loadings=L, meme_coins=["pepe"])
+    assert crash["pepe"] == -1.0  # 3x beta would lose more than everything
+    with pytest.raises(ValueError):
+        scenario_shocks(scenario, ASSETS)
+
+def test_beta_driver_not_held():
+    # A meme-only book still moves with bitcoin: the driver is fetched for the risk model
+    scenario = DEFAULT_SCENARIOS[0]
+    assert scenario_assets(["pepe", "dogecoin"], [scenario]) == ("bitcoin", "dogecoin", "pepe")
+    holdings = pd.DataFrame({"portfolio": ["m", "m"], "asset": ["dogecoin", "pepe"], "amount": [100.0, 10.0]})
+    prices = _prices()
+    exposures = exposure_matrix(holdings, prices)
+    res = run_stress_tests(exposures, [scenario], loadings=_loadings(), meme_coins=["dogecoin", "pepe"])
+    assert res["pnl_pct"].iloc[0, 0] < -0.3
+    assert list(res["shocks"].columns) == ["dogecoin", "pepe"]
+
+def test_historical_replay_and_worst_window():
+    prices = _prices()
+    start, end = worst_window(prices, 7)
+    assert pd.Timestamp("2024-02-28") <= end <= pd.Timestamp("2024-03-10")
+    s = scenario_shocks({"name": "h", "type": "historical", "worst_window": 7}, ASSETS, prices=prices)
+    assert s.tolist() == pytest.approx((prices.loc[end] / prices.loc[start] - 1).tolist())
+    # A crash in the first days of the history is a window starting at the first bar
+    early = prices.copy()
+    early.iloc[1:] *= 0.5  # crash on day 2
+    assert worst_window(early, 7) == (prices.index[0], prices.index[7])
+    with pytest.raises(ValueError):
+        worst_window(prices.iloc[:7], 7)
+    # A coin without prices in the window follows the others through the loadings
+    gappy = prices.copy()
+    gappy.loc[:"2024-03-31", "pepe"] = np.nan
+    h = scenario_shocks({"name": "d", "type": "historical", "start": "2024-03-01", "end": "2024-03-08"}, ASSETS,
+                        prices=gappy, loadings=_loadings())
+    assert h["pepe"] < 0 and h["bitcoin"] == pytest.approx(gappy.loc["2024-03-08", "bitcoin"] / gappy.loc["2024-03-01", "bitcoin"] - 1)
+
+def test_dated_window_outside_history_raises():
+    prices = _prices()
+    crash = {"name": "May 2021", "type": "historical", "start": "2021-05-10", "end": "2021-05-20"}
+    with pytest.raises(ValueError, match="outside the loaded price history"):
+        scenario_shocks(crash, ASSETS, prices=prices)
+    with pytest.raises(ValueError):
+        scenario_shocks({**crash, "start": "2024-04-20", "end": "2024-05-20"}, ASSETS, prices=prices)  # runs past the end
+    # Enough days are requested to cover the earliest dated window
+    assert history_days([crash, DEFAULT_SCENARIOS[3]], 90, today="2021-06-01") == 90  # already covered
+    assert history_days([crash], 90, today="2024-01-01") == (pd.Timestamp("2024-01-01") - pd.Timestamp("2021-05-10")).days + 2
+    assert history_days(DEFAULT_SCENARIOS, 90) == 90
+
+def test_pnl_matrix_matches_per_portfolio_loop():
+    prices = _prices()
+    exposures = exposure_matrix(_holdings(), prices)
+    scenarios = [
+        {"name": "btc", "type": "beta", "drivers": {"bitcoin": -0.3}, "meme_multiplier": 2.0},
+        {"name": "eth", "type": "absolute", "shocks": {"ethereum": -0.25}},
+        {"name": "crash", "type": "historical", "worst_window": 7},
+    ]
+    res = run_stress_tests(exposures, scenarios, prices=prices, loadings=_loadings(), meme_coins=["pepe"])
+    shocks = shock_matrix(scenarios, list(exposures.columns), prices=prices, loadings=_loadings(), meme_coins=["pepe"])
+    last = prices.iloc[-1]
+    for p, rows in _holdings().groupby("portfolio"):
+        for name in shocks.index:
+            expected = sum(r.amount * last[r.asset] * shocks.loc[name, r.asset] for r in rows.itertuples())
+            assert res["pnl"].loc[p, name] == pytest.approx(expected)
+    assert res["pnl"].shape == (3, 3)
+    assert res["pnl_pct"].loc["b", "eth"] == pytest.approx(-0.25 * 2 * last["ethereum"] / res["value"]["b"])
+
+def test_library_round_trip(tmp_path):
+    path = str(tmp_path / "scenarios.json")
+    assert [s["name"] for s in load_scenarios(path)] == [s["name"] for s in DEFAULT_SCENARIOS]
+    library = load_scenarios(path) + [{"name": "luna", "type": "historical", "start": "2022-05-07", "end": "2022-05-12"}]
+    save_scenarios(library, path)
+    assert load_scenarios(path) == library
+    with pytest.raises(ValueError):
+        validate_scenario({"name": "bad", "type": "historical"})
+    with pytest.raises(ValueError):
+        save_scenarios([{"name": "bad", "type": "nope"}], path)
+    assert load_scenarios(path) == library
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+from main import calc_rsi
+from utils.backtest import run_backtest, sma_crossover_positions, rsi_threshold_positions, volatility_target_size
+from utils.sweep import sweep_sma, sweep_rsi, rsi_matrix, heatmap, top_k
+
+def _price(n=200, seed=3):
+    rng = np.random.default_rng(seed)
+    idx = pd.date_range("2025-01-01", periods=n, freq="D")
+    return pd.Series(100 * np.exp(np.cumsum(rng.normal(0, 0.04, n))), index=idx, name="p")
+
+COLS = ["total_return", "cagr", "sharpe", "max_drawdown", "trades", "exposure"]
+
+def test_sma_sweep_matches_single_backtests():
+    p = _price()
+    res = sweep_sma(p, range(3, 12), range(10, 40, 5))
+    assert ((res["fast"] < res["slow"]).all())
+    for fast, slow in [(5, 20), (3, 10), (11, 35)]:
+        row = res[(res["fast"] == fast) & (res["slow"] == slow)].iloc[0]
+        single = run_backtest(p, sma_crossover_positions(p, fast, slow))["metrics"].iloc[0]
+        assert np.allclose(row[COLS].to_numpy(float), single[COLS].to_numpy(float))
+
+def test_rsi_sweep_matches_single_backtests():
+    p = _price()
+    assert np.allclose(rsi_matrix(p.values, [14])[0], calc_rsi(p, 14), equal_nan=True)
+    res = sweep_rsi(p, [7, 14], [65, 70], [25, 30, 35])
+    assert len(res) == 12
+    row = res[(res["window"] == 14) & (res["overbought"] == 70) & (res["oversold"] == 30)].iloc[0]
+    single = run_backtest(p, rsi_threshold_positions(p, 14, 70, 30))["metrics"].iloc[0]
+    assert np.allclose(row[COLS].to_numpy(float), single[COLS].to_numpy(float))
+
+def test_process_pool_fallback_gives_same_grid():
+    p = _price()
+    in_memory = sweep_sma(p, range(3, 9), range(10, 30))
+    chunked = sweep_sma(p, range(3, 9), range(10, 30), max_bytes=1, max_workers=2)
+    pd.testing.assert_frame_equal(in_memory, chunked)
+
+def test_heatmap_and_top_k():
+    res = sweep_sma(_price(), range(3, 8), range(10, 20))
+    grid = heatmap(res, "slow", "fast", "sharpe")
+    assert grid.shape == (5, 10)
+    best = top_k(res, "sharpe", 3)
+    assert best["sharpe"].is_monotonic_decreasing and best["sharpe"].iloc[0] == res["sharpe"].max()
+    assert top_k(res, "max_drawdown", 1)["max_drawdown"].iloc[0] == res["max_drawdown"].min()
+
+def test_volatility_target_size_in_sweeps():
+    p = _price()
+    size = volatility_target_size(p, target_vol=0.3)  # (T, 1) DataFrame
+    res = sweep_sma(p, range(3, 8), range(10, 20), size=size)
+    row = res[(res["fast"] == 5) & (res["slow"] == 15)].iloc[0]
+    single = run_backtest(p, sma_crossover_positions(p, 5, 15), size=size)["metrics"].iloc[0]
+    assert np.allclose(row[COLS].to_numpy(float), single[COLS].to_numpy(float))
+    rsi = sweep_rsi(p, [7, 14], [70], [30], size=size["p"])
+    single = run_backtest(p, rsi_threshold_positions(p, 14, 70, 30), size=size)["metrics"].iloc[0]
+    assert np.allclose(rsi[rsi["window"] == 14].iloc[0][COLS].to_numpy(float), single[COLS].to_numpy(float))
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+from utils.volatility import (
+    ESTIMATORS, rolling_mean, rolling_var, rolling_volatility_panel, volatility_term_structure,
+    close_only_panels, bar_days
+)
+
+def _panels(n=400, k=3, sigma=0.04, seed=0):
+    rng = np.random.default_rng(seed)
+    idx = pd.date_range("2025-01-01", periods=n, freq="D")
+    close = pd.DataFrame(100 * np.exp(np.cumsum(rng.normal(0, sigma, (n, k)), axis=0)), index=idx)
+    open_ = close.shift(1).fillna(close.iloc[0])
+    return {"open": open_, "high": np.maximum(open_, close) * 1.01, "low": np.minimum(open_, close) * 0.99, "close": close}
+
+def test_rolling_helpers_match_pandas():
+    panels = _panels()
+    rets = np.log(panels["close"]).diff()
+    rets.iloc[100:105, 1] = np.nan
+    pd.testing.assert_frame_equal(rolling_mean(rets, 20), rets.rolling(20).mean(), check_exact=False, atol=1e-12)
+    pd.testing.assert_frame_equal(rolling_var(rets, 20), rets.rolling(20).var(), check_exact=False, atol=1e-12)
+
+def test_close_to_close_recovers_annualised_sigma():
+    vol = rolling_volatility_panel(_panels(sigma=0.04), 90, "close_to_close")
+    assert np.allclose(vol.iloc[-1], 0.04 * np.sqrt(365), rtol=0.2)
+
+def test_term_structure_covers_all_estimators():
+    table = volatility_term_structure(_panels(), windows_days=[7, 30])
+    assert set(table.index.get_level_values("estimator")) == set(ESTIMATORS)
+    assert table.shape == (len(ESTIMATORS) * 2, 3)
+    assert (table > 0).all().all()
+
+def test_term_structure_drops_windows_with_too_few_candles():
+    panels = _panels(n=23)
+    four_day = {k: v.set_axis(pd.date_range("2025-01-01", periods=23, freq="4D")) for k, v in panels.items()}
+    table = volatility_term_structure(four_day, windows_days=[7, 14, 30, 60])
+    assert sorted(set(table.index.get_level_values("window_days"))) == [30, 60]
+    assert volatility_term_structure(four_day, windows_days=[7, 14]).empty
+
+def test_close_only_panels_leave_range_estimators_empty():
+    panels = close_only_panels(_panels()["close"])
+    table = volatility_term_structure(panels, windows_days=[30])
+    assert table.loc["close_to_close"].notna().all().all()
+    assert table.loc["parkinson"].isna().all().all()
+
+def test_bar_days_for_intraday_index():
+    assert bar_days(pd.date_range("2025-01-01", periods=10, freq="4h")) == 1 / 6
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+from utils.backtest import run_backtest, sma_crossover_positions
+from utils.sweep import sweep_sma, top_k
+from utils.walkforward import walk_forward_folds, run_walk_forward
+
+def _prices(n=160, k=2, seed=5):
+    rng = np.random.default_rng(seed)
+    idx = pd.date_range("2025-01-01", periods=n, freq="D")
+    return pd.DataFrame(100 * np.exp(np.cumsum(rng.normal(0, 0.04, (n, k)), axis=0)), index=idx, columns=["a", "b"])
+
+def test_folds_roll_and_anchor():
+    assert walk_forward_folds(100, 60, 20) == [(0, 60, 60, 80), (20, 80, 80, 100)]
+    assert walk_forward_folds(100, 60, 20, anchored=True) == [(0, 60, 60, 80), (0, 80, 80, 100)]
+    assert walk_forward_folds(50, 60, 20) == []
+
+def test_fold_uses_train_only_and_stitches_test_windows():
+    prices = _prices()
+    grid = {"fast": range(3, 8), "slow": range(10, 30, 5)}
+    res = run_walk_forward(prices, "sma", train_bars=60, test_bars=50, grid=grid, max_workers=0)
+    folds = res["folds"]
+    assert len(folds) == 4 and res["equity"].index[0] == prices.index[60]
+    # Same parameters as a sweep on the first train window alone
+    best = top_k(sweep_sma(prices["a"].values[:60], grid["fast"], grid["slow"]), "sharpe", 1).iloc[0]
+    first = folds[(folds["asset"] == "a") & (folds["fold"] == 1)].iloc[0]
+    assert (first["fast"], first["slow"]) == (best["fast"], best["slow"])
+    # The stitched positions are each fold's own positions over its test window
+    expected = sma_crossover_positions(prices["a"].iloc[:110], int(first["fast"]), int(first["slow"])).iloc[60:110, 0]
+    assert np.array_equal(res["positions"]["a"].iloc[:50].values, expected.values)
+    rerun = run_backtest(prices.iloc[60:], res["positions"])
+    pd.testing.assert_frame_equal(rerun["equity"], res["equity"])
+
+def test_process_pool_matches_serial_and_unlisted_coin_stays_flat():
+    prices = _prices()
+    prices.iloc[:70, 1] = np.nan
+    kwargs = dict(strategy="rsi", train_bars=60, test_bars=50, grid={"window": [7, 14], "overbought": [70], "oversold": [30]})
+    serial = run_walk_forward(prices, max_workers=0, **kwargs)
+    parallel = run_walk_forward(prices, max_workers=2, **kwargs)
+    pd.testing.assert_frame_equal(serial["folds"], parallel["folds"])
+    pd.testing.assert_frame_equal(serial["equity"], parallel["equity"])
+    assert (serial["positions"]["b"].iloc[:50] == 0).all()
@@ -0,0 +1,143 @@
+import numpy as np
+import pandas as pd
+from utils.volatility import rolling_mean
+
+# === VECTORIZED BACKTESTING ENGINE ===
+# Signals become position series (fraction of capital held, negative = short), which are
+# applied to price panels (index = date, columns = coins) in a handful of array operations.
+# A position decided at the close of day t earns the return of day t+1, so there is no
+# look-ahead. Fees and slippage are charged on every change in position (turnover).
+
+PERIODS_PER_YEAR = 365
+
+def as_panel(prices):
+    """Accepts a Series or DataFrame of prices and returns a float DataFrame."""
+    if isinstance(prices, pd.Series):
+        prices = prices.to_frame(prices.name or "asset")
+    return prices.astype(float)
+
+# --- Signals -> positions ---
+def state_from_signals(entries, exits):
+    """
+    Turns boolean entry/exit signal panels into a 0/1 holding state: in the market from an
+    entry until the next exit. An exit on the same bar as an entry wins (stay flat).
+    """
+    entries = entries.fillna(False).astype(bool)
+    exits = exits.reindex_like(entries).fillna(False).astype(bool)
+    marks = np.where(exits.values, 0.0, np.where(entries.values, 1.0, np.nan))
+    state = pd.DataFrame(marks, index=entries.index, columns=entries.columns).ffill().fillna(0.0)
+    return state
+
+def volatility_target_size(prices, target_vol=0.5, window=30, max_leverage=1.0, periods_per_year=PERIODS_PER_YEAR):
+    """
+    Position size per bar that scales exposure to an annualised volatility target,
+    using trailing realised volatility (known at the close of each bar).
+    """
+    prices = as_panel(prices)
+    rets = prices.pct_change()
+    vol = np.sqrt((rets ** 2).pipe(rolling_mean, window) * periods_per_year)
+    return (target_vol / vol).clip(upper=max_leverage).fillna(0.0)
+
+def sma_crossover_positions(prices, fast=7, slow=21):
+    """Long while the fast SMA is above the slow SMA (SMA Crossover strategy)."""
+    prices = as_panel(prices)
+    sma_fast = rolling_mean(prices, fast)
+    sma_slow = rolling_mean(prices, slow)
+    return (sma_fast > sma_slow).astype(float)
+
+def rsi_panel(prices, window=14):
+    """calc_rsi (main.py) for a whole price panel in one pass."""
+    delta = prices.diff()
+    ma_up = rolling_mean(delta.clip(lower=0), window)
+    ma_down = rolling_mean(-delta.clip(upper=0), window)
+    return 100 - (100 / (1 + ma_up / ma_down))
+
+def rsi_threshold_positions(prices, window=14, overbought=70, oversold=30):
+    """Buy when RSI drops below `oversold`, sell when it rises above `overbought` (RSI strategy)."""
+    prices = as_panel(prices)
+    rsi = rsi_panel(prices, window)
+    return state_from_signals(rsi < oversold, rsi > overbought)
+
+# --- Engine ---
+def run_backtest(prices, positions, fee_bps=10.0, slippage_bps=5.0, size=1.0, initial_capital=1.0,
+                 periods_per_year=PERIODS_PER_YEAR):
+    """
+    Applies positions to prices for every column at once.
+    positions: target fraction of capital per bar (same shape as prices); size scales it
+    (scalar or a panel such as volatility_target_size).
+    Returns a dict with 'returns', 'equity', 'positions', 'turnover' panels, a 'trades' list
+    and a 'metrics' DataFrame (one row per column).
+    """
+    prices = as_panel(prices)
+    positions = (as_panel(positions).reindex_like(prices).fillna(0.0) * size).fillna(0.0)
+    rets = prices.pct_change().fillna(0.0)
+    held = positions.shift(1).fillna(0.0)
+    turnover = positions.diff().abs()
+    turnover.iloc[0] = positions.iloc[0].abs()
+    costs = turnover * (fee_bps + slippage_bps) / 1e4
+    strat = held * rets - costs
+    equity = initial_capital * (1 + strat).cumprod()
+    trades = trade_list(positions, strat)
+    return {
+        "returns": strat,
+        "equity": equity,
+        "positions": positions,
+        "turnover": turnover,
+        "trades": trades,
+        "metrics": summary_metrics(strat, equity, trades, positions, periods_per_year),
+    }
+
+def trade_list(positions, strat_returns):
+    """
+    Round trips from a position panel: a trade opens when a column goes from flat to
+    non-flat and closes when it returns to flat (or at the last bar).
+    Trade return compounds the strategy returns from the entry bar (incl. entry costs) to the exit bar.
+    """
+    pos = positions.values
+    flat_before = np.vstack([np.ones((1, pos.shape[1]), dtype=bool), pos[:-1] == 0])
+    flat_now = pos == 0
+    opens = ~flat_now & flat_before
+    closes = flat_now & ~flat_before
+    closes_shifted = np.zeros_like(closes)
+    closes_shifted[:-1] = closes[1:]
+    # Close on the bar before going flat ...
+    exit_mask = closes_shifted & ~flat_now
+    # ... or at the final bar if still open
+    exit_mask[-1] |= ~flat_now[-1]
+    # Column-major order keeps each column's trades together and in time order
+    e_col, e_row = np.nonzero(opens.T)
+    x_col, x_row = np.nonzero(exit_mask.T)
+    x_row = x_row + 1  # the exit bar's return belongs to the trade (position held into it)
+    x_row = np.minimum(x_row, len(pos) - 1)
+    log_growth = np.vstack([np.zeros((1, pos.shape[1])), np.cumsum(np.log1p(strat_returns.values), axis=0)])
+    trade_ret = np.exp(log_growth[x_row + 1, x_col] - log_growth[e_row, e_col]) - 1
+    index = positions.index
+    return pd.DataFrame({
+        "asset": positions.columns[e_col],
+        "entry_date": index[e_row],
+        "exit_date": index[x_row],
+        "bars": x_row - e_row,
+        "side": np.where(pos[e_row, e_col] > 0, "long", "short"),
+        "return": trade_ret,
+    })
+
+def max_drawdown(equity):
+    """Largest peak-to-trough loss per column (as a positive fraction)."""
+    return (1 - equity / equity.cummax()).max()
+
+def summary_metrics(strat_returns, equity, trades, positions, periods_per_year=PERIODS_PER_YEAR):
+    """CAGR, Sharpe, max drawdown, win rate, trade count and exposure per column."""
+    final = (1 + strat_returns).prod()
+    years = max(len(strat_returns) - 1, 1) / periods_per_year
+    std = strat_returns.std()
+    won = (trades["return"] > 0).groupby(trades["asset"])
+    wins, counts = won.mean(), won.size()
+    return pd.DataFrame({
+        "total_return": final - 1,
+        "cagr": final ** (1 / years) - 1,
+        "sharpe": (strat_returns.mean() / std.replace(0, np.nan)) * np.sqrt(periods_per_year),
+        "max_drawdown": max_drawdown(equity),
+        "win_rate": wins.reindex(strat_returns.columns),
+        "trades": counts.reindex(strat_returns.columns).fillna(0).astype(int),
+        "exposure": (positions != 0).mean(),
+    })
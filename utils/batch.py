@@ -0,0 +1,124 @@
+import json
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from utils.scoring import factor_fields, forecast_label, load_weights, score_record
+
+# === HEADLESS BATCH SCORING ===
+# `python main.py --batch coins.txt` (or `--batch -` for stdin) scores many coins without
+# prompts, for cron jobs and pipelines. Each input line is either a coin name or a JSON
+# object {"coin": ..., <factor field>: value, ...} whose fields override the defaults.
+# Defaults are what prompt_factors would use if every prompt were left empty (prefilled
+# from CoinGecko where it prefills). Fetches run in a bounded thread pool; input is read
+# lazily with a bounded number of coins in flight, and one NDJSON line is written per coin
+# as soon as it finishes (completion order, with the input line number as "line").
+
+MAX_IN_FLIGHT_PER_WORKER = 2
+
+def parse_line(line, weights=None):
+    """(coin, overrides) for one input line, None for blank/comment lines; ValueError if malformed."""
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+    if not line.startswith("{"):
+        return line, {}
+    try:
+        row = json.loads(line)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON: {e}") from None
+    coin = row.pop("coin", None)
+    if not coin:
+        raise ValueError("JSON line needs a 'coin' key.")
+    unknown = sorted(set(row) - set(factor_fields(weights)))
+    if unknown:
+        raise ValueError(f"Unknown factor fields: {', '.join(unknown)}")
+    return coin, row
+
+def default_factors(prefill=None):
+    """Factor record with prompt_factors' defaults (prefilled values where it uses them)."""
+    prefill = prefill or {}
+    record = {f: False for f in factor_fields()}
+    community_score = prefill.get("community_score")
+    public_interest_score = prefill.get("public_interest_score")
+    record.update({
+        "staking_apy": prefill.get("staking_apy", 0),
+        "liquidity_usd": prefill.get("market_cap") or 0,
+        "daily_volume": prefill.get("volume") or 0,
+        "trending": community_score is not None and community_score > 5,
+        "active_community": public_interest_score is not None and public_interest_score > 0,
+        "meme_virality": 3,
+    })
+    return record
+
+def score_coin(coin, overrides, fetch=None, weights=None):
+    """
+    One NDJSON-ready result dict. fetch(coin) returns prefill data or None (no prefill,
+    reported as an error unless the overrides cover every field).
+    """
+    weights = weights or load_weights()
+    prefill = fetch(coin) if fetch is not None else None
+    if fetch is not None and prefill is None and set(factor_fields(weights)) - set(overrides):
+        raise LookupError("No CoinGecko data for coin")
+    record = {**default_factors(prefill), **overrides}
+    total, breakdown = score_record(record, weights)
+    return {
+        "coin": coin,
+        "symbol": (prefill or {}).get("symbol"),
+        "score": total,
+        "forecast": forecast_label(total, weights),
+        "breakdown": breakdown,
+        "factors": record,
+    }
+
+def run_batch(lines, write, fetch=None, max_workers=4, weights=None):
+    """
+    Scores every coin in lines (an iterable of input lines), calling write(dict) once per
+    coin as results complete. Failures are written too, as {"coin", "line", "error"}.
+    Returns a summary dict (coins, scored, failed, seconds, coins_per_second).
+    """
+    weights = weights or load_weights()
+    scored = failed = 0
+    start = time.perf_counter()
+
+    def emit(result):
+        nonlocal scored, failed
+        if "error" in result:
+            failed += 1
+        else:
+            scored += 1
+        write(result)
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="batch-score") as pool:
+        pending = {}
+        for number, line in enumerate(lines, start=1):
+            try:
+                job = parse_line(line, weights)
+            except ValueError as e:
+                emit({"coin": None, "line": number, "error": str(e)})
+                continue
+            if job is None:
+                continue
+            pending[pool.submit(score_coin, *job, fetch, weights)] = (number, job[0])
+            # Bounded number of coins in flight, so a long stdin is never read ahead in full
+            while len(pending) >= max_workers * MAX_IN_FLIGHT_PER_WORKER:
+                pending = _drain(pending, emit)
+        while pending:
+            pending = _drain(pending, emit)
+    seconds = time.perf_counter() - start
+    return {
+        "coins": scored + failed,
+        "scored": scored,
+        "failed": failed,
+        "seconds": seconds,
+        "coins_per_second": (scored + failed) / seconds if seconds > 0 else 0.0,
+    }
+
+def _drain(pending, emit):
+    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+    for future in done:
+        number, coin = pending.pop(future)
+        try:
+            result = {**future.result(), "line": number}
+        except Exception as e:
+            result = {"coin": coin, "line": number, "error": f"{type(e).__name__}: {e}"}
+        emit(result)
+    return pending
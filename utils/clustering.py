@@ -0,0 +1,109 @@
+import hashlib
+import io
+import numpy as np
+import pandas as pd
+import scipy.cluster.hierarchy as sch
+import scipy.spatial.distance as ssd
+
+# === CORRELATION CLUSTERING SERVICE ===
+# Hierarchical clustering of a whole coin universe from log returns. The correlation
+# matrix comes from matrix products over the return panel (a single X^T X when there are no
+# gaps, pairwise-complete sums when coins have different listing dates). Results are keyed by
+# a data version (hash of the price panel) plus the window and linkage method, so callers
+# can cache the linkage and the rendered dendrogram and only recompute on new data.
+
+LINKAGE_METHODS = ["average", "complete", "single", "ward"]
+
+def panel_version(prices):
+    """Short content hash of a price panel, used as the cache key for derived results."""
+    h = hashlib.sha1(pd.util.hash_pandas_object(prices, index=True).to_numpy().tobytes())
+    h.update(",".join(map(str, prices.columns)).encode())
+    return h.hexdigest()[:16]
+
+def log_returns(prices):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.log(prices.astype(float)).diff().iloc[1:]
+
+def correlation_matrix(returns, min_periods=10):
+    """
+    Pearson correlation of every column pair using pairwise-complete observations.
+    Pairs with fewer than min_periods overlapping returns are NaN.
+    """
+    X = returns.to_numpy(dtype=float)
+    valid = np.isfinite(X)
+    if valid.all():
+        Z = X - X.mean(axis=0)
+        cov = Z.T @ Z
+        sd = np.sqrt(np.diag(cov))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            corr = cov / np.outer(sd, sd)
+        n = np.full(cov.shape, len(X))
+    else:
+        M = valid.astype(float)
+        X = np.where(valid, X, 0.0)
+        n = M.T @ M               # overlapping observations per pair
+        sx = X.T @ M              # sum of x_i over the rows where j is also valid
+        sxx = (X * X).T @ M
+        sxy = X.T @ X
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cov = sxy - sx * sx.T / n
+            var_i = sxx - sx ** 2 / n
+            corr = cov / np.sqrt(var_i * var_i.T)
+    corr = np.clip(corr, -1, 1)
+    corr[n < min_periods] = np.nan
+    np.fill_diagonal(corr, 1.0)
+    return pd.DataFrame(corr, index=returns.columns, columns=returns.columns)
+
+def correlation_distance(corr):
+    """1 - |corr| (as in the CorrelationTools dendrogram); missing correlations count as unrelated."""
+    dist = 1 - np.abs(np.nan_to_num(corr.to_numpy(dtype=float), nan=0.0))
+    np.fill_diagonal(dist, 0.0)
+    return np.clip(dist, 0.0, 1.0)
+
+def cluster_universe(prices, window=None, method="average", min_periods=10):
+    """
+    Correlation-distance linkage for every coin in a price panel (index = date, columns = coins).
+    window: use only the last `window` returns (None = all history).
+    Coins with fewer than min_periods returns in the window are left out.
+    Returns a dict with 'corr', 'linkage', 'labels', 'order' (dendrogram leaf order) and 'dropped'.
+    """
+    rets = log_returns(prices)
+    if window:
+        rets = rets.iloc[-window:]
+    counts = np.isfinite(rets.to_numpy(dtype=float)).sum(axis=0)
+    keep = counts >= min_periods
+    dropped = list(rets.columns[~keep])
+    rets = rets.loc[:, keep]
+    if rets.shape[1] < 2:
+        raise ValueError("Need at least two coins with enough history to cluster.")
+    corr = correlation_matrix(rets, min_periods)
+    condensed = ssd.squareform(correlation_distance(corr), checks=False)
+    link = sch.linkage(condensed, method=method)
+    return {
+        "corr": corr,
+        "linkage": link,
+        "labels": list(corr.columns),
+        "order": sch.leaves_list(link),
+        "dropped": dropped,
+    }
+
+def cluster_assignments(clustering, n_clusters):
+    """Cluster id (1..n_clusters) per coin from a cached linkage."""
+    ids = sch.fcluster(clustering["linkage"], t=n_clusters, criterion="maxclust")
+    return pd.Series(ids, index=clustering["labels"], name="cluster")
+
+def render_dendrogram_png(clustering, labels=None):
+    """Dendrogram as PNG bytes; the figure grows with the number of coins so labels stay readable."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    labels = labels or clustering["labels"]
+    n = len(labels)
+    fig, ax = plt.subplots(figsize=(max(8, n * 0.18), 3.5))
+    sch.dendrogram(clustering["linkage"], labels=labels, ax=ax, leaf_font_size=8 if n <= 60 else 5)
+    ax.set_ylabel("1 - |correlation|")
+    fig.tight_layout()
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", dpi=100)
+    plt.close(fig)
+    return buf.getvalue()
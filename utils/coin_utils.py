@@ -1,5 +1,17 @@
+import threading
 import streamlit as st
-from main import fetch_live_meme_coins, fetch_large_cap_coins, fetch_coin_history
+from main import fetch_live_meme_coins, fetch_large_cap_coins, fetch_coin_history, fetch_coin_ohlc, align_price_panel
+from utils.volatility import ohlc_panels, close_only_panels, volatility_term_structure, INTRADAY_OHLC_DAYS
+from utils.clustering import cluster_universe, panel_version, render_dendrogram_png
+from utils.risk_model import RiskModel
+from utils.portfolio_store import PortfolioStore
+from utils.nav import NavEngine
+from utils.optimiser import PortfolioOptimiser
+from utils.portfolio_var import build_model, simulate_var
+from utils.stress import exposure_matrix, history_days, run_stress_tests, scenario_assets
+from utils.features import FeaturePipeline
+from utils.screener_model import ScreenerModelStore
+from utils.query import QueryEngine
 
 @st.cache_data(ttl=600)
 def get_coin_choices():
@@ -19,3 +31,258 @@ def get_price_history(asset_id, days=90):
     Returns a DataFrame or None.
     """
     return fetch_coin_history(asset_id, days=days)
+
+@st.cache_data(ttl=600)
+def get_ohlc_history(asset_id, days=30):
+    """
+    Fetches and caches OHLC candles for a given asset.
+    Returns a DataFrame or None.
+    """
+    return fetch_coin_ohlc(asset_id, days=days)
+
+@st.cache_data(ttl=600)
+def get_volatility_term_structure(asset_id, days=90):
+    """
+    Annualised volatility for one asset by estimator and window, cached per coin.
+    Uses OHLC candles when available, otherwise close-to-close estimators on daily prices.
+    CoinGecko only serves 4-hour candles up to 30 days (4-day candles beyond), so short
+    windows come from a 30-day fetch and only the longer ones from the `days` fetch.
+    Returns a DataFrame indexed by (estimator, window_days) with a single 'volatility' column, or None.
+    """
+    tables = []
+    for span in sorted({min(days, INTRADAY_OHLC_DAYS), days}):
+        ohlc = get_ohlc_history(asset_id, days=span)
+        if ohlc is not None and len(ohlc) > 2:
+            tables.append(volatility_term_structure(ohlc_panels({asset_id: ohlc})))
+    tables = [t for t in tables if not t.empty]
+    if not tables:
+        hist = get_price_history(asset_id, days=days)
+        if hist is None or len(hist) < 3:
+            return None
+        tables = [volatility_term_structure(close_only_panels(hist.set_index("date")[["price"]].rename(columns={"price": asset_id})))]
+    # Finest candles first: a window is taken from the longer fetch only if the short one cannot cover it
+    table = tables[0]
+    for longer in tables[1:]:
+        table = table.combine_first(longer)
+    if table.empty:
+        return None
+    return table.sort_index()[asset_id].rename("volatility").to_frame()
+
+@st.cache_data(ttl=600, show_spinner=False)
+def get_price_panel(asset_ids, days=90):
+    """
+    Aligned daily price panel (index = date, columns = asset ids) for a tuple of assets.
+    Coins keep their own history (NaN before listing); assets without data are omitted.
+    """
+    series = {}
+    for asset_id in asset_ids:
+        hist = get_price_history(asset_id, days=days)
+        if hist is not None and not hist.empty:
+            series[asset_id] = hist.set_index("date")["price"]
+    return align_price_panel(series)
+
+@st.cache_data(ttl=600, show_spinner=False)
+def get_volume_panel(asset_ids, days=90):
+    """Aligned daily 24h-volume panel, same layout as get_price_panel."""
+    series = {}
+    for asset_id in asset_ids:
+        hist = get_price_history(asset_id, days=days)
+        if hist is not None and not hist.empty:
+            series[asset_id] = hist.set_index("date")["volume"]
+    return align_price_panel(series)
+
+@st.cache_data(ttl=3600, max_entries=32, show_spinner=False)
+def get_clustering(data_version, window, method, _prices):
+    """
+    Linkage, correlation matrix and pre-rendered dendrogram PNG for a price panel.
+    Cached by (data_version, window, method); _prices is not hashed, so pass
+    utils.clustering.panel_version(prices) as data_version.
+    """
+    clustering = cluster_universe(_prices, window=window, method=method)
+    clustering["dendrogram_png"] = render_dendrogram_png(clustering)
+    return clustering
+
+@st.cache_resource
+def get_portfolio_store():
+    """Shared SQLite portfolio store (utils/portfolio_store.py); migrates data/portfolios.csv on first use."""
+    return PortfolioStore()
+
+def _shared_entry(store, key, factory):
+    """
+    (lock, object) for key in a process-wide cache_resource store, created on first use.
+    Every Streamlit session shares the object, so hold the lock while updating or reading it.
+    """
+    entry = store.get(key)
+    if entry is None:
+        entry = store.setdefault(key, (threading.Lock(), factory()))  # atomic: one entry per key
+    return entry
+
+@st.cache_resource
+def _nav_engine_store():
+    """Process-wide {(portfolio, days): (lock, NavEngine)} so reruns only value new bars."""
+    return {}
+
+def _portfolio_nav(portfolio, days, read):
+    """read(engine) on the shared NavEngine after folding in new bars, under the engine's lock."""
+    transactions = get_portfolio_store().transactions(portfolio)
+    if transactions.empty:
+        return None
+    prices = get_price_panel(tuple(sorted(transactions["asset"].unique())), days=days)
+    if prices.empty:
+        return None
+    lock, engine = _shared_entry(_nav_engine_store(), (portfolio, days), NavEngine)
+    with lock:
+        engine.update(prices, transactions)
+        return read(engine)
+
+def get_portfolio_nav(portfolio, days=90):
+    """
+    Holdings-weighted NAV, per-asset P&L and contribution (utils/nav.py) for a stored
+    portfolio, valued on the cached daily price panel. Returns the NavEngine.result()
+    dict, or None when the portfolio has no transactions or prices.
+    """
+    return _portfolio_nav(portfolio, days, NavEngine.result)
+
+def get_portfolio_summary(portfolio, days=90):
+    """NavEngine.summary() (latest NAV, 1-day change, P&L, return) for a stored portfolio, or None."""
+    return _portfolio_nav(portfolio, days, NavEngine.summary)
+
+@st.cache_resource
+def _risk_model_store():
+    """Process-wide {(asset_ids, days): (lock, RiskModel)} so refreshes only fold in new bars."""
+    return {}
+
+@st.cache_data(ttl=600, show_spinner=False)
+def get_risk_model(asset_ids, days=90, n_factors=3, min_obs=20):
+    """
+    Ledoit-Wolf covariance and PCA factor model (utils/risk_model.py) for a tuple of assets,
+    shared by the Portfolio, CoinScreener and CorrelationTools pages. The underlying
+    statistics persist across cache refreshes and are updated with the new daily bars only,
+    over a rolling window of the last `days` returns.
+    Returns the factor_model() dict plus 'data_version' (panel_version of the prices it was
+    updated with), or None when there is not enough history.
+    """
+    panel = get_price_panel(asset_ids, days=days)
+    if panel.empty:
+        return None
+    returns = panel.pct_change(fill_method=None).iloc[1:]
+    lock, model = _shared_entry(_risk_model_store(), (tuple(asset_ids), days), lambda: RiskModel(window=days))
+    with lock:
+        model.update(returns)
+        try:
+            result = model.factor_model(n_factors=n_factors, min_obs=min_obs)
+        except ValueError:
+            return None
+    result["data_version"] = panel_version(panel)
+    return result
+
+@st.cache_resource
+def _optimiser_store():
+    """Process-wide {asset_ids: PortfolioOptimiser} so each refresh starts from the last weights."""
+    return {}
+
+def get_optimal_weights(asset_ids, method="min_variance", days=90, risk_aversion=5.0, max_weight=1.0,
+                        frontier_points=0, min_obs=20):
+    """
+    Optimised long-only weights (utils/optimiser.py) for a tuple of assets, using the shared
+    Ledoit-Wolf covariance from get_risk_model and mean daily returns. With frontier_points
+    the result also has 'frontier' and 'frontier_weights'. Returns None without enough history.
+    """
+    model = get_risk_model(asset_ids, days=days, min_obs=min_obs)
+    if model is None or len(model["covariance"]) < 2:
+        return None
+    returns = get_price_panel(asset_ids, days=days).pct_change(fill_method=None).iloc[1:]
+    optimiser = _optimiser_store().setdefault(tuple(asset_ids), PortfolioOptimiser())
+    result = optimiser.optimise(returns, model["covariance"], method, risk_aversion, max_weight)
+    if frontier_points:
+        result["frontier"], result["frontier_weights"] = optimiser.efficient_frontier(
+            returns, model["covariance"], frontier_points, max_weight)
+    return result
+
+@st.cache_data(ttl=600, show_spinner=False)
+def get_portfolio_var(holdings, method="gaussian", n_scenarios=100_000, confidence=0.95, horizon=1, days=90):
+    """
+    Monte Carlo VaR/CVaR (utils/portfolio_var.py) for a book given as a tuple of
+    (asset_id, position value) pairs. The gaussian method uses the shared Ledoit-Wolf
+    covariance; fhs bootstraps EWMA-filtered daily returns. Returns None without history.
+    """
+    asset_ids = tuple(sorted(a for a, _ in holdings))
+    returns = get_price_panel(asset_ids, days=days).pct_change(fill_method=None).iloc[1:]
+    cov = None
+    if method == "gaussian":
+        model = get_risk_model(asset_ids, days=days, min_obs=10)
+        if model is None:
+            return None
+        cov = model["covariance"]
+        holdings = [(a, v) for a, v in holdings if a in cov.index]
+    try:
+        scenario_model = build_model(returns, dict(holdings), method, cov=cov, horizon=horizon)
+    except ValueError:
+        return None
+    return simulate_var(scenario_model, n_scenarios, confidence)
+
+
+@st.cache_data(ttl=600, show_spinner=False)
+def get_stress_tests(holdings, scenarios, days=90):
+    """
+    Portfolio x scenario P&L (utils/stress.py) for every saved portfolio at once. holdings:
+    PortfolioStore.holdings(); scenarios: list of scenario dicts. Beta scenarios propagate
+    through the shared risk-model loadings and apply 'meme_multiplier' to live meme coins.
+    Historical scenarios replay a longer panel when their dates start before `days` ago;
+    a window that is still not covered raises ValueError.
+    Returns None when there are no holdings with prices.
+    """
+    asset_ids = scenario_assets(holdings["asset"].unique(), scenarios)
+    panel = get_price_panel(asset_ids, days=days)
+    if panel.empty:
+        return None
+    replay_days = history_days(scenarios, days)
+    history = panel if replay_days == days else get_price_panel(asset_ids, days=replay_days)
+    model = get_risk_model(asset_ids, days=days, min_obs=10)
+    meme_coins = [c["id"] for c in fetch_live_meme_coins(50)]
+    exposures = exposure_matrix(holdings[holdings["asset"].isin(panel.columns)], panel)
+    if exposures.empty:
+        return None
+    volatility = panel.pct_change(fill_method=None).std()
+    return run_stress_tests(exposures, scenarios, prices=history, loadings=None if model is None else model["loadings"],
+                            volatility=volatility, meme_coins=meme_coins)
+
+@st.cache_resource
+def _feature_pipeline_store():
+    """Process-wide {(asset_ids, days, window, recent): (lock, FeaturePipeline)} updated with new bars only."""
+    return {}
+
+@st.cache_data(ttl=600, show_spinner=False)
+def get_screener_features(asset_ids, days=90, window=30, recent=30):
+    """
+    Realised volatility, average volume, correlation to BTC and recent return
+    (utils/features.py) for a tuple of coins, from the cached price and volume histories.
+    Bitcoin is always loaded as the correlation anchor. Returns a DataFrame indexed by coin.
+    """
+    universe = tuple(asset_ids) if "bitcoin" in asset_ids else tuple(asset_ids) + ("bitcoin",)
+    prices = get_price_panel(universe, days=days)
+    if prices.empty:
+        return None
+    volumes = get_volume_panel(universe, days=days)
+    lock, pipeline = _shared_entry(_feature_pipeline_store(), (universe, days, window, recent), lambda: FeaturePipeline(window, recent))
+    with lock:
+        pipeline.update(prices, volumes)
+        features = pipeline.features().reindex(list(asset_ids))
+    features.attrs["as_of"] = prices.index[-1].strftime("%Y%m%d")  # day of the latest (provisional) bar
+    features.attrs["data_version"] = panel_version(features)  # hashed once per refresh, not per rerun
+    return features
+
+@st.cache_resource
+def get_screener_models():
+    """Shared ScreenerModelStore (utils/screener_model.py): persisted models and SHAP rows."""
+    return ScreenerModelStore()
+
+@st.cache_resource(max_entries=16, show_spinner=False)
+def get_query_engine(snapshot_version, _df, text_columns=("Name", "Symbol")):
+    """
+    QueryEngine (utils/query.py) for a market snapshot, built once per snapshot_version so
+    widget changes reuse its sorted and token indexes. _df is not hashed (that would be an
+    O(rows) pass on every rerun): pass a version that changes whenever the snapshot does,
+    e.g. built from the data_version of the cached inputs. Treat the snapshot as read-only.
+    """
+    return QueryEngine(_df, text_columns)
@@ -0,0 +1,129 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+import pandas as pd
+import plotly.io as pio
+import streamlit as st
+
+# === LAZY CHART & DATA EXPORT ===
+# PNG rendering through Kaleido takes seconds per figure, so charts are only rendered
+# when the user asks for them, in a background worker pool, and the bytes are cached
+# by a hash of the figure spec. Reruns with an unchanged figure reuse the cached image.
+
+MAX_CACHED_EXPORTS = 64
+
+class ExportCache:
+    """Thread-safe LRU of {key: bytes | Future} shared by all sessions."""
+
+    def __init__(self, max_workers=2, max_items=MAX_CACHED_EXPORTS):
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="chart-export")
+        self.max_items = max_items
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+            return self._items.get(key)
+
+    def put(self, key, value):
+        with self._lock:
+            self._insert(key, value)
+
+    def _insert(self, key, value):
+        # Caller holds the lock. Pending jobs count towards max_items too: an evicted job
+        # still finishes, but its result is dropped instead of growing the cache
+        self._items[key] = value
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_items:
+            self._items.popitem(last=False)
+
+    def discard(self, key, entry):
+        """Drops key if it still holds entry (e.g. a failed job), so the next request retries."""
+        with self._lock:
+            if self._items.get(key) is entry:
+                del self._items[key]
+
+    def submit(self, key, fn, *args):
+        """
+        Starts fn(*args) in the pool unless a result or pending job already exists for key.
+        A job that finished with an error is replaced by a new one.
+        """
+        with self._lock:
+            existing = self._items.get(key)
+            failed = isinstance(existing, Future) and existing.done() and existing.exception() is not None
+            if existing is not None and not failed:
+                self._items.move_to_end(key)
+                return existing
+            future = self.pool.submit(fn, *args)
+            self._insert(key, future)
+            return future
+
+@st.cache_resource
+def get_export_cache():
+    return ExportCache()
+
+def figure_key(fig, fmt="png"):
+    """Stable key for a figure: hash of its full JSON spec (data + layout) and the export format."""
+    spec = fig if isinstance(fig, str) else fig.to_json()
+    return hashlib.sha256(f"{fmt}:{spec}".encode()).hexdigest()
+
+def render_figure(fig_json, fmt="png"):
+    """Renders a figure spec to image bytes (runs in the worker pool)."""
+    return pio.from_json(fig_json).to_image(format=fmt)
+
+def image_status(fig, fmt="png"):
+    """Returns ("ready", bytes), ("pending", None), ("error", message) or ("missing", None)."""
+    entry = get_export_cache().get(figure_key(fig, fmt))
+    if entry is None:
+        return "missing", None
+    if isinstance(entry, bytes):
+        return "ready", entry
+    if not entry.done():
+        return "pending", None
+    try:
+        data = entry.result()
+    except Exception as e:
+        get_export_cache().discard(figure_key(fig, fmt), entry)  # reported once; the next click retries
+        return "error", str(e)
+    get_export_cache().put(figure_key(fig, fmt), data)
+    return "ready", data
+
+def request_image(fig, fmt="png"):
+    """Queues background rendering of fig; returns the cache key."""
+    fig_json = fig.to_json()
+    key = figure_key(fig_json, fmt)
+    get_export_cache().submit(key, render_figure, fig_json, fmt)
+    return key
+
+def image_download_button(fig, label, file_name, key, fmt="png"):
+    """
+    Download button that renders the chart only on demand.
+    First click queues rendering in the background; once ready the real download button appears.
+    """
+    status, payload = image_status(fig, fmt)
+    if status == "ready":
+        st.download_button(label, payload, file_name=file_name, mime=f"image/{fmt}", key=key)
+    elif status == "pending":
+        st.caption(f"Rendering {file_name} in the background...")
+        st.button("Refresh", key=f"{key}_refresh", help="Check whether the chart image is ready.")
+    else:
+        if status == "error":
+            st.info(f"Chart export not available: {payload}")
+        if st.button(f"Prepare {label.replace('Download ', '')}", key=f"{key}_prepare", help="Render this chart as an image for download."):
+            request_image(fig, fmt)
+            st.caption(f"Rendering {file_name} in the background...")
+
+def csv_payload(df):
+    """CSV bytes for a DataFrame, cached by a hash of its contents."""
+    digest = hashlib.sha256(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    digest.update(",".join(map(str, df.columns)).encode())
+    key = f"csv:{digest.hexdigest()}"
+    cache = get_export_cache()
+    data = cache.get(key)
+    if not isinstance(data, bytes):
+        data = df.to_csv(index=False).encode()
+        cache.put(key, data)
+    return data
@@ -0,0 +1,152 @@
+import numpy as np
+import pandas as pd
+
+# === SCREENER FEATURE PIPELINE ===
+# Per-coin screening features over a trailing window of daily bars, for the whole universe
+# at once: realised volatility (annualised), average volume, correlation to an anchor coin
+# (bitcoin) and the return over the last `recent` bars.
+# Like the risk model, the pipeline keeps running sums (per coin: count, sum and sum of
+# squares of returns; over the days both the coin and the anchor traded: the joint sums
+# and cross product; volume count and sum) plus the last `window` rows they cover. Each
+# update adds the new rows and subtracts the rows leaving the window, so a daily refresh
+# costs O(coins) no matter how many coins or how long the history; a new coin triggers a
+# rebuild from the panel passed in. As in the NAV engine, the latest bar is provisional:
+# it is kept out of the running sums, added when features are read and replaced on the
+# next update until a newer bar arrives.
+# Returns are simple daily returns with pandas' pct_change(fill_method=None) convention:
+# a return is missing when either day's price is.
+
+FEATURES = ["volatility", "avg_volume", "correlation_btc", "recent_return"]
+PERIODS_PER_YEAR = 365
+
+class FeaturePipeline:
+    """
+    Incremental trailing-window features. Call update(prices, volumes) with the aligned
+    price and volume panels (index = date, columns = coins); rows at or before the last
+    date already seen are ignored.
+    """
+
+    def __init__(self, window=30, recent=30, anchor="bitcoin", min_obs=5, periods_per_year=PERIODS_PER_YEAR):
+        self.window = window
+        self.recent = recent
+        self.anchor = anchor
+        self.min_obs = min_obs
+        self.periods_per_year = periods_per_year
+        self.reset()
+
+    def reset(self):
+        self.columns = []
+        self.last_date = None  # last committed bar
+        self.last_prices = None
+        self.returns = None    # last window - 1 committed return rows (the live bar completes the window)
+        self.volumes = None
+        self.prices = None     # last `recent` committed price rows
+        self.sums = {}
+        self.live = None       # provisional latest bar: (date, returns, volumes, prices)
+
+    def _init_state(self, columns):
+        n = len(columns)
+        self.columns = list(columns)
+        self.returns = np.zeros((0, n))
+        self.volumes = np.zeros((0, n))
+        self.prices = np.zeros((0, n))
+        self.last_prices = np.full(n, np.nan)
+        self.sums = self._empty_sums()
+
+    def _empty_sums(self):
+        return {k: np.zeros(len(self.columns)) for k in ["n", "x", "xx", "jn", "jx", "jb", "jxx", "jbb", "jxb", "vn", "v"]}
+
+    def _accumulate(self, sums, R, V, sign):
+        ok = np.isfinite(R)
+        x = np.where(ok, R, 0.0)
+        sums["n"] += sign * ok.sum(axis=0)
+        sums["x"] += sign * x.sum(axis=0)
+        sums["xx"] += sign * (x * x).sum(axis=0)
+        if self.anchor in self.columns:
+            b = R[:, self.columns.index(self.anchor)]
+            joint = ok & np.isfinite(b)[:, None]
+            xj = np.where(joint, x, 0.0)
+            bj = np.where(joint, np.nan_to_num(b)[:, None], 0.0)
+            sums["jn"] += sign * joint.sum(axis=0)
+            sums["jx"] += sign * xj.sum(axis=0)
+            sums["jb"] += sign * bj.sum(axis=0)
+            sums["jxx"] += sign * (xj * xj).sum(axis=0)
+            sums["jbb"] += sign * (bj * bj).sum(axis=0)
+            sums["jxb"] += sign * (xj * bj).sum(axis=0)
+        okv = np.isfinite(V)
+        sums["vn"] += sign * okv.sum(axis=0)
+        sums["v"] += sign * np.where(okv, V, 0.0).sum(axis=0)
+
+    def update(self, prices, volumes=None):
+        """
+        Commits the new closed bars and replaces the provisional latest bar (its price and
+        volume still move during the day). Returns the number of bars committed.
+        """
+        if prices.columns.difference(self.columns).size:
+            self.reset()
+        if self.last_date is None:
+            self._init_state(prices.columns)
+        else:
+            prices = prices[prices.index > self.last_date]
+        if prices.empty:
+            return 0
+        P = prices.reindex(columns=self.columns).to_numpy(dtype=float)
+        V = (np.full(P.shape, np.nan) if volumes is None
+             else volumes.reindex(index=prices.index, columns=self.columns).to_numpy(dtype=float))
+        R = P / np.vstack([self.last_prices, P[:-1]]) - 1  # last_prices starts as NaN
+        self.live = (prices.index[-1], R[-1:], V[-1:], P[-1:])
+        R, V, P = R[:-1], V[:-1], P[:-1]
+        k, w = len(P), self.window - 1
+        if k:
+            # Rows leaving the window are subtracted, only the new rows that stay are added
+            leaving = max(0, min(len(self.returns), len(self.returns) + k - w))
+            self._accumulate(self.sums, self.returns[:leaving], self.volumes[:leaving], -1)
+            self._accumulate(self.sums, R[len(R) - min(k, w):], V[len(V) - min(k, w):], +1)
+            self.returns = np.vstack([self.returns[leaving:], R[len(R) - min(k, w):]])
+            self.volumes = np.vstack([self.volumes[leaving:], V[len(V) - min(k, w):]])
+            self.prices = np.vstack([self.prices, P])[-self.recent:]
+            self.last_prices = P[-1]
+            self.last_date = prices.index[-2]
+        return k
+
+    @classmethod
+    def from_panels(cls, prices, volumes=None, **kwargs):
+        pipeline = cls(**kwargs)
+        pipeline.update(prices, volumes)
+        return pipeline
+
+    def features(self):
+        """
+        DataFrame (index = coin) of volatility, avg_volume, correlation_btc, recent_return
+        and obs (returns in the window). Coins with fewer than min_obs returns get NaN
+        volatility and correlation.
+        """
+        s = {k: v.copy() for k, v in self.sums.items()}
+        prices = self.prices
+        if self.live is not None:
+            _, R, V, P = self.live
+            self._accumulate(s, R, V, +1)
+            prices = np.vstack([prices, P])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            n = np.round(s["n"])
+            var = (s["xx"] - s["x"] ** 2 / n) / (n - 1)
+            vol = np.sqrt(np.clip(var, 0.0, None) * self.periods_per_year)
+            jn = np.round(s["jn"])
+            cov = s["jxb"] - s["jx"] * s["jb"] / jn
+            var_x = s["jxx"] - s["jx"] ** 2 / jn
+            var_b = s["jbb"] - s["jb"] ** 2 / jn
+            corr = np.clip(cov / np.sqrt(var_x * var_b), -1.0, 1.0)
+            avg_volume = s["v"] / np.round(s["vn"])
+            P = pd.DataFrame(prices)
+            recent = P.ffill().iloc[-1].to_numpy() / P.bfill().iloc[0].to_numpy() - 1 if len(P) else np.full(len(self.columns), np.nan)
+        return pd.DataFrame({
+            "volatility": np.where(n >= self.min_obs, vol, np.nan),
+            "avg_volume": np.where(s["vn"] > 0.5, avg_volume, np.nan),
+            "correlation_btc": np.where((jn >= self.min_obs) & np.isfinite(corr), corr, np.nan),
+            "recent_return": recent,
+            "obs": n.astype(int),
+        }, index=pd.Index(self.columns, name="coin"))
+
+def compute_features(prices, volumes=None, **kwargs):
+    """One-shot FeaturePipeline(...).update(prices, volumes).features()."""
+    return FeaturePipeline.from_panels(prices, volumes, **kwargs).features()
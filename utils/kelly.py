@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+from scipy.optimize import minimize, minimize_scalar
+
+# === KELLY SIZING: SIMULATION & NUMERICAL OPTIMISATION ===
+# kelly_criterion (main.py) gives the closed-form fraction for one binary bet.
+# This module simulates bankroll paths for many fractions at once and solves the
+# Kelly problem numerically for multi-outcome bets and multi-asset return panels.
+
+PERCENTILES = [5, 25, 50, 75, 95]
+SIM_CHUNK_PATHS = 1000
+
+def kelly_fraction_grid(full_kelly, multipliers=(1.0, 0.5, 0.25), custom=None):
+    """Returns {label: fraction} for full/half/quarter Kelly plus optional custom fractions."""
+    names = {1.0: "Full Kelly", 0.5: "Half Kelly", 0.25: "Quarter Kelly"}
+    grid = {names.get(m, f"{m:g}x Kelly"): m * full_kelly for m in multipliers}
+    for f in custom or []:
+        grid[f"Custom {f:.2f}"] = f
+    return grid
+
+def simulate_bankroll(win_prob, win_loss_ratio, fractions, n_paths=2000, n_bets=250, seed=42, ruin_level=0.01):
+    """
+    Simulates n_paths bet sequences of n_bets binary bets for every fraction in one array pass.
+    All fractions see the same win/loss draws, so differences come from sizing only.
+    fractions: dict {label: fraction of bankroll staked per bet}.
+    Returns a dict with:
+      'percentiles': DataFrame (bet, fraction, percentile) -> bankroll multiple
+      'summary': DataFrame per fraction (median final, mean log growth, ruin probability, drawdowns);
+                 mean log growth is over the paths not wiped out (bankroll 0, log growth -inf),
+                 -inf when every path is, and prob_ruin reports how often ruin_level was hit
+      'max_drawdowns': DataFrame (path x fraction) of each path's maximum drawdown
+    """
+    labels = list(fractions.keys())
+    f = np.array([fractions[k] for k in labels], dtype=float)
+    rng = np.random.default_rng(seed)
+    wins = rng.random((n_paths, n_bets)) < win_prob
+    pct = np.empty((len(PERCENTILES), len(labels), n_bets))
+    max_dd = np.empty((len(labels), n_paths))
+    final_log = np.empty((len(labels), n_paths))
+    ruined = np.empty((len(labels), n_paths), dtype=bool)
+    # One fraction at a time, reusing a single paths x bets buffer for log wealth and then
+    # wealth, so memory stays at one matrix (plus a chunk) however many fractions there are
+    for i, fi in enumerate(f):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            wealth = np.where(wins, np.log1p(fi * win_loss_ratio), np.log1p(-fi))
+        np.cumsum(wealth, axis=1, out=wealth)
+        final_log[i] = wealth[:, -1]
+        for start in range(0, n_paths, SIM_CHUNK_PATHS):
+            block = wealth[start:start + SIM_CHUNK_PATHS]
+            running_peak = np.maximum(np.maximum.accumulate(block, axis=1), 0.0)
+            max_dd[i, start:start + SIM_CHUNK_PATHS] = 1 - np.exp((block - running_peak).min(axis=1))
+        np.exp(wealth, out=wealth)
+        pct[:, i, :] = np.percentile(wealth, PERCENTILES, axis=0)
+        ruined[i] = (wealth <= ruin_level).any(axis=1)
+        del wealth
+
+    idx = pd.MultiIndex.from_product([PERCENTILES, labels, np.arange(1, n_bets + 1)], names=["percentile", "fraction", "bet"])
+    percentiles = pd.Series(pct.ravel(), index=idx).unstack("percentile")
+    final = np.exp(final_log)
+    survived = np.isfinite(final_log)
+    n_survived = survived.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        growth = np.where(n_survived > 0, np.where(survived, final_log, 0.0).sum(axis=1) / n_survived, -np.inf)
+    summary = pd.DataFrame({
+        "fraction": f,
+        "median_final": np.median(final, axis=1),
+        "mean_log_growth_per_bet": growth / n_bets,
+        "prob_ruin": ruined.mean(axis=1),
+        "median_max_drawdown": np.median(max_dd, axis=1),
+        "p95_max_drawdown": np.percentile(max_dd, 95, axis=1),
+    }, index=pd.Index(labels, name="strategy"))
+    return {
+        "percentiles": percentiles,
+        "summary": summary,
+        "max_drawdowns": pd.DataFrame(max_dd.T, columns=labels),
+    }
+
+def expected_log_growth(fraction, probs, returns):
+    """E[log(1 + f * X)] for a discrete outcome distribution (returns are per unit staked)."""
+    growth = 1 + fraction * np.asarray(returns, dtype=float)
+    if np.any(growth <= 0):
+        return -np.inf
+    return float(np.dot(probs, np.log(growth)))
+
+def kelly_multi_outcome(probs, returns):
+    """
+    Growth-optimal fraction for a bet with several outcomes.
+    probs: outcome probabilities (normalised to sum to 1); returns: net return per unit staked
+    (e.g. 2.0 for +200%, -1.0 for a total loss). Returns (fraction, expected log growth).
+    """
+    probs = np.asarray(probs, dtype=float)
+    probs = probs / probs.sum()
+    returns = np.asarray(returns, dtype=float)
+    if np.dot(probs, returns) <= 0:
+        return 0.0, 0.0
+    worst = returns.min()
+    # Stay strictly inside the region where every outcome leaves a positive bankroll
+    upper = min(1.0, -1 / worst * (1 - 1e-9)) if worst < 0 else 1.0
+    res = minimize_scalar(lambda f: -expected_log_growth(f, probs, returns), bounds=(0.0, upper), method="bounded")
+    return float(res.x), -float(res.fun)
+
+def return_panel(price_dict):
+    """Aligned simple returns from {name: price_series}; rows with any missing asset are dropped."""
+    return pd.DataFrame(price_dict).pct_change().dropna()
+
+def kelly_multi_asset(returns, max_leverage=1.0, long_only=True):
+    """
+    Growth-optimal weights for a historical return panel (rows = periods, columns = assets):
+    maximises the average log(1 + w . r) subject to sum(w) <= max_leverage.
+    Returns (weights Series, mean log growth per period).
+    """
+    R = np.asarray(returns, dtype=float)
+    n = R.shape[1]
+
+    def neg_growth(w):
+        g = 1 + R @ w
+        if np.any(g <= 0):
+            return 1e6
+        return -np.mean(np.log(g))
+
+    def neg_growth_grad(w):
+        g = np.maximum(1 + R @ w, 1e-12)
+        return -(R / g[:, None]).mean(axis=0)
+
+    bounds = [(0.0, max_leverage) if long_only else (-max_leverage, max_leverage)] * n
+    constraints = [{"type": "ineq", "fun": lambda w: max_leverage - np.sum(np.abs(w))}]
+    res = minimize(neg_growth, np.full(n, 0.0), jac=neg_growth_grad, bounds=bounds,
+                   constraints=constraints, method="SLSQP")
+    weights = pd.Series(res.x, index=getattr(returns, "columns", range(n)), name="kelly_weight")
+    return weights.clip(lower=-max_leverage, upper=max_leverage), -float(res.fun)
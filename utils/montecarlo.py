@@ -0,0 +1,154 @@
+import numpy as np
+from scipy.stats import norm, qmc
+
+# === MONTE CARLO & QUASI-MONTE CARLO SAMPLING ===
+# Shared by monte_carlo_option_price (main.py) and the DerivativesCalculator page.
+# "pseudo" draws i.i.d. normals; "sobol" draws scrambled Sobol points mapped through
+# the inverse normal CDF. Sobol estimates use independent scramblings (randomized QMC)
+# so every price comes with a standard error, like plain Monte Carlo.
+
+SAMPLING_MODES = ["pseudo", "sobol"]
+
+def standard_normals(n, dim, sampling="pseudo", seed=42):
+    """
+    Returns an (n, dim) array of standard normal draws.
+    For sampling="sobol", n is rounded up to the next power of two (Sobol balance property).
+    """
+    if sampling == "sobol":
+        m = max(0, int(np.ceil(np.log2(max(n, 1)))))
+        u = qmc.Sobol(d=dim, scramble=True, seed=seed).random_base2(m)
+        # Keep the inverse CDF finite at the cube boundary
+        u = np.clip(u, 1e-12, 1 - 1e-12)
+        return norm.ppf(u)
+    if sampling == "pseudo":
+        rng = np.random.default_rng(seed)
+        return rng.standard_normal((n, dim))
+    raise ValueError(f"Unknown sampling mode: {sampling}")
+
+def _brownian_bridge_schedule(steps):
+    """Order in which grid points are filled by the Brownian bridge (terminal point first)."""
+    schedule = [(steps - 1, -1, -1)]
+    intervals = [(-1, steps - 1)]
+    while intervals:
+        next_intervals = []
+        for left, right in intervals:
+            if right - left < 2:
+                continue
+            mid = (left + right) // 2
+            schedule.append((mid, left, right))
+            next_intervals += [(left, mid), (mid, right)]
+        intervals = next_intervals
+    return schedule
+
+def brownian_paths(z, T):
+    """
+    Turns an (n, steps) array of normals into Brownian motion values W(t_1..t_steps).
+    Uses the Brownian bridge so the first (best distributed) Sobol coordinates drive
+    the coarse path shape, which is what makes QMC effective for path-dependent payoffs.
+    """
+    n, steps = z.shape
+    dt = T / steps
+    times = dt * np.arange(1, steps + 1)
+    W = np.zeros((n, steps))
+    for col, (idx, left, right) in enumerate(_brownian_bridge_schedule(steps)):
+        if left == -1 and right == -1:
+            W[:, idx] = np.sqrt(times[idx]) * z[:, col]
+            continue
+        t_l = times[left] if left >= 0 else 0.0
+        w_l = W[:, left] if left >= 0 else 0.0
+        t_r, w_r, t_m = times[right], W[:, right], times[idx]
+        mean = ((t_r - t_m) * w_l + (t_m - t_l) * w_r) / (t_r - t_l)
+        sd = np.sqrt((t_m - t_l) * (t_r - t_m) / (t_r - t_l))
+        W[:, idx] = mean + sd * z[:, col]
+    return W
+
+def gbm_terminal_prices(S, T, r, sigma, z):
+    """Risk-neutral GBM terminal prices from a 1-D array of standard normals."""
+    return S * np.exp((r - 0.5 * sigma ** 2) * T + sigma * np.sqrt(T) * z)
+
+def gbm_paths(S, T, r, sigma, z):
+    """Risk-neutral GBM price paths (n, steps) from an (n, steps) array of standard normals."""
+    steps = z.shape[1]
+    times = (T / steps) * np.arange(1, steps + 1)
+    W = brownian_paths(z, T)
+    return S * np.exp((r - 0.5 * sigma ** 2) * times + sigma * W)
+
+def vanilla_payoff(prices, K, option_type="call"):
+    if option_type == "call":
+        return np.maximum(prices - K, 0)
+    return np.maximum(K - prices, 0)
+
+def asian_payoff(K, option_type="call"):
+    """Path payoff for an arithmetic-average Asian option, for use with price_path_option."""
+    return lambda paths: vanilla_payoff(paths.mean(axis=1), K, option_type)
+
+def _estimate(discounted_payoff_fn, n_sim, dim, sampling, n_rep, seed):
+    """
+    Runs the estimator and returns (price, standard_error, samples_used).
+    Pseudo-random: one batch, stderr from the sample standard deviation.
+    Sobol: n_rep independently scrambled batches, stderr from the spread of batch means.
+    """
+    if sampling == "pseudo":
+        values = discounted_payoff_fn(standard_normals(n_sim, dim, "pseudo", seed))
+        return values.mean(), values.std(ddof=1) / np.sqrt(len(values)), len(values)
+    per_rep = max(1, n_sim // n_rep)
+    means = []
+    used = 0
+    for i in range(n_rep):
+        values = discounted_payoff_fn(standard_normals(per_rep, dim, sampling, seed + i))
+        means.append(values.mean())
+        used += len(values)
+    means = np.array(means)
+    return means.mean(), means.std(ddof=1) / np.sqrt(n_rep), used
+
+def price_terminal_option(S, K, T, r, sigma, n_sim=10000, option_type="call", sampling="pseudo", n_rep=16, seed=42):
+    """
+    European option price by simulating the terminal price only.
+    Returns (price, standard_error, samples_used).
+    """
+    disc = np.exp(-r * T)
+    fn = lambda z: disc * vanilla_payoff(gbm_terminal_prices(S, T, r, sigma, z[:, 0]), K, option_type)
+    return _estimate(fn, n_sim, 1, sampling, n_rep, seed)
+
+def price_path_option(payoff_fn, S, T, r, sigma, steps=64, n_sim=10000, sampling="pseudo", n_rep=16, seed=42):
+    """
+    Prices any path-dependent payoff. payoff_fn maps an (n, steps) array of GBM paths
+    to an (n,) array of payoffs. Returns (price, standard_error, samples_used).
+    """
+    disc = np.exp(-r * T)
+    fn = lambda z: disc * payoff_fn(gbm_paths(S, T, r, sigma, z))
+    return _estimate(fn, n_sim, steps, sampling, n_rep, seed)
+
+def samples_to_target_stderr(price_fn, target_stderr, sampling, start=1024, max_samples=2 ** 20):
+    """
+    Doubles the sample count until price_fn(n_sim=..., sampling=...) reaches target_stderr.
+    Returns (samples_used, price, stderr); samples_used is None if max_samples was not enough.
+    """
+    n = start
+    while n <= max_samples:
+        price, stderr, used = price_fn(n_sim=n, sampling=sampling)
+        if stderr <= target_stderr:
+            return used, price, stderr
+        n *= 2
+    return None, price, stderr
+
+def qmc_convergence_benchmark(S=100.0, K=100.0, T=0.5, r=0.01, sigma=0.8, target_stderr=0.05, steps=32):
+    """
+    Compares plain MC and randomized Sobol QMC on the samples needed to reach target_stderr,
+    for a European (terminal) and an Asian (path-based) call. Returns a list of dicts.
+    """
+    cases = {
+        "European call": lambda n_sim, sampling: price_terminal_option(S, K, T, r, sigma, n_sim, "call", sampling),
+        "Asian call": lambda n_sim, sampling: price_path_option(asian_payoff(K), S, T, r, sigma, steps, n_sim, sampling),
+    }
+    rows = []
+    for name, fn in cases.items():
+        mc_n, mc_price, mc_se = samples_to_target_stderr(fn, target_stderr, "pseudo")
+        qmc_n, qmc_price, qmc_se = samples_to_target_stderr(fn, target_stderr, "sobol")
+        rows.append({
+            "payoff": name,
+            "mc_samples": mc_n, "mc_price": mc_price, "mc_stderr": mc_se,
+            "qmc_samples": qmc_n, "qmc_price": qmc_price, "qmc_stderr": qmc_se,
+            "speedup": (mc_n / qmc_n) if mc_n and qmc_n else None,
+        })
+    return rows
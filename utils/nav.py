@@ -0,0 +1,177 @@
+import numpy as np
+import pandas as pd
+
+# === HOLDINGS-WEIGHTED NAV ENGINE ===
+# Values a portfolio from its transactions log (utils/portfolio_store.py) and an aligned daily
+# price panel: units held per day are the cumulative sum of the transactions, and NAV, per-asset
+# value, P&L and contribution come from a handful of array operations over the whole block.
+# NavEngine keeps the last units, prices and NAV, so when new bars arrive only those rows are
+# valued and appended; backdated transactions trigger a full recompute.
+# A trade is booked on the bar whose period contains its timestamp (the last bar at or before
+# it; earlier trades on the first bar) and earns P&L from the next bar on. P&L excludes cash
+# flows, so adding coins does not count as a gain.
+
+def _timestamps(ts):
+    # Store timestamps mix plain dates (imported CSVs) and date-times
+    return pd.to_datetime(ts, format="mixed").to_numpy(dtype="datetime64[ns]")
+
+def _transaction_units(transactions, ts, index, columns):
+    """
+    Units bought/sold per bar (rows = index, columns = assets) from transactions with parsed
+    timestamps ts. Callers pass only the trades that belong to these bars.
+    """
+    flows = np.zeros((len(index), len(columns)))
+    if transactions.empty or len(index) == 0:
+        return flows
+    rows = np.maximum(index.to_numpy(dtype="datetime64[ns]").searchsorted(ts, side="right") - 1, 0)
+    col_of = {c: i for i, c in enumerate(columns)}
+    cols = transactions["asset"].map(col_of).to_numpy()
+    keep = pd.notna(cols)
+    np.add.at(flows, (rows[keep], cols[keep].astype(int)), transactions["amount"].to_numpy(dtype=float)[keep])
+    return flows
+
+def _value_block(prices, flows, start_units, start_prices, start_nav):
+    """Vectorized valuation of consecutive bars given the state at the end of the previous bar."""
+    px = np.vstack([start_prices, prices])
+    px = pd.DataFrame(px).ffill().to_numpy()  # carry the last known price over gaps
+    prev_px, px = px[:-1], px[1:]
+    units = start_units + np.cumsum(flows, axis=0)
+    prev_units = np.vstack([start_units, units[:-1]])
+    values = units * np.nan_to_num(px)
+    pnl = np.nan_to_num(prev_units * (px - prev_px))
+    nav = values.sum(axis=1)
+    prev_nav = np.concatenate([[start_nav], nav[:-1]])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        contribution = np.where(prev_nav[:, None] > 0, pnl / prev_nav[:, None], 0.0)
+    return units, px[-1], values, pnl, nav, contribution
+
+class NavEngine:
+    """
+    Incremental NAV for one portfolio. Call update(prices, transactions) with the full
+    price panel and transactions log each time; only bars after the last valued date
+    are processed unless the transactions changed in the past. The latest bar is
+    provisional (its price still moves during the day): it is revalued on every update
+    and only committed once a newer bar arrives.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.columns = []
+        self.last_date = None  # last committed bar
+        self.units = np.zeros(0)
+        self.prices = np.zeros(0)
+        self.nav = 0.0
+        self.applied = set()  # transaction ids already reflected in the committed units
+        self.blocks = []      # committed (index, values, pnl, nav, contribution) per update
+        self.live = None      # provisional latest bar, same layout
+        self.live_units = None
+        self.bars = 0                               # committed bars
+        self.total_pnl = np.zeros(0)                # committed P&L per asset
+        self.growth = 1.0                           # committed product of (1 + return)
+        self.last_return = np.nan
+
+    def _value(self, block, pending, ts):
+        flows = _transaction_units(pending, ts, block.index, self.columns)
+        return _value_block(block.to_numpy(dtype=float), flows, self.units, self.prices, self.nav)
+
+    def update(self, prices, transactions):
+        """
+        prices: aligned price panel (index = date, columns = assets).
+        transactions: DataFrame with id, asset, amount, ts (PortfolioStore.transactions()).
+        Returns the number of bars committed.
+        """
+        ids = transactions["id"].to_numpy()
+        pending = transactions[~np.isin(ids, list(self.applied))]
+        ts = _timestamps(pending["ts"])
+        if self.last_date is not None:
+            new_bars = prices.index[prices.index > self.last_date]
+            # A trade before the first uncommitted bar belongs to a bar that is already valued
+            backdated = len(new_bars) == 0 or (ts < new_bars[0].to_datetime64()).any()
+            if backdated or prices.columns.difference(self.columns).size or not self.applied.issubset(ids.tolist()):
+                self.reset()
+                pending, ts = transactions, _timestamps(transactions["ts"])
+        if self.last_date is None:
+            self.columns = list(prices.columns)
+            self.units = np.zeros(len(self.columns))
+            self.prices = np.full(len(self.columns), np.nan)
+            self.total_pnl = np.zeros(len(self.columns))
+        panel = prices.reindex(columns=self.columns)
+        if self.last_date is not None:
+            panel = panel[panel.index > self.last_date]
+        self.live = None
+        if panel.empty:
+            return 0
+        closed, latest = panel.iloc[:-1], panel.iloc[-1:]
+        if len(closed):
+            booked = ts < latest.index[0].to_datetime64()
+            units, last_px, values, pnl, nav, contribution = self._value(closed, pending[booked], ts[booked])
+            self.units, self.prices, self.nav = units[-1], last_px, nav[-1]
+            self.last_date = closed.index[-1]
+            self.applied |= set(pending["id"].to_numpy()[booked].tolist())
+            pending, ts = pending[~booked], ts[~booked]
+            self.blocks.append((closed.index, values, pnl, nav, contribution))
+            returns = contribution.sum(axis=1)
+            self.bars += len(closed)
+            self.total_pnl += pnl.sum(axis=0)
+            self.growth *= np.prod(1 + returns)
+            self.last_return = returns[-1]
+        units, _, values, pnl, nav, contribution = self._value(latest, pending, ts)
+        self.live = (latest.index, values, pnl, nav, contribution)
+        self.live_units = units[-1]
+        return len(closed)
+
+    def summary(self):
+        """
+        Latest NAV, last-bar return, total P&L and flow-adjusted total return from running
+        totals, without building the history frames (cheap for dashboards of many portfolios).
+        """
+        if self.live is None:
+            nav, ret, pnl = (self.blocks[-1][3][-1] if self.blocks else 0.0), self.last_return, 0.0
+        else:
+            nav, ret, pnl = self.live[3][-1], self.live[4].sum(), self.live[2].sum()
+        bars = self.bars + (self.live is not None)
+        return {
+            "nav": float(nav),
+            "change_1d": float(ret) if bars > 1 else np.nan,
+            "total_pnl": float(self.total_pnl.sum() + pnl),
+            "total_return": float(self.growth * (1 + (ret if self.live is not None else 0.0)) - 1) if bars else np.nan,
+        }
+
+    def result(self):
+        """
+        Dict of 'nav' (Series), 'values', 'pnl' and 'contribution' (per-asset DataFrames by
+        day), 'returns' (flow-adjusted daily return = sum of contributions), 'total_pnl'
+        (per-asset Series) and 'units' (holdings at the latest bar).
+        """
+        if len(self.blocks) > 1:  # compact so later calls concatenate once
+            idx = self.blocks[0][0].append([b[0] for b in self.blocks[1:]])
+            self.blocks = [(idx,) + tuple(np.concatenate([b[k] for b in self.blocks]) for k in range(1, 5))]
+        parts = self.blocks + ([self.live] if self.live is not None else [])
+        if not parts:
+            empty = pd.DataFrame(columns=self.columns, dtype=float)
+            return {"nav": pd.Series(dtype=float, name="nav"), "values": empty, "pnl": empty, "contribution": empty,
+                    "returns": pd.Series(dtype=float, name="return"), "total_pnl": pd.Series(0.0, index=self.columns),
+                    "units": pd.Series(self.units, index=self.columns)}
+        index = parts[0][0].append([p[0] for p in parts[1:]]) if len(parts) > 1 else parts[0][0]
+        values, pnl, nav, contribution = (np.concatenate([p[k] for p in parts]) for k in range(1, 5))
+        frame = lambda a: pd.DataFrame(a, index=index, columns=self.columns)
+        values_df = frame(values)
+        pnl_df = frame(pnl)
+        contribution_df = frame(contribution)
+        return {
+            "nav": pd.Series(nav, index=index, name="nav"),
+            "values": values_df,
+            "pnl": pnl_df,
+            "contribution": contribution_df,
+            "returns": contribution_df.sum(axis=1).rename("return"),
+            "total_pnl": pnl_df.sum(),
+            "units": pd.Series(self.units if self.live is None else self.live_units, index=self.columns),
+        }
+
+def compute_nav(prices, transactions):
+    """One-shot valuation (see NavEngine.result for the returned dict)."""
+    engine = NavEngine()
+    engine.update(prices, transactions)
+    return engine.result()
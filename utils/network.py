@@ -0,0 +1,163 @@
+import hashlib
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import minimum_spanning_tree, connected_components
+from utils.clustering import correlation_distance
+
+# === CORRELATION NETWORK (MST / THRESHOLD GRAPH) ===
+# A readable view of the full coin universe when a k x k heatmap is not: the minimum spanning
+# tree of the correlation distance matrix (Kruskal, O(k^2 log k) for the dense graph) keeps
+# only the k-1 strongest links, a thresholded graph keeps every link above a |corr| cutoff.
+# The force-directed layout is the expensive part, so it accepts the previous coordinates
+# as a warm start: after a data refresh the nodes only move as far as the correlations shifted,
+# and coins that appear for the first time are placed next to their neighbours.
+
+GRAPH_TYPES = ["mst", "threshold"]
+EDGE_COLUMNS = ["source", "target", "corr", "distance"]
+MARKER_PX = (6, 30)  # node marker size range; threshold-graph hubs can have hundreds of links
+
+def correlation_mst(corr):
+    """Edges of the minimum spanning tree of 1 - |corr| as a DataFrame (source, target, corr, distance)."""
+    labels = list(corr.columns)
+    dist = correlation_distance(corr)
+    # csgraph treats 0 as "no edge"; perfectly correlated pairs still need a link
+    dense = np.where(dist > 0, dist, 1e-12)
+    np.fill_diagonal(dense, 0.0)
+    tree = minimum_spanning_tree(csr_matrix(dense)).tocoo()
+    c = corr.to_numpy(dtype=float)
+    edges = pd.DataFrame({
+        "source": [labels[i] for i in tree.row],
+        "target": [labels[j] for j in tree.col],
+        "corr": c[tree.row, tree.col],
+        "distance": dist[tree.row, tree.col],
+    }, columns=EDGE_COLUMNS)
+    return edges.sort_values("distance").reset_index(drop=True)
+
+def threshold_graph(corr, threshold=0.7):
+    """Every pair with |corr| >= threshold, as edges in the same layout as correlation_mst."""
+    labels = list(corr.columns)
+    c = corr.to_numpy(dtype=float)
+    iu, ju = np.triu_indices(len(labels), k=1)
+    keep = np.abs(np.nan_to_num(c[iu, ju])) >= threshold
+    iu, ju = iu[keep], ju[keep]
+    edges = pd.DataFrame({
+        "source": [labels[i] for i in iu],
+        "target": [labels[j] for j in ju],
+        "corr": c[iu, ju],
+        "distance": 1 - np.abs(c[iu, ju]),
+    }, columns=EDGE_COLUMNS)
+    return edges.sort_values("distance").reset_index(drop=True)
+
+def node_stats(labels, edges):
+    """
+    Per-coin degree, strength (sum of |corr| over its links) and connected component.
+    Hubs are the coins with the highest degree (ties broken by strength).
+    """
+    index = {label: i for i, label in enumerate(labels)}
+    src = edges["source"].map(index).to_numpy(dtype=int)
+    dst = edges["target"].map(index).to_numpy(dtype=int)
+    w = np.abs(edges["corr"].to_numpy(dtype=float))
+    n = len(labels)
+    degree = np.bincount(src, minlength=n) + np.bincount(dst, minlength=n)
+    strength = np.bincount(src, w, minlength=n) + np.bincount(dst, w, minlength=n)
+    adjacency = csr_matrix((np.ones(len(src)), (src, dst)), shape=(n, n))
+    _, component = connected_components(adjacency, directed=False)
+    stats = pd.DataFrame({"degree": degree, "strength": strength, "component": component + 1}, index=labels)
+    return stats.sort_values(["degree", "strength"], ascending=False)
+
+def graph_key(labels, edges):
+    """Hash of the node set and the weighted edges; an unchanged key means the layout can be reused as is."""
+    h = hashlib.md5("\x1f".join(map(str, labels)).encode())
+    h.update(pd.util.hash_pandas_object(edges[["source", "target", "corr"]], index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+def spring_layout(labels, edges, previous=None, iterations=None, seed=0):
+    """
+    Fruchterman-Reingold layout in the unit square, edges weighted by |corr|.
+    previous: {label: (x, y)} from an earlier call. Known coins start from there and the
+    layout runs a short, cool refinement (iterations default 15 instead of 100); new
+    coins start at the mean position of their already-placed neighbours.
+    Returns {label: (x, y)}.
+    """
+    n = len(labels)
+    if n == 0:
+        return {}
+    rng = np.random.default_rng(seed)
+    pos = rng.random((n, 2))
+    index = {label: i for i, label in enumerate(labels)}
+    src = edges["source"].map(index).to_numpy(dtype=int)
+    dst = edges["target"].map(index).to_numpy(dtype=int)
+    w = np.abs(edges["corr"].to_numpy(dtype=float))
+    known = np.zeros(n, dtype=bool)
+    if previous:
+        for label, xy in previous.items():
+            i = index.get(label)
+            if i is not None:
+                pos[i] = xy
+                known[i] = True
+        if known.any():
+            for i in np.flatnonzero(~known):
+                nbrs = np.concatenate([dst[src == i], src[dst == i]])
+                nbrs = nbrs[known[nbrs]]
+                if len(nbrs):
+                    pos[i] = pos[nbrs].mean(axis=0) + rng.normal(0, 0.02, 2)
+    warm = known.mean() > 0.5
+    iterations = iterations if iterations is not None else (15 if warm else 100)
+    k = 1 / np.sqrt(n)
+    temperature = 0.02 if warm else 0.1
+    cooling = temperature / (iterations + 1)
+    for _ in range(iterations):
+        delta = pos[:, None, :] - pos[None, :, :]
+        dist = np.maximum(np.sqrt((delta ** 2).sum(axis=-1)), 1e-3)
+        disp = (delta * (k * k / dist ** 2)[:, :, None]).sum(axis=1)  # repulsion between all nodes
+        d = pos[src] - pos[dst]
+        length = np.maximum(np.sqrt((d ** 2).sum(axis=1)), 1e-3)
+        pull = d * (w * length / k)[:, None]                            # attraction along edges
+        np.subtract.at(disp, src, pull)
+        np.add.at(disp, dst, pull)
+        norm = np.maximum(np.sqrt((disp ** 2).sum(axis=1)), 1e-9)
+        pos += disp / norm[:, None] * np.minimum(norm, temperature)[:, None]
+        temperature -= cooling
+    pos -= pos.min(axis=0)
+    pos /= max(pos.max(), 1e-9)
+    return {label: (float(x), float(y)) for label, (x, y) in zip(labels, pos)}
+
+def marker_sizes(degree, size_range=MARKER_PX):
+    """Marker sizes in pixels growing with sqrt(degree) and scaled so the largest hub gets the top of size_range."""
+    degree = np.asarray(degree, dtype=float)
+    lo, hi = size_range
+    scale = np.sqrt(degree / max(degree.max(initial=0.0), 1.0))
+    return lo + (hi - lo) * scale
+
+def network_figure(layout, edges, stats, clusters=None, top_hubs=10):
+    """
+    Plotly figure of the network: one line trace for all edges (fast for hundreds of
+    coins), nodes sized by degree and coloured by cluster (or component); the top_hubs
+    coins are labelled.
+    """
+    import plotly.graph_objects as go
+    ex, ey = [], []
+    for s, t in zip(edges["source"], edges["target"]):
+        ex += [layout[s][0], layout[t][0], None]
+        ey += [layout[s][1], layout[t][1], None]
+    labels = list(stats.index)
+    hubs = set(labels[:top_hubs])
+    groups = clusters.reindex(labels) if clusters is not None else stats["component"]
+    fig = go.Figure()
+    fig.add_trace(go.Scattergl(x=ex, y=ey, mode="lines", line=dict(width=0.7, color="#999"), hoverinfo="none", showlegend=False))
+    fig.add_trace(go.Scatter(
+        x=[layout[c][0] for c in labels],
+        y=[layout[c][1] for c in labels],
+        mode="markers+text",
+        text=[c if c in hubs else "" for c in labels],
+        textposition="top center",
+        hovertext=[f"{c}<br>links: {d}<br>strength: {s:.2f}<br>group: {g}" for c, d, s, g in
+                   zip(labels, stats["degree"], stats["strength"], groups)],
+        hoverinfo="text",
+        marker=dict(size=marker_sizes(stats["degree"]), color=groups.to_numpy(), colorscale="Turbo",
+                    line=dict(width=0.5, color="#333")),
+        showlegend=False,
+    ))
+    fig.update_layout(xaxis=dict(visible=False), yaxis=dict(visible=False), height=650, margin=dict(l=10, r=10, t=30, b=10))
+    return fig
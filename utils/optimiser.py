@@ -0,0 +1,248 @@
+import numpy as np
+import pandas as pd
+from scipy.linalg import eigh
+
+# === PORTFOLIO OPTIMISER ===
+# Long-only, fully invested weights from a return panel and a covariance estimate (e.g. the
+# Ledoit-Wolf matrix from utils/risk_model.py): minimum variance, mean-variance, risk parity
+# (equal risk contribution) and maximum diversification, plus an efficient-frontier sweep.
+# The quadratic problems are solved by accelerated projected gradient (FISTA) on the
+# simplex, risk parity by cyclical coordinate descent; both accept a starting point, so
+# frontier points start from their neighbour and PortfolioOptimiser starts each day from
+# the previous day's weights. Inputs are annualised with 365 periods per year.
+
+PERIODS_PER_YEAR = 365
+METHODS = ["min_variance", "mean_variance", "risk_parity", "max_diversification"]
+METHOD_LABELS = {
+    "min_variance": "Minimum Variance",
+    "mean_variance": "Mean-Variance",
+    "risk_parity": "Risk Parity",
+    "max_diversification": "Maximum Diversification",
+}
+
+def project_simplex(v, max_weight=1.0):
+    """Euclidean projection onto {w >= 0, sum w = 1, w <= max_weight}."""
+    n = len(v)
+    if max_weight >= 1.0:
+        u = np.sort(v)[::-1]
+        css = np.cumsum(u) - 1
+        rho = np.nonzero(u * np.arange(1, n + 1) > css)[0][-1]
+        return np.maximum(v - css[rho] / (rho + 1), 0.0)
+    if max_weight * n < 1 - 1e-12:
+        raise ValueError("max_weight too small to be fully invested.")
+    lo, hi = v.min() - max_weight, v.max()
+    for _ in range(60):  # bisection on the shift; sum is monotone in it
+        tau = (lo + hi) / 2
+        if np.clip(v - tau, 0.0, max_weight).sum() > 1:
+            lo = tau
+        else:
+            hi = tau
+    return np.clip(v - (lo + hi) / 2, 0.0, max_weight)
+
+def _largest_eigenvalue(cov):
+    n = len(cov)
+    return float(eigh(cov, eigvals_only=True, subset_by_index=[n - 1, n - 1])[0])
+
+def _polish(cov, mu, risk_aversion, w, max_weight, tol=1e-9):
+    """
+    Exact solution on the support of w (free weights from the KKT linear system, capped
+    weights fixed). Returns the polished weights if they satisfy the KKT conditions, else None.
+    """
+    capped = w >= max_weight - 1e-12 if max_weight < 1.0 else np.zeros(len(w), dtype=bool)
+    free = (w > 1e-12) & ~capped
+    k = int(free.sum())
+    if k == 0:
+        return None
+    H = risk_aversion * cov
+    A = np.zeros((k + 1, k + 1))
+    A[:k, :k] = H[np.ix_(free, free)]
+    A[:k, k] = A[k, :k] = 1.0
+    rhs = np.append(mu[free] - H[np.ix_(free, capped)].sum(axis=1) * max_weight, 1.0 - capped.sum() * max_weight)
+    try:
+        sol = np.linalg.solve(A, rhs)
+    except np.linalg.LinAlgError:
+        return None
+    wf, lam = sol[:k], sol[k]
+    if wf.min() < -tol or wf.max() > max_weight + tol:
+        return None
+    out = np.zeros(len(w))
+    out[free] = np.clip(wf, 0.0, max_weight)
+    out[capped] = max_weight
+    grad = H @ out - mu + lam  # zero on free weights, >= 0 at zero, <= 0 at the cap
+    scale = tol * (1 + np.abs(H @ out - mu).max())
+    at_zero = ~free & ~capped
+    if (grad[at_zero] < -scale).any() or (grad[capped] > scale).any():
+        return None
+    return out
+
+def solve_quadratic(cov, mu=None, risk_aversion=2.0, w0=None, max_weight=1.0, lipschitz=None, tol=1e-9, max_iter=5000,
+                    polish_every=10):
+    """
+    min (risk_aversion / 2) w' cov w - mu' w over the (capped) simplex.
+    FISTA with gradient restarts finds the active set; every polish_every iterations (when
+    the set of non-zero weights changed) the KKT system on that set is solved exactly and
+    accepted if optimal. Returns (weights, iterations).
+    """
+    n = len(cov)
+    mu = np.zeros(n) if mu is None else np.asarray(mu, dtype=float)
+    L = risk_aversion * (lipschitz if lipschitz is not None else _largest_eigenvalue(cov))
+    step = 1.0 / max(L, 1e-18)
+    w = project_simplex(np.full(n, 1.0 / n) if w0 is None else np.asarray(w0, dtype=float), max_weight)
+    y, t = w.copy(), 1.0
+    support = None
+    for it in range(1, max_iter + 1):
+        if polish_every and it % polish_every == 1:
+            current = (w > 1e-12).tobytes()
+            if current != support:
+                support = current
+                exact = _polish(cov, mu, risk_aversion, w, max_weight)
+                if exact is not None:
+                    return exact, it
+        grad = risk_aversion * (cov @ y) - mu
+        w_next = project_simplex(y - step * grad, max_weight)
+        if (y - w_next) @ (w_next - w) > 0:  # momentum points uphill: restart
+            y, t = w.copy(), 1.0
+            continue
+        t_next = (1 + np.sqrt(1 + 4 * t * t)) / 2
+        y = w_next + (t - 1) / t_next * (w_next - w)
+        done = np.abs(w_next - w).max() < tol
+        w, t = w_next, t_next
+        if done:
+            break
+    return w, it
+
+def solve_risk_parity(cov, budgets=None, y0=None, tol=1e-10, max_sweeps=500):
+    """
+    Equal (or budgeted) risk contributions by cyclical coordinate descent on
+    min 0.5 y' cov y - b' log y, y > 0; weights are y / sum(y). Returns (weights, sweeps).
+    """
+    n = len(cov)
+    b = np.full(n, 1.0 / n) if budgets is None else np.asarray(budgets, dtype=float) / np.sum(budgets)
+    diag = np.diag(cov).copy()
+    if y0 is None:
+        w = np.full(n, 1.0 / n)
+        y0 = w / np.sqrt(w @ cov @ w)  # the solution's scale: y' cov y = sum(b) = 1
+    y = np.where(np.asarray(y0, dtype=float) > 0, y0, 1e-6)
+    cy = cov @ y
+    for sweep in range(1, max_sweeps + 1):
+        change = 0.0
+        for i in range(n):
+            rest = cy[i] - diag[i] * y[i]  # (cov y)_i without the diagonal term
+            new = (-rest + np.sqrt(rest * rest + 4 * diag[i] * b[i])) / (2 * diag[i])
+            d = new - y[i]
+            if d != 0.0:
+                cy += cov[:, i] * d
+                y[i] = new
+                change = max(change, abs(d) / new)
+        if change < tol:
+            break
+    return y / y.sum(), sweep
+
+def risk_contributions(weights, cov):
+    """Share of portfolio variance from each asset (sums to 1)."""
+    w = np.asarray(weights, dtype=float)
+    rc = w * (cov @ w)
+    return rc / rc.sum()
+
+def diversification_ratio(weights, cov):
+    """Weighted average volatility over portfolio volatility (1 = no diversification)."""
+    w = np.asarray(weights, dtype=float)
+    return float(w @ np.sqrt(np.diag(cov)) / np.sqrt(w @ cov @ w))
+
+def _inputs(returns, cov, periods_per_year):
+    returns = returns.dropna(axis=1, how="all")
+    if cov is None:
+        cov = returns.cov()
+    assets = [c for c in cov.columns if c in returns.columns]
+    if len(assets) < 2:
+        raise ValueError("Need at least two assets with returns and covariance.")
+    sigma = cov.loc[assets, assets].to_numpy(dtype=float) * periods_per_year
+    mu = returns[assets].mean().fillna(0.0).to_numpy() * periods_per_year
+    return assets, mu, sigma
+
+class PortfolioOptimiser:
+    """
+    Keeps the last solution per method (and along the frontier) so each new day's
+    problem starts from yesterday's weights. Assets that are new get zero starting weight.
+    """
+
+    def __init__(self, periods_per_year=PERIODS_PER_YEAR):
+        self.periods_per_year = periods_per_year
+        self.warm = {}  # key -> Series of weights (or risk-parity y)
+
+    def _start(self, key, assets):
+        prev = self.warm.get(key)
+        if prev is None:
+            return None
+        start = prev.reindex(assets).fillna(0.0).to_numpy()
+        return start if start.sum() > 0 else None
+
+    def optimise(self, returns, cov=None, method="min_variance", risk_aversion=5.0, max_weight=1.0):
+        """
+        returns: daily return panel (index = date, columns = assets); cov: daily covariance
+        DataFrame (None = sample covariance of returns).
+        Returns a dict with 'weights' (Series), 'expected_return', 'volatility', 'sharpe'
+        (annualised, zero risk-free rate), 'risk_contributions', 'diversification_ratio'
+        and 'iterations'.
+        """
+        if method not in METHODS:
+            raise ValueError(f"Unknown method: {method}")
+        assets, mu, sigma = _inputs(returns, cov, self.periods_per_year)
+        start = self._start(method, assets)
+        if method == "min_variance":
+            w, iters = solve_quadratic(sigma, None, 2.0, start, max_weight)
+        elif method == "mean_variance":
+            w, iters = solve_quadratic(sigma, mu, risk_aversion, start, max_weight)
+        elif method == "risk_parity":
+            y0 = self._start("risk_parity_y", assets)
+            w, iters = solve_risk_parity(sigma, y0=y0 if y0 is not None and (y0 > 0).all() else None)
+            self.warm["risk_parity_y"] = pd.Series(w / np.sqrt(w @ sigma @ w), index=assets)
+        else:
+            # Choueifaty: max-diversification weights are the min-variance weights of the
+            # correlation matrix, rescaled by 1 / volatility
+            vol = np.sqrt(np.diag(sigma))
+            corr = sigma / np.outer(vol, vol)
+            x0 = None if start is None else project_simplex(start * vol / (start * vol).sum())
+            x, iters = solve_quadratic(corr, None, 2.0, x0)
+            w = x / vol
+            w /= w.sum()
+        w = np.where(w > 1e-10, w, 0.0)
+        w /= w.sum()
+        self.warm[method] = pd.Series(w, index=assets)
+        return _describe(w, assets, mu, sigma, iters)
+
+    def efficient_frontier(self, returns, cov=None, n_points=20, max_weight=1.0):
+        """
+        Mean-variance sweep from the minimum-variance portfolio to the highest-return one
+        (risk aversion log-spaced from high to low), each point warm-started from the last.
+        Returns (frontier DataFrame: risk_aversion, expected_return, volatility, sharpe,
+        iterations; weights DataFrame: one row per point).
+        """
+        assets, mu, sigma = _inputs(returns, cov, self.periods_per_year)
+        lipschitz = _largest_eigenvalue(sigma)
+        w = self._start("frontier", assets)
+        rows, weights = [], []
+        for gamma in np.logspace(3, -1, n_points):
+            w, iters = solve_quadratic(sigma, mu, gamma, w, max_weight, lipschitz=lipschitz)
+            res = _describe(w, assets, mu, sigma, iters)
+            rows.append({"risk_aversion": gamma, **{k: res[k] for k in ["expected_return", "volatility", "sharpe", "iterations"]}})
+            weights.append(w)
+        self.warm["frontier"] = pd.Series(weights[0], index=assets)
+        return pd.DataFrame(rows), pd.DataFrame(weights, columns=assets)
+
+def _describe(w, assets, mu, sigma, iters):
+    vol = float(np.sqrt(max(w @ sigma @ w, 0.0)))
+    ret = float(mu @ w)
+    return {
+        "weights": pd.Series(w, index=assets, name="weight"),
+        "expected_return": ret,
+        "volatility": vol,
+        "sharpe": ret / vol if vol > 0 else np.nan,
+        "risk_contributions": pd.Series(risk_contributions(w, sigma), index=assets),
+        "diversification_ratio": diversification_ratio(w, sigma),
+        "iterations": int(iters),
+    }
+
+def optimise_portfolio(returns, cov=None, method="min_variance", risk_aversion=5.0, max_weight=1.0):
+    """One-shot PortfolioOptimiser().optimise(...)."""
+    return PortfolioOptimiser().optimise(returns, cov, method, risk_aversion, max_weight)
@@ -0,0 +1,198 @@
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+
+# === OPTION BOOK PRICING & PORTFOLIO GREEKS ===
+# Prices a whole book of option positions in one vectorized call (Black-Scholes or a
+# CRR binomial lattice evaluated for all positions at once), aggregates position Greeks
+# by underlying and expiry, and revalues the book under spot/vol shock grids by
+# broadcasting instead of looping over positions.
+# Greek units follow black_scholes_greeks in main.py: vega and rho per 1% move, theta per day.
+
+POSITION_COLUMNS = ["underlying", "option_type", "strike", "expiry", "quantity", "spot", "sigma"]
+OPTIONAL_DEFAULTS = {"r": 0.01, "style": "european"}
+GREEKS = ["delta", "gamma", "vega", "theta", "rho"]
+MIN_T = 1e-6
+
+def load_positions(source, valuation_date=None):
+    """
+    Reads option positions from a CSV path/buffer or DataFrame and normalises them.
+    Required columns: underlying, option_type (call/put), strike, expiry (date), quantity, spot, sigma.
+    Optional: r (default 0.01), style (european/american). Negative quantity = short.
+    Adds T, the time to expiry in years from valuation_date (default: today).
+    """
+    df = source.copy() if isinstance(source, pd.DataFrame) else pd.read_csv(source)
+    df.columns = [c.strip().lower() for c in df.columns]
+    missing = [c for c in POSITION_COLUMNS if c not in df.columns]
+    if missing:
+        raise ValueError(f"Positions are missing columns: {', '.join(missing)}")
+    for col, default in OPTIONAL_DEFAULTS.items():
+        if col not in df.columns:
+            df[col] = default
+        df[col] = df[col].fillna(default)
+    df["option_type"] = df["option_type"].str.strip().str.lower()
+    df["style"] = df["style"].str.strip().str.lower()
+    bad = ~df["option_type"].isin(["call", "put"])
+    if bad.any():
+        raise ValueError(f"Unknown option_type values: {sorted(df.loc[bad, 'option_type'].unique())}")
+    df["expiry"] = pd.to_datetime(df["expiry"])
+    valuation_date = pd.Timestamp(valuation_date or pd.Timestamp.now().normalize())
+    df["T"] = ((df["expiry"] - valuation_date).dt.days / 365.0).clip(lower=0)
+    for col in ["strike", "quantity", "spot", "sigma", "r"]:
+        df[col] = df[col].astype(float)
+    return df.reset_index(drop=True)
+
+def bs_price_greeks(S, K, T, r, sigma, is_call):
+    """
+    Vectorized Black-Scholes prices and Greeks. All inputs broadcast against each other.
+    Returns a dict of arrays: price, delta, gamma, vega, theta, rho.
+    """
+    S, K, r, sigma = (np.asarray(x, dtype=float) for x in (S, K, r, sigma))
+    T = np.maximum(np.asarray(T, dtype=float), MIN_T)
+    sigma = np.maximum(sigma, 1e-8)
+    is_call = np.asarray(is_call, dtype=bool)
+    sqrt_T = np.sqrt(T)
+    d1 = (np.log(S / K) + (r + 0.5 * sigma ** 2) * T) / (sigma * sqrt_T)
+    d2 = d1 - sigma * sqrt_T
+    disc_K = K * np.exp(-r * T)
+    pdf_d1 = norm.pdf(d1)
+    sign = np.where(is_call, 1.0, -1.0)
+    N_d1 = norm.cdf(sign * d1)
+    N_d2 = norm.cdf(sign * d2)
+    price = sign * (S * N_d1 - disc_K * N_d2)
+    return {
+        "price": price,
+        "delta": sign * N_d1,
+        "gamma": pdf_d1 / (S * sigma * sqrt_T),
+        "vega": S * pdf_d1 * sqrt_T / 100,
+        "theta": (-S * pdf_d1 * sigma / (2 * sqrt_T) - sign * r * disc_K * N_d2) / 365,
+        "rho": sign * K * T * np.exp(-r * T) * N_d2 / 100,
+    }
+
+def _lattice(S, K, T, r, sigma, is_call, american, steps):
+    """
+    CRR lattice for n options at once (arrays of shape (n,)).
+    Returns (price, delta, gamma, theta_per_day) taken from the first two tree levels.
+    """
+    steps = max(int(steps), 3)
+    T = np.maximum(T, MIN_T)
+    dt = T / steps
+    u = np.exp(np.maximum(sigma, 1e-8) * np.sqrt(dt))
+    d = 1 / u
+    p = (np.exp(r * dt) - d) / (u - d)
+    disc = np.exp(-r * dt)
+    sign = np.where(is_call, 1.0, -1.0)[:, None]
+    j = np.arange(steps + 1)
+    values = np.maximum(sign * (S[:, None] * u[:, None] ** (2 * j - steps) - K[:, None]), 0)
+    level = {}
+    for i in range(steps - 1, -1, -1):
+        values = disc[:, None] * (p[:, None] * values[:, 1:i + 2] + (1 - p)[:, None] * values[:, :i + 1])
+        if american.any():
+            exercise = np.maximum(sign * (S[:, None] * u[:, None] ** (2 * j[:i + 1] - i) - K[:, None]), 0)
+            values = np.where(american[:, None], np.maximum(values, exercise), values)
+        if i <= 2:
+            level[i] = values
+    v0 = level[0][:, 0]
+    v_d, v_u = level[1][:, 0], level[1][:, 1]
+    v_dd, v_ud, v_uu = level[2][:, 0], level[2][:, 1], level[2][:, 2]
+    delta = (v_u - v_d) / (S * (u - d))
+    gamma = ((v_uu - v_ud) / (S * (u ** 2 - 1)) - (v_ud - v_dd) / (S * (1 - d ** 2))) / (0.5 * S * (u ** 2 - d ** 2))
+    theta = (v_ud - v0) / (2 * dt) / 365
+    return v0, delta, gamma, theta
+
+def binomial_price_greeks(S, K, T, r, sigma, is_call, american, steps=100):
+    """
+    Vectorized CRR binomial prices and Greeks for n positions (American exercise where flagged).
+    Delta, gamma and theta come from the lattice; vega and rho from central bumps of 1%.
+    """
+    S, K, T, r, sigma = (np.atleast_1d(np.asarray(x, dtype=float)) for x in (S, K, T, r, sigma))
+    is_call = np.atleast_1d(np.asarray(is_call, dtype=bool))
+    american = np.atleast_1d(np.asarray(american, dtype=bool))
+    n = len(S)
+    # Base case plus four bumped revaluations stacked into one lattice pass
+    bump = 0.01
+    price, delta, gamma, theta = _lattice(
+        np.tile(S, 5), np.tile(K, 5), np.tile(T, 5),
+        np.concatenate([r, r, r, r + bump, r - bump]),
+        np.concatenate([sigma, sigma + bump, np.maximum(sigma - bump, 1e-8), sigma, sigma]),
+        np.tile(is_call, 5), np.tile(american, 5), steps,
+    )
+    vega_down = sigma - np.maximum(sigma - bump, 1e-8)
+    return {
+        "price": price[:n],
+        "delta": delta[:n],
+        "gamma": gamma[:n],
+        "vega": (price[n:2 * n] - price[2 * n:3 * n]) / (bump + vega_down) / 100,
+        "theta": theta[:n],
+        "rho": (price[3 * n:4 * n] - price[4 * n:]) / (2 * bump) / 100,
+    }
+
+def _position_arrays(positions):
+    """(S, K, T, r, sigma, is_call, american) as numpy arrays, one entry per position."""
+    num = [positions[c].to_numpy(dtype=float) for c in ["spot", "strike", "T", "r", "sigma"]]
+    is_call = (positions["option_type"] == "call").to_numpy(dtype=bool)
+    american = (positions["style"] == "american").to_numpy(dtype=bool)
+    return (*num, is_call, american)
+
+def _model_prices(model, S, K, T, r, sigma, is_call, american, steps, with_greeks=True):
+    if model == "black_scholes":
+        return bs_price_greeks(S, K, T, r, sigma, is_call)
+    if model == "binomial":
+        if with_greeks:
+            return binomial_price_greeks(S, K, T, r, sigma, is_call, american, steps)
+        return {"price": _lattice(S, K, T, r, sigma, is_call, american, steps)[0]}
+    raise ValueError(f"Unknown model: {model}")
+
+def price_book(positions, model="black_scholes", steps=100):
+    """
+    Prices every position in one call. Returns the positions with unit price and Greeks,
+    plus market value and position Greeks (unit value x quantity).
+    model: "black_scholes" (European) or "binomial" (honours style=american).
+    """
+    df = positions.copy()
+    res = _model_prices(model, *_position_arrays(df), steps)
+    df["price"] = res["price"]
+    df["market_value"] = df["price"] * df["quantity"]
+    for g in GREEKS:
+        df[g] = res[g]
+        df[f"position_{g}"] = res[g] * df["quantity"]
+    return df
+
+def aggregate_greeks(book, by=("underlying", "expiry")):
+    """Sums market value and position Greeks by the given keys (e.g. underlying and expiry)."""
+    cols = ["market_value"] + [f"position_{g}" for g in GREEKS]
+    out = book.groupby(list(by))[cols].sum()
+    out.columns = ["market_value"] + GREEKS
+    return out
+
+def shock_grid(positions, spot_shocks, vol_shocks, model="black_scholes", steps=100, by="underlying"):
+    """
+    Revalues the whole book for every (spot shock, vol shock) pair with broadcasting.
+    spot_shocks are relative moves of every underlying (e.g. -0.3 = -30%); vol_shocks are
+    absolute changes in sigma (e.g. 0.2 = +20 vol points).
+    Returns a long DataFrame [spot_shock, vol_shock, <by>, pnl] of P&L against the base book.
+    """
+    spot_shocks = np.asarray(spot_shocks, dtype=float)
+    vol_shocks = np.asarray(vol_shocks, dtype=float)
+    S, K, T, r, sigma, is_call, american = _position_arrays(positions)
+    shape = (len(spot_shocks), len(vol_shocks), len(positions))
+    shocked_S = S[None, None, :] * (1 + spot_shocks[:, None, None])
+    shocked_sigma = np.maximum(sigma[None, None, :] + vol_shocks[None, :, None], 1e-8)
+    flat = lambda a: np.broadcast_to(a, shape).ravel()
+    res = _model_prices(
+        model, flat(shocked_S), flat(K), flat(T), flat(r), flat(shocked_sigma), flat(is_call), flat(american),
+        steps, with_greeks=False,
+    )
+    quantity = positions["quantity"].to_numpy(dtype=float)
+    base = _model_prices(model, S, K, T, r, sigma, is_call, american, steps, with_greeks=False)["price"] * quantity
+    pnl = res["price"].reshape(shape) * quantity - base
+    groups = positions[by].to_numpy(dtype=object)
+    keys = pd.unique(groups)
+    onehot = (groups[:, None] == keys[None, :]).astype(float)  # (positions, groups)
+    grouped = pnl @ onehot  # (spot, vol, groups)
+    idx = pd.MultiIndex.from_product([spot_shocks, vol_shocks, keys], names=["spot_shock", "vol_shock", by])
+    return pd.Series(grouped.ravel(), index=idx, name="pnl").reset_index()
+
+def shock_matrix(grid):
+    """Total book P&L as a spot shock x vol shock table from a shock_grid result."""
+    return grid.groupby(["spot_shock", "vol_shock"])["pnl"].sum().unstack("vol_shock")
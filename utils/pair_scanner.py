@@ -0,0 +1,135 @@
+import heapq
+import numpy as np
+import pandas as pd
+
+# === ROLLING CORRELATION PAIR SCANNER ===
+# Scans every pair of coins for rolling-correlation breakdowns (decoupling) or convergence.
+# Window sums are updated one bar at a time (add the newest return, drop the oldest), so the
+# state is a few coins x coins matrices plus a ring buffer of `lookback` correlation snapshots;
+# the full time x coins x coins tensor is never built. Only the best k pairs are kept, in a
+# bounded heap, while the scan runs.
+
+DIRECTIONS = ["both", "decoupling", "convergence"]
+
+class BoundedTopK:
+    """Keeps the k highest-scoring items, at most one per key."""
+
+    def __init__(self, k):
+        self.k = k
+        self.heap = []   # (score, key)
+        self.items = {}  # key -> (score, payload)
+
+    def push(self, score, key, payload):
+        current = self.items.get(key)
+        if current is not None:
+            if score <= current[0]:
+                return
+            # Replace the pair's entry; k is small so rebuilding the heap is cheap
+            self.items[key] = (score, payload)
+            self.heap = [(s, kk) for kk, (s, _) in self.items.items()]
+            heapq.heapify(self.heap)
+            return
+        if len(self.heap) < self.k:
+            heapq.heappush(self.heap, (score, key))
+            self.items[key] = (score, payload)
+        elif score > self.heap[0][0]:
+            _, dropped = heapq.heapreplace(self.heap, (score, key))
+            del self.items[dropped]
+            self.items[key] = (score, payload)
+
+    def ranked(self):
+        """[(score, key, payload)] from best to worst."""
+        return sorted(((s, k, p) for k, (s, p) in self.items.items()), key=lambda x: -x[0])
+
+class RollingCorrelation:
+    """
+    Pairwise rolling Pearson correlation over the last `window` rows, updated row by row.
+    Missing values are handled pairwise: a pair uses the rows where both coins have data.
+    """
+
+    def __init__(self, n_assets, window):
+        self.window = window
+        shape = (n_assets, n_assets)
+        self.n = np.zeros(shape)     # rows where both i and j are valid
+        self.sx = np.zeros(shape)    # sum of x_i over those rows
+        self.sxx = np.zeros(shape)   # sum of x_i^2 over those rows
+        self.sxy = np.zeros(shape)   # sum of x_i x_j
+        self.buffer = []
+
+    def _apply(self, row, sign):
+        valid = np.isfinite(row)
+        v = valid.astype(float)
+        x = np.where(valid, row, 0.0)
+        self.n += sign * np.outer(v, v)
+        self.sx += sign * np.outer(x, v)
+        self.sxx += sign * np.outer(x * x, v)
+        self.sxy += sign * np.outer(x, x)
+
+    def update(self, row):
+        self._apply(row, 1.0)
+        self.buffer.append(row)
+        if len(self.buffer) > self.window:
+            self._apply(self.buffer.pop(0), -1.0)
+
+    def correlation(self, min_periods):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cov = self.sxy - self.sx * self.sx.T / self.n
+            var = self.sxx - self.sx ** 2 / self.n
+            corr = cov / np.sqrt(var * var.T)
+        corr[self.n < min_periods] = np.nan
+        return np.clip(corr, -1, 1)
+
+def scan_pairs(prices, window=30, lookback=30, top_k=20, direction="both", rank_by="latest", min_periods=None):
+    """
+    Top-k pairs by change in rolling correlation of daily log returns.
+    change = rolling corr now - rolling corr `lookback` bars earlier.
+    direction: "decoupling" (largest drops), "convergence" (largest rises) or "both" (|change|).
+    rank_by: "latest" scores the change at the last bar; "peak" scores the largest change
+    seen at any bar of the scan (the date is reported).
+    Returns a DataFrame ranked best first: asset_a, asset_b, corr_before, corr_now, change, date.
+    """
+    if direction not in DIRECTIONS:
+        raise ValueError(f"Unknown direction: {direction}")
+    min_periods = min_periods or max(3, window // 2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rets = np.log(prices.astype(float)).diff().iloc[1:]
+    X = rets.to_numpy(dtype=float)
+    n_assets = X.shape[1]
+    iu, ju = np.triu_indices(n_assets, k=1)
+    roll = RollingCorrelation(n_assets, window)
+    history = []  # ring buffer of upper-triangle correlations, `lookback` snapshots deep
+    top = BoundedTopK(top_k)
+    last = len(X) - 1
+    for t, row in enumerate(X):
+        roll.update(row)
+        if t < window - 1:
+            continue
+        corr = roll.correlation(min_periods)[iu, ju].astype(np.float32)
+        history.append(corr)
+        if len(history) <= lookback:
+            continue
+        before = history.pop(0)
+        if rank_by == "latest" and t != last:
+            continue
+        change = corr - before
+        score = {"both": np.abs(change), "decoupling": -change, "convergence": change}[direction]
+        score = np.where(np.isfinite(score), score, -np.inf)
+        # Only this bar's best k can enter the heap, so partition first
+        k = min(top_k, len(score))
+        if k == 0:
+            continue
+        cand = np.argpartition(score, -k)[-k:]
+        for p in cand:
+            if np.isfinite(score[p]):
+                top.push(float(score[p]), int(p), (float(before[p]), float(corr[p]), float(change[p]), rets.index[t]))
+    rows = []
+    for score, p, (before, now, change, date) in top.ranked():
+        rows.append({
+            "asset_a": prices.columns[iu[p]],
+            "asset_b": prices.columns[ju[p]],
+            "corr_before": before,
+            "corr_now": now,
+            "change": change,
+            "date": date,
+        })
+    return pd.DataFrame(rows, columns=["asset_a", "asset_b", "corr_before", "corr_now", "change", "date"])
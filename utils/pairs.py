@@ -0,0 +1,170 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from statsmodels.tsa.stattools import coint
+from utils.backtest import run_backtest, state_from_signals, trade_list, summary_metrics
+from utils.clustering import correlation_matrix, log_returns
+from utils.volatility import rolling_mean, rolling_var
+
+# === COINTEGRATION PAIRS SCANNER ===
+# Candidate pairs are pre-filtered by return correlation (one matrix product for the whole
+# universe); only the survivors get an Engle-Granger cointegration test, an OLS hedge ratio
+# and a mean-reversion half-life. The tests run in a process pool whose workers receive the
+# log-price panel once (pool initializer) and then only pair indices, in equal-sized chunks,
+# so runtime scales with the number of cores. Winners can be traded with pairs_positions /
+# backtest_pair, which run through the vectorized engine in utils/backtest.py. The backtest
+# re-estimates the hedge ratio each bar from past prices only (walk-forward), since the
+# scanner's full-sample beta would let every trade see the end of the history.
+
+_PANEL = None
+
+def _init_worker(log_prices):
+    global _PANEL
+    _PANEL = log_prices
+
+def prefilter_pairs(prices, min_corr=0.7, min_obs=60):
+    """(i, j, corr) for every pair whose daily return correlation is at least min_corr."""
+    corr = correlation_matrix(log_returns(prices), min_periods=min_obs).to_numpy()
+    iu, ju = np.triu_indices(len(corr), k=1)
+    c = corr[iu, ju]
+    keep = np.isfinite(c) & (c >= min_corr)
+    return list(zip(iu[keep].tolist(), ju[keep].tolist(), c[keep].tolist()))
+
+def hedge_ratio(y, x):
+    """OLS of y on x with intercept. Returns (alpha, beta)."""
+    X = np.column_stack([np.ones_like(x), x])
+    alpha, beta = np.linalg.lstsq(X, y, rcond=None)[0]
+    return alpha, beta
+
+def half_life(spread):
+    """Half-life (bars) of mean reversion from the AR(1) fit ds_t = a + b s_{t-1}; inf if b >= 0."""
+    lagged, delta = spread[:-1], np.diff(spread)
+    _, b = hedge_ratio(delta, lagged)
+    return -np.log(2) / b if b < 0 else np.inf
+
+def test_pair(y, x, min_obs=60, maxlag=1):
+    """
+    Engle-Granger test of log prices y ~ x on their overlapping history.
+    Returns a dict (pvalue, t_stat, alpha, beta, half_life, zscore, obs) or None if too short.
+    """
+    valid = np.isfinite(y) & np.isfinite(x)
+    if valid.sum() < min_obs:
+        return None
+    y, x = y[valid], x[valid]
+    t_stat, pvalue, _ = coint(y, x, autolag=None, maxlag=maxlag)
+    alpha, beta = hedge_ratio(y, x)
+    spread = y - alpha - beta * x
+    std = spread.std(ddof=1)
+    return {
+        "pvalue": float(pvalue),
+        "t_stat": float(t_stat),
+        "alpha": float(alpha),
+        "beta": float(beta),
+        "half_life": float(half_life(spread)),
+        "zscore": float(spread[-1] / std) if std > 0 else np.nan,
+        "obs": int(valid.sum()),
+    }
+
+def _test_chunk(pairs, min_obs, maxlag):
+    out = []
+    for i, j, c in pairs:
+        res = test_pair(_PANEL[:, i], _PANEL[:, j], min_obs, maxlag)
+        if res is not None:
+            out.append((i, j, c, res))
+    return out
+
+def scan_cointegrated_pairs(prices, min_corr=0.7, max_pvalue=0.05, min_obs=60, max_half_life=None,
+                            maxlag=1, max_workers=None, chunks_per_worker=4):
+    """
+    Correlation pre-filter + Engle-Granger tests for a price panel (index = date, columns = coins).
+    max_workers: process pool size (0 runs in this process).
+    Returns a DataFrame of cointegrated pairs ranked by |spread z-score|: asset_a, asset_b,
+    corr, pvalue, t_stat, alpha, beta (hedge ratio of log prices), half_life (bars), zscore, obs.
+    """
+    candidates = prefilter_pairs(prices, min_corr, min_obs)
+    columns = ["asset_a", "asset_b", "corr", "pvalue", "t_stat", "alpha", "beta", "half_life", "zscore", "obs"]
+    if not candidates:
+        return pd.DataFrame(columns=columns)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        log_prices = np.log(prices.to_numpy(dtype=float))
+    workers = max_workers if max_workers is not None else (os.cpu_count() or 1)
+    if workers <= 1:
+        _init_worker(log_prices)
+        results = _test_chunk(candidates, min_obs, maxlag)
+    else:
+        n_chunks = min(len(candidates), workers * chunks_per_worker)
+        chunks = [candidates[k::n_chunks] for k in range(n_chunks)]  # interleaved for even load
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(log_prices,)) as pool:
+            parts = pool.map(_test_chunk, chunks, [min_obs] * n_chunks, [maxlag] * n_chunks)
+            results = [r for part in parts for r in part]
+    rows = [{"asset_a": prices.columns[i], "asset_b": prices.columns[j], "corr": c, **res} for i, j, c, res in results]
+    df = pd.DataFrame(rows, columns=columns)
+    df = df[df["pvalue"] <= max_pvalue]
+    if max_half_life is not None:
+        df = df[df["half_life"] <= max_half_life]
+    return df.reindex(df["zscore"].abs().sort_values(ascending=False).index).reset_index(drop=True)
+
+def rolling_hedge_ratio(prices, a, b, window=None, min_obs=60):
+    """
+    Walk-forward OLS hedge ratio of log(a) on log(b): the beta on each date uses prices up to
+    and including that date only, over an expanding history (or the last `window` bars).
+    NaN until min_obs bars are available.
+    """
+    y, x = np.log(prices[a]), np.log(prices[b])
+    if window is None:
+        cov, var = y.expanding(min_obs).cov(x), x.expanding(min_obs).var()
+    else:
+        cov, var = y.rolling(window, min_periods=min_obs).cov(x), x.rolling(window, min_periods=min_obs).var()
+    return (cov / var.where(var > 0)).rename("beta")
+
+def spread_zscore(prices, a, b, beta, window=30):
+    """Rolling z-score of the log spread log(a) - beta * log(b); beta is a number or a Series by date."""
+    spread = (np.log(prices[a]) - beta * np.log(prices[b])).to_frame("spread")
+    mean = rolling_mean(spread, window)
+    std = np.sqrt(rolling_var(spread, window))
+    return ((spread - mean) / std)["spread"]
+
+def pairs_positions(prices, a, b, beta, window=30, entry_z=2.0, exit_z=0.5):
+    """
+    Pairs strategy as a position panel for run_backtest: long the spread (long a, short beta*b)
+    when z < -entry_z until z > -exit_z, short it when z > entry_z until z < exit_z.
+    Legs are scaled so gross exposure is 1; beta may vary by date (flat where it is NaN).
+    Returns (positions DataFrame [a, b], spread state Series).
+    """
+    z = spread_zscore(prices, a, b, beta, window).to_frame("spread")
+    long_state = state_from_signals(z < -entry_z, z > -exit_z)["spread"]
+    short_state = state_from_signals(z > entry_z, z < exit_z)["spread"]
+    state = long_state - short_state
+    gross = 1 + abs(beta)
+    positions = pd.DataFrame({a: state / gross, b: -state * beta / gross}, index=prices.index).fillna(0.0)
+    return positions, state
+
+def backtest_pair(prices, a, b, beta=None, window=30, entry_z=2.0, exit_z=0.5, fee_bps=10.0, slippage_bps=5.0,
+                  hedge_window=None, min_obs=60):
+    """
+    Runs the pairs strategy through the backtesting engine. Both legs are charged costs;
+    the pair's return is the sum of the legs' returns. beta=None (the default) uses the
+    walk-forward rolling_hedge_ratio (expanding, or over hedge_window bars), so no trade
+    depends on later prices; a fixed number reuses one ratio for the whole history.
+    Returns a dict with 'returns', 'equity', 'positions', 'zscore', 'beta', 'trades' and 'metrics' (Series).
+    """
+    legs = prices[[a, b]].dropna()
+    if beta is None:
+        beta = rolling_hedge_ratio(legs, a, b, hedge_window, min_obs)
+    positions, state = pairs_positions(legs, a, b, beta, window, entry_z, exit_z)
+    result = run_backtest(legs, positions, fee_bps=fee_bps, slippage_bps=slippage_bps)
+    name = f"{a}/{b}"
+    pair_returns = result["returns"].sum(axis=1).to_frame(name)
+    equity = (1 + pair_returns).cumprod()
+    spread_state = state.to_frame(name)
+    trades = trade_list(spread_state, pair_returns)
+    return {
+        "returns": pair_returns[name],
+        "equity": equity[name],
+        "positions": positions,
+        "zscore": spread_zscore(legs, a, b, beta, window),
+        "beta": beta,
+        "trades": trades,
+        "metrics": summary_metrics(pair_returns, equity, trades, spread_state).iloc[0],
+    }
@@ -0,0 +1,157 @@
+import numpy as np
+import pandas as pd
+from utils.backtest import PERIODS_PER_YEAR
+from utils.volatility import rolling_var
+
+# === MULTI-ASSET PORTFOLIO BACKTESTS ===
+# Target weights (from a weight scheme) are set at each rebalance close and then drift with
+# prices until the next rebalance. The simulation is vectorized over the whole panel: every
+# bar is valued against the prices of the segment's rebalance bar, so there is no loop over
+# days or coins. Coins enter the portfolio at the first rebalance after they are listed
+# (their panel column is NaN before that), so no history is dropped to the youngest coin.
+# Rebalance costs are charged on turnover, the distance between drifted and target weights.
+
+WEIGHT_SCHEMES = ["equal", "inverse_vol", "market_cap", "custom"]
+REBALANCE_FREQUENCIES = {"daily": "D", "weekly": "W", "monthly": "M", "quarterly": "Q", "never": None}
+
+def rebalance_mask(index, frequency="monthly"):
+    """True on the first bar of every period (and on the first bar), e.g. first day of each month."""
+    freq = REBALANCE_FREQUENCIES[frequency]
+    mask = np.zeros(len(index), dtype=bool)
+    if len(index):
+        mask[0] = True
+    if freq == "D":
+        mask[:] = True
+    elif freq is not None:
+        periods = pd.DatetimeIndex(index).to_period(freq).asi8
+        mask[1:] |= periods[1:] != periods[:-1]
+    return mask
+
+def _normalise(raw, listed):
+    """Rows of raw weights restricted to listed coins and scaled to sum to 1."""
+    raw = np.where(listed & np.isfinite(raw), raw, 0.0)
+    total = raw.sum(axis=1, keepdims=True)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(total > 0, raw / total, 0.0)
+
+def equal_weights(prices):
+    listed = prices.notna().to_numpy()
+    return pd.DataFrame(_normalise(np.ones(prices.shape), listed), index=prices.index, columns=prices.columns)
+
+def inverse_vol_weights(prices, window=30):
+    """
+    Weights proportional to 1 / trailing volatility of daily returns. Coins without a full
+    window yet are left out; bars where no coin has one fall back to equal weight.
+    """
+    listed = prices.notna().to_numpy()
+    vol = np.sqrt(rolling_var(prices.pct_change(fill_method=None), window).to_numpy())
+    with np.errstate(divide="ignore"):
+        raw = np.where(vol > 0, 1 / vol, np.nan)
+    weights = _normalise(raw, listed)
+    no_estimate = weights.sum(axis=1) == 0
+    weights[no_estimate] = _normalise(np.ones(prices.shape), listed)[no_estimate]
+    return pd.DataFrame(weights, index=prices.index, columns=prices.columns)
+
+def market_cap_weights(market_caps, prices):
+    """Weights proportional to market cap (panel aligned like prices)."""
+    caps = market_caps.reindex_like(prices).to_numpy(dtype=float)
+    return pd.DataFrame(_normalise(caps, prices.notna().to_numpy()), index=prices.index, columns=prices.columns)
+
+def custom_weights(weights, prices):
+    """
+    Static user weights ({coin: weight} or Series). Unlisted coins' weight is spread over
+    the listed ones by renormalising each bar.
+    """
+    w = pd.Series(weights, dtype=float).reindex(prices.columns).fillna(0.0).to_numpy()
+    raw = np.broadcast_to(w, prices.shape)
+    return pd.DataFrame(_normalise(raw, prices.notna().to_numpy()), index=prices.index, columns=prices.columns)
+
+def load_weights_csv(source):
+    """Reads a user weight CSV with columns asset, weight. Returns a Series indexed by asset."""
+    df = pd.read_csv(source)
+    df.columns = [c.strip().lower() for c in df.columns]
+    if not {"asset", "weight"} <= set(df.columns):
+        raise ValueError("Weight CSV needs columns: asset, weight")
+    return df.groupby(df["asset"].astype(str).str.strip())["weight"].sum()
+
+def target_weights(prices, scheme="equal", market_caps=None, weights=None, vol_window=30):
+    if scheme == "equal":
+        return equal_weights(prices)
+    if scheme == "inverse_vol":
+        return inverse_vol_weights(prices, vol_window)
+    if scheme == "market_cap":
+        if market_caps is None:
+            raise ValueError("market_cap weighting needs a market cap panel")
+        return market_cap_weights(market_caps, prices)
+    if scheme == "custom":
+        if weights is None:
+            raise ValueError("custom weighting needs user weights")
+        return custom_weights(weights, prices)
+    raise ValueError(f"Unknown weight scheme: {scheme}")
+
+def run_portfolio_backtest(prices, targets, frequency="monthly", fee_bps=10.0, slippage_bps=5.0,
+                           initial_capital=1.0, periods_per_year=PERIODS_PER_YEAR):
+    """
+    Simulates a rebalanced portfolio on a price panel (index = date, columns = coins; NaN
+    before listing). targets: target weight panel (rows sum to <= 1, the rest is cash),
+    applied at the close of each rebalance bar.
+    Returns a dict with 'returns', 'equity', 'turnover', 'costs' (Series), 'weights' (drifted
+    weights at each close, after rebalancing), 'target_weights' and 'metrics' (Series).
+    """
+    prices = prices.astype(float)
+    # Gaps after listing are valued at the last known price
+    px = prices.ffill().to_numpy()
+    T = len(px)
+    rebalance = rebalance_mask(prices.index, frequency)
+    seg_start = np.maximum.accumulate(np.where(rebalance, np.arange(T), 0))
+    w_target = np.nan_to_num(targets.reindex_like(prices).to_numpy(dtype=float))
+    w_seg = w_target[seg_start]  # weights set at the start of each bar's segment
+    cash = 1 - w_seg.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        growth = np.where(w_seg != 0, px / px[seg_start], 0.0)  # price relative to segment start
+    growth = np.nan_to_num(growth)
+    value = (w_seg * growth).sum(axis=1) + cash  # segment-relative portfolio value at each close
+
+    # Return into bar t is earned by the segment held at the close of t-1
+    prev_seg = np.concatenate([[0], seg_start[:-1]])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        g_prev = np.nan_to_num(np.where(w_target[prev_seg] != 0, px / px[prev_seg], 0.0))
+    value_into = (w_target[prev_seg] * g_prev).sum(axis=1) + 1 - w_target[prev_seg].sum(axis=1)
+    value_prev = np.concatenate([[1.0], value[:-1]])
+    gross = np.where(np.arange(T) > 0, value_into / value_prev - 1, 0.0)
+
+    # Drifted weights just before rebalancing at each close, then turnover against the new targets
+    drift_before = w_target[prev_seg] * g_prev / value_into[:, None]
+    drift_before[0] = 0.0
+    turnover = np.where(rebalance, np.abs(w_target - drift_before).sum(axis=1), 0.0)
+    costs = turnover * (fee_bps + slippage_bps) / 1e4
+    net = (1 + gross) * (1 - costs) - 1
+
+    index = prices.index
+    returns = pd.Series(net, index=index, name="portfolio")
+    equity = initial_capital * (1 + returns).cumprod()
+    weights = pd.DataFrame(w_seg * growth / value[:, None], index=index, columns=prices.columns)
+    turnover = pd.Series(turnover, index=index, name="turnover")
+    return {
+        "returns": returns,
+        "equity": equity,
+        "turnover": turnover,
+        "costs": pd.Series(costs, index=index, name="costs"),
+        "weights": weights,
+        "target_weights": pd.DataFrame(w_target, index=index, columns=prices.columns),
+        "metrics": portfolio_metrics(returns, equity, turnover, rebalance, periods_per_year),
+    }
+
+def portfolio_metrics(returns, equity, turnover, rebalance, periods_per_year=PERIODS_PER_YEAR):
+    final = (1 + returns).prod()
+    years = max(len(returns) - 1, 1) / periods_per_year
+    std = returns.std()
+    return pd.Series({
+        "total_return": final - 1,
+        "cagr": final ** (1 / years) - 1,
+        "sharpe": returns.mean() / std * np.sqrt(periods_per_year) if std > 0 else np.nan,
+        "max_drawdown": (1 - equity / equity.cummax()).max(),
+        "rebalances": int(rebalance.sum()),
+        "avg_turnover": turnover[rebalance].mean(),
+        "annual_turnover": turnover.sum() / years,
+    })
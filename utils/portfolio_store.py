@@ -0,0 +1,219 @@
+import io
+import os
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+import pandas as pd
+
+# === TRANSACTIONAL PORTFOLIO STORE ===
+# SQLite database (WAL journal, so readers never block the writer) replacing the old
+# data/portfolios.csv that was read and rewritten whole on every change. Each add/remove is
+# one short write transaction: an append to the transactions log plus an indexed upsert of
+# the holding, independent of how many portfolios exist. Concurrent sessions are serialised
+# by SQLite's write lock instead of overwriting each other's files.
+# The legacy CSV is imported once on first use; CSV import/export keeps the old columns.
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data")
+DB_PATH = os.path.join(DATA_DIR, "portfolios.db")
+LEGACY_CSV = os.path.join(DATA_DIR, "portfolios.csv")
+CSV_COLUMNS = ["portfolio", "asset", "type", "amount", "added_on"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS portfolios (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    created_on TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS holdings (
+    portfolio_id INTEGER NOT NULL REFERENCES portfolios(id) ON DELETE CASCADE,
+    asset TEXT NOT NULL,
+    type TEXT NOT NULL DEFAULT 'coin',
+    amount REAL NOT NULL DEFAULT 0,
+    added_on TEXT NOT NULL,
+    PRIMARY KEY (portfolio_id, asset)
+);
+CREATE INDEX IF NOT EXISTS idx_holdings_asset ON holdings(asset);
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    portfolio_id INTEGER NOT NULL REFERENCES portfolios(id) ON DELETE CASCADE,
+    asset TEXT NOT NULL,
+    action TEXT NOT NULL,
+    amount REAL NOT NULL,
+    ts TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_transactions_portfolio_asset ON transactions(portfolio_id, asset);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+def _now():
+    return datetime.now().isoformat(sep=" ", timespec="seconds")
+
+class PortfolioStore:
+    """
+    Portfolios, holdings and a transactions log in one SQLite file.
+    Every public method runs in its own transaction on a short-lived connection, so a
+    single instance can be shared across Streamlit sessions and threads.
+    """
+
+    def __init__(self, path=None, legacy_csv=None):
+        self.path = path or DB_PATH
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+        finally:
+            conn.close()
+        legacy_csv = LEGACY_CSV if legacy_csv is None else legacy_csv
+        if legacy_csv and os.path.exists(legacy_csv):
+            self.migrate_csv(legacy_csv)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA foreign_keys=ON")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            yield conn
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def _read(self, sql, params=()):
+        conn = self._connect()
+        try:
+            return pd.read_sql_query(sql, conn, params=params)
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _portfolio_id(conn, name, create=False):
+        row = conn.execute("SELECT id FROM portfolios WHERE name = ?", (name,)).fetchone()
+        if row is not None:
+            return row[0]
+        if not create:
+            raise KeyError(f"Unknown portfolio: {name}")
+        return conn.execute("INSERT INTO portfolios (name, created_on) VALUES (?, ?)", (name, _now())).lastrowid
+
+    # --- Portfolios ---
+    def list_portfolios(self):
+        return self._read("SELECT name FROM portfolios ORDER BY id")["name"].tolist()
+
+    def create_portfolio(self, name):
+        """Returns False if a portfolio with this name already exists."""
+        with self._transaction() as conn:
+            cur = conn.execute("INSERT OR IGNORE INTO portfolios (name, created_on) VALUES (?, ?)", (name, _now()))
+            return cur.rowcount == 1
+
+    def delete_portfolio(self, name):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM portfolios WHERE name = ?", (name,))
+
+    # --- Holdings ---
+    def add_holding(self, portfolio, asset, amount, type="coin", ts=None):
+        """Adds amount to the holding (creating it if needed) and logs the transaction."""
+        ts = ts or _now()
+        with self._transaction() as conn:
+            pid = self._portfolio_id(conn, portfolio, create=True)
+            conn.execute(
+                "INSERT INTO holdings (portfolio_id, asset, type, amount, added_on) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(portfolio_id, asset) DO UPDATE SET amount = amount + excluded.amount",
+                (pid, asset, type, float(amount), ts))
+            conn.execute("INSERT INTO transactions (portfolio_id, asset, action, amount, ts) VALUES (?, ?, 'add', ?, ?)",
+                         (pid, asset, float(amount), ts))
+
+    def remove_holding(self, portfolio, asset, ts=None):
+        """Removes the whole holding; the removed amount is logged as a negative transaction."""
+        with self._transaction() as conn:
+            pid = self._portfolio_id(conn, portfolio)
+            row = conn.execute("SELECT amount FROM holdings WHERE portfolio_id = ? AND asset = ?", (pid, asset)).fetchone()
+            if row is None:
+                return False
+            conn.execute("DELETE FROM holdings WHERE portfolio_id = ? AND asset = ?", (pid, asset))
+            conn.execute("INSERT INTO transactions (portfolio_id, asset, action, amount, ts) VALUES (?, ?, 'remove', ?, ?)",
+                         (pid, asset, -row[0], ts or _now()))
+            return True
+
+    def holdings(self, portfolio=None):
+        """Holdings in the legacy CSV layout (portfolio, asset, type, amount, added_on)."""
+        sql = ("SELECT p.name AS portfolio, h.asset, h.type, h.amount, h.added_on "
+               "FROM holdings h JOIN portfolios p ON p.id = h.portfolio_id")
+        if portfolio is None:
+            return self._read(sql + " ORDER BY p.id, h.added_on, h.asset")
+        return self._read(sql + " WHERE p.name = ? ORDER BY h.added_on, h.asset", (portfolio,))
+
+    def transactions(self, portfolio=None):
+        sql = ("SELECT t.id, p.name AS portfolio, t.asset, t.action, t.amount, t.ts "
+               "FROM transactions t JOIN portfolios p ON p.id = t.portfolio_id")
+        if portfolio is None:
+            return self._read(sql + " ORDER BY t.id")
+        return self._read(sql + " WHERE p.name = ? ORDER BY t.id", (portfolio,))
+
+    # --- CSV import / export ---
+    def import_csv(self, source, portfolio=None, replace=False):
+        """
+        Bulk-loads rows in the legacy CSV layout (path, buffer or DataFrame). portfolio
+        overrides the file's portfolio column; replace clears those portfolios' holdings
+        first. Rows with an empty asset only create the portfolio (old placeholder rows).
+        Returns the number of holdings rows written.
+        """
+        df = source.copy() if isinstance(source, pd.DataFrame) else pd.read_csv(source)
+        with self._transaction() as conn:
+            return self._import_frame(conn, df, portfolio, replace)
+
+    def _import_frame(self, conn, df, portfolio=None, replace=False):
+        if portfolio is not None:
+            df["portfolio"] = portfolio
+        if "portfolio" not in df or "asset" not in df:
+            raise ValueError("CSV needs at least 'portfolio' and 'asset' columns.")
+        df["asset"] = df["asset"].fillna("").astype(str)
+        df["type"] = df["type"].fillna("coin").replace("", "coin") if "type" in df else "coin"
+        df["amount"] = pd.to_numeric(df["amount"], errors="coerce").fillna(0.0) if "amount" in df else 0.0
+        df["added_on"] = df["added_on"].fillna(_now()).astype(str) if "added_on" in df else _now()
+        names = df["portfolio"].dropna().astype(str).unique().tolist()
+        rows = df[df["asset"] != ""]
+        ids = {name: self._portfolio_id(conn, name, create=True) for name in names}
+        if replace:
+            # Void the replaced history: every earlier (asset, timestamp) flow is reversed at its own
+            # timestamp, so units are zero at every point in the past (not just from now on) and the
+            # imported rows, dated by their added_on, are the portfolio's whole history
+            for pid in ids.values():
+                conn.execute("INSERT INTO transactions (portfolio_id, asset, action, amount, ts) "
+                             "SELECT portfolio_id, asset, 'remove', -SUM(amount), ts FROM transactions WHERE portfolio_id = ? "
+                             "GROUP BY asset, ts HAVING ABS(SUM(amount)) > 1e-12", (pid,))
+            conn.executemany("DELETE FROM holdings WHERE portfolio_id = ?", [(i,) for i in ids.values()])
+        records = [(ids[str(p)], a, t, float(m), str(d)) for p, a, t, m, d in
+                   rows[["portfolio", "asset", "type", "amount", "added_on"]].itertuples(index=False)]
+        conn.executemany(
+            "INSERT INTO holdings (portfolio_id, asset, type, amount, added_on) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(portfolio_id, asset) DO UPDATE SET amount = amount + excluded.amount", records)
+        conn.executemany("INSERT INTO transactions (portfolio_id, asset, action, amount, ts) VALUES (?, ?, 'import', ?, ?)",
+                         [(pid, a, m, d) for pid, a, _, m, d in records])
+        return len(records)
+
+    def export_csv(self, portfolio=None):
+        """CSV text of the holdings in the legacy layout."""
+        buf = io.StringIO()
+        self.holdings(portfolio)[CSV_COLUMNS].to_csv(buf, index=False)
+        return buf.getvalue()
+
+    def migrate_csv(self, path):
+        """One-time import of the legacy data/portfolios.csv (recorded in the meta table)."""
+        df = pd.read_csv(path)
+        with self._transaction() as conn:
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'migrated_csv'").fetchone() is not None:
+                return 0
+            n = self._import_frame(conn, df)
+            conn.execute("INSERT INTO meta (key, value) VALUES ('migrated_csv', ?)", (_now(),))
+        return n
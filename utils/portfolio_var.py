@@ -0,0 +1,193 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+
+# === MONTE CARLO PORTFOLIO VaR / CVaR ===
+# Simulates the P&L of the whole book instead of one coin's historical percentile (calc_var):
+#   gaussian - correlated normal returns from a Cholesky factor of the covariance;
+#   fhs      - filtered historical simulation: historical return rows standardised by each
+#              coin's EWMA volatility are bootstrapped (keeping the cross-section together)
+#              and rescaled by today's volatility.
+# Scenarios are generated in chunks of chunk_size rows and each chunk keeps only its worst
+# losses (enough for the tail), so memory is bounded by the chunk and the tail, not by the
+# number of scenarios. Chunks run in a process pool whose workers receive the model once
+# (pool initializer); every chunk has its own seed from one SeedSequence, so results do not
+# depend on the number of workers.
+# VaR and CVaR are reported as positive losses; component CVaR is the expected loss of each
+# holding in the tail scenarios (sums to CVaR), component VaR the same around the VaR
+# quantile, rescaled to sum to VaR; marginal VaR is component VaR per unit of position.
+
+METHODS = ["gaussian", "fhs"]
+EWMA_LAMBDA = 0.94
+
+_MODEL = None
+
+def _init_worker(model):
+    global _MODEL
+    _MODEL = model
+
+def cholesky_factor(cov):
+    """Lower Cholesky factor; a covariance that is not positive definite is repaired first."""
+    cov = np.asarray(cov, dtype=float)
+    try:
+        return np.linalg.cholesky(cov)
+    except np.linalg.LinAlgError:
+        vals, vecs = np.linalg.eigh((cov + cov.T) / 2)
+        fixed = (vecs * np.clip(vals, 1e-12 * max(vals.max(), 1e-18), None)) @ vecs.T
+        return np.linalg.cholesky(fixed)
+
+def ewma_volatility(returns, lam=EWMA_LAMBDA):
+    """
+    RiskMetrics EWMA volatility per coin using information up to the previous day, seeded
+    with the mean square of each coin's first 20 returns. Returns (volatility DataFrame
+    aligned with returns, next-day volatility forecast array).
+    """
+    X = returns.to_numpy(dtype=float)
+    seed = np.array([np.mean(c[np.isfinite(c)][:20] ** 2) if np.isfinite(c).any() else np.nan for c in X.T])
+    var = np.full(X.shape, np.nan)
+    current = np.full(X.shape[1], np.nan)
+    for t, row in enumerate(X):
+        ok = np.isfinite(row)
+        current = np.where(ok & np.isnan(current), seed, current)
+        var[t] = current
+        current = np.where(ok, lam * current + (1 - lam) * np.where(ok, row, 0.0) ** 2, current)
+    return pd.DataFrame(np.sqrt(var), index=returns.index, columns=returns.columns), np.sqrt(current)
+
+def _simulate_returns(model, rng, n):
+    h = model["horizon"]
+    if model["method"] == "gaussian":
+        z = rng.standard_normal((n, model["chol"].shape[0]))
+        return model["mu"] * h + np.sqrt(h) * (z @ model["chol"].T)
+    residuals = model["residuals"]
+    total = np.zeros((n, residuals.shape[1]))
+    for _ in range(h):  # one independent bootstrap draw per day of the horizon
+        total += residuals[rng.integers(0, len(residuals), n)]
+    return total * model["sigma"]
+
+def _tail_chunk(seed, n, keep, sample):
+    """Worst `keep` losses of one chunk with the per-holding losses, plus a small sample of losses."""
+    rng = np.random.default_rng(seed)
+    asset_loss = -_simulate_returns(_MODEL, rng, n) * _MODEL["values"]
+    loss = asset_loss.sum(axis=1)
+    keep = min(keep, n)
+    idx = np.argpartition(loss, n - keep)[n - keep:] if keep < n else np.arange(n)
+    return loss[idx], asset_loss[idx], loss[:sample], loss.sum(), (loss * loss).sum()
+
+def parametric_var(values, cov, confidence=0.95, horizon=1):
+    """Delta-normal VaR/CVaR and component VaR (zero mean) for comparison with the simulation."""
+    v = np.asarray(values, dtype=float)
+    S = np.asarray(cov, dtype=float) * horizon
+    sigma = np.sqrt(v @ S @ v)
+    z = norm.ppf(confidence)
+    return {
+        "var": z * sigma,
+        "cvar": sigma * norm.pdf(z) / (1 - confidence),
+        "component_var": z * v * (S @ v) / sigma if sigma > 0 else np.zeros_like(v),
+    }
+
+def build_model(returns, values, method="gaussian", cov=None, horizon=1, lam=EWMA_LAMBDA):
+    """
+    Scenario model for a book. returns: daily return panel; values: {coin: position value}
+    (coins missing from returns are ignored). cov: daily covariance (None = sample covariance
+    of returns) for the gaussian method.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown method: {method}")
+    values = pd.Series(values, dtype=float)
+    assets = [a for a in values.index if a in returns.columns and values[a] != 0]
+    if not assets:
+        raise ValueError("No holdings with return history.")
+    rets = returns[assets]
+    model = {"method": method, "assets": assets, "values": values[assets].to_numpy(), "horizon": int(horizon)}
+    if method == "gaussian":
+        cov = rets.cov() if cov is None else cov
+        model["cov"] = cov.loc[assets, assets].to_numpy(dtype=float)
+        model["chol"] = cholesky_factor(model["cov"])
+        model["mu"] = rets.mean().fillna(0.0).to_numpy()
+    else:
+        vol, current = ewma_volatility(rets, lam)
+        residuals = (rets / vol).to_numpy(dtype=float)
+        # Rows with gaps (coin not yet listed) count as zero shocks for that coin
+        residuals = np.where(np.isfinite(residuals), residuals, 0.0)[np.isfinite(vol.to_numpy()).any(axis=1)]
+        if len(residuals) < 20:
+            raise ValueError("Need at least 20 days of history for filtered historical simulation.")
+        model["residuals"] = residuals
+        model["sigma"] = np.nan_to_num(current)
+        model["cov"] = rets.cov().fillna(0.0).to_numpy()
+    return model
+
+def simulate_var(model, n_scenarios=100_000, confidence=0.95, chunk_size=50_000, max_workers=None, seed=42,
+                 sample_size=50_000):
+    """
+    Runs n_scenarios for a build_model() model. max_workers: process pool size (0 runs in
+    this process; None uses all cores when there is more than one chunk).
+    Returns a dict with 'var', 'cvar' (positive losses in the currency of the values),
+    'var_pct'/'cvar_pct' (of the book value), 'components' (DataFrame per holding: value,
+    weight, marginal_var, component_var, component_cvar, var_share), 'parametric'
+    (delta-normal reference), 'loss_sample', 'mean_loss', 'std_loss', 'scenarios' and 'seconds'.
+    """
+    start = time.perf_counter()
+    n_chunks = max(1, -(-n_scenarios // chunk_size))
+    sizes = [chunk_size] * (n_chunks - 1) + [n_scenarios - chunk_size * (n_chunks - 1)]
+    n_tail = max(1, int(np.ceil((1 - confidence) * n_scenarios)))
+    band = max(1, int(np.ceil(0.05 * n_tail)))  # scenarios either side of the VaR rank
+    keep = n_tail + band
+    seeds = np.random.SeedSequence(seed).spawn(n_chunks)
+    per_chunk = -(-sample_size // n_chunks)
+    workers = max_workers if max_workers is not None else min(n_chunks, os.cpu_count() or 1)
+    k = len(model["assets"])
+    loss, asset_loss, samples, sums = np.zeros(0), np.zeros((0, k)), [], np.zeros(2)
+
+    def merge(parts):
+        # Fold each chunk's tail into a running tail of `keep` scenarios as results arrive
+        nonlocal loss, asset_loss
+        for part_loss, part_assets, sample, total, total_sq in parts:
+            loss = np.concatenate([loss, part_loss])
+            asset_loss = np.concatenate([asset_loss, part_assets])
+            if len(loss) > keep:
+                idx = np.argpartition(loss, len(loss) - keep)[len(loss) - keep:]
+                loss, asset_loss = loss[idx], asset_loss[idx]
+            samples.append(sample)
+            sums[:] += (total, total_sq)
+
+    if workers <= 1:
+        _init_worker(model)
+        merge(_tail_chunk(s, n, keep, per_chunk) for s, n in zip(seeds, sizes))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(model,)) as pool:
+            merge(pool.map(_tail_chunk, seeds, sizes, [keep] * n_chunks, [per_chunk] * n_chunks))
+    order = np.argsort(loss)[::-1]  # worst first
+    loss, asset_loss = loss[order], asset_loss[order]
+    var = loss[n_tail - 1]
+    cvar = loss[:n_tail].mean()
+    component_cvar = asset_loss[:n_tail].mean(axis=0)
+    lo, hi = max(0, n_tail - 1 - band), min(len(loss), n_tail + band)
+    around = asset_loss[lo:hi].mean(axis=0)
+    component_var = around * var / around.sum() if around.sum() != 0 else around
+    total = model["values"].sum()
+    mean = sums[0] / n_scenarios
+    std = np.sqrt(max(sums[1] / n_scenarios - mean ** 2, 0.0))
+    components = pd.DataFrame({
+        "value": model["values"],
+        "weight": model["values"] / total,
+        "marginal_var": component_var / model["values"],
+        "component_var": component_var,
+        "component_cvar": component_cvar,
+        "var_share": component_var / var if var else np.nan,
+    }, index=model["assets"])
+    return {
+        "var": float(var),
+        "cvar": float(cvar),
+        "var_pct": float(var / total),
+        "cvar_pct": float(cvar / total),
+        "components": components,
+        "parametric": parametric_var(model["values"], model["cov"], confidence, model["horizon"]),
+        "loss_sample": np.concatenate(samples)[:sample_size],
+        "mean_loss": float(mean),
+        "std_loss": float(std),
+        "scenarios": int(n_scenarios),
+        "seconds": time.perf_counter() - start,
+    }
@@ -0,0 +1,196 @@
+import re
+from bisect import bisect_left
+import numpy as np
+import pandas as pd
+
+# === INDEXED SCREENING QUERIES ===
+# QueryEngine wraps one market snapshot (a DataFrame that does not change while the engine
+# lives) with indexes built once and reused by every widget change:
+#   - per column, the row order sorted by value (built lazily on first use); range filters
+#     are two binary searches on the sorted values;
+#   - a token index for text search: every suffix of every lower-cased word of the text
+#     columns, sorted, so a search term is a prefix lookup that matches it anywhere inside
+#     a word (like str.contains, without scanning all rows).
+# A query starts from its most selective condition (counts come from the indexes), checks
+# the remaining ones only on those candidate rows and takes the top k from the presorted
+# order, so typical screens touch far fewer than all rows.
+# Semantics follow pandas: NaN never matches a range and sorts last; multi-word searches
+# need every word to match; ties keep the snapshot's row order.
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_OPS = {">=", "<=", ">", "<", "==", "between"}
+
+def _tokens(text):
+    return _TOKEN.findall(str(text).lower()) if pd.notna(text) else []
+
+class QueryEngine:
+    """Indexes over one DataFrame snapshot; build with QueryEngine(df, text_columns)."""
+
+    def __init__(self, df, text_columns=("Name", "Symbol")):
+        self.df = df
+        self.n = len(self.df)
+        self._orders = {}  # (column, ascending) -> row order
+        self._ranks = {}   # (column, ascending) -> position of each row in that order
+        self._sorted = {}  # column -> (sorted non-NaN values, their rows)
+        self._values = {}  # column -> float values in row order
+        entries = sorted({(token[i:], row) for col in text_columns if col in self.df
+                          for row, text in enumerate(self.df[col].tolist()) for token in _tokens(text) for i in range(len(token))})
+        self._suffixes = [s for s, _ in entries]
+        self._suffix_rows = np.array([r for _, r in entries], dtype=np.int64)
+
+    # --- Indexes ---
+    def order(self, column, ascending=True):
+        """Row positions sorted by column (stable, NaN last), cached."""
+        key = (column, ascending)
+        if key not in self._orders:
+            s = self.df[column].reset_index(drop=True)
+            self._orders[key] = np.asarray(s.sort_values(ascending=ascending, kind="stable", na_position="last").index)
+        return self._orders[key]
+
+    def rank(self, column, ascending=True):
+        """Position of every row in order(column, ascending), cached."""
+        key = (column, ascending)
+        if key not in self._ranks:
+            rank = np.empty(self.n, dtype=np.int64)
+            rank[self.order(column, ascending)] = np.arange(self.n)
+            self._ranks[key] = rank
+        return self._ranks[key]
+
+    def values(self, column):
+        if column not in self._values:
+            self._values[column] = pd.to_numeric(self.df[column], errors="coerce").to_numpy(dtype=float)
+        return self._values[column]
+
+    def _sorted_values(self, column):
+        if column not in self._sorted:
+            rows = self.order(column)
+            values = self.values(column)[rows]
+            valid = ~np.isnan(values)
+            self._sorted[column] = (values[valid], rows[valid])
+        return self._sorted[column]
+
+    def _range_bounds(self, column, low, high, include_low, include_high):
+        values, _ = self._sorted_values(column)
+        lo = 0 if low is None else np.searchsorted(values, low, side="left" if include_low else "right")
+        hi = len(values) if high is None else np.searchsorted(values, high, side="right" if include_high else "left")
+        return lo, max(lo, hi)
+
+    def range_rows(self, column, low=None, high=None, include_low=True, include_high=True):
+        """Rows with low <= value <= high (bounds optional / exclusive), in value order."""
+        lo, hi = self._range_bounds(column, low, high, include_low, include_high)
+        return self._sorted_values(column)[1][lo:hi]
+
+    def range_test(self, rows, column, low=None, high=None, include_low=True, include_high=True):
+        """Boolean mask of which rows satisfy the range (NaN never does)."""
+        v = self.values(column)[rows]
+        ok = ~np.isnan(v)
+        if low is not None:
+            ok &= v >= low if include_low else v > low
+        if high is not None:
+            ok &= v <= high if include_high else v < high
+        return ok
+
+    def search_rows(self, text):
+        """Rows whose text columns contain every word of text (case-insensitive)."""
+        result = None
+        for term in _tokens(text):
+            lo = bisect_left(self._suffixes, term)
+            hi = bisect_left(self._suffixes, term + "￿", lo)
+            rows = np.unique(self._suffix_rows[lo:hi])
+            result = rows if result is None else np.intersect1d(result, rows, assume_unique=True)
+        return np.arange(self.n) if result is None else result
+
+    def query(self):
+        return Query(self)
+
+class Query:
+    """
+    Chainable screen over a QueryEngine, e.g.
+    engine.query().where("Price (USD)", "between", (0.01, 1)).search("dog").sort("Market Cap (USD)", ascending=False).limit(10).run()
+    Each method returns a new Query, so partial queries can be shared.
+    """
+
+    def __init__(self, engine, ranges=(), text="", sort_by=None, ascending=True, k=None):
+        self.engine = engine
+        self.ranges = tuple(ranges)
+        self.text = text
+        self.sort_by = sort_by
+        self.ascending = ascending
+        self.k = k
+
+    def _with(self, **changes):
+        state = dict(ranges=self.ranges, text=self.text, sort_by=self.sort_by, ascending=self.ascending, k=self.k)
+        state.update(changes)
+        return Query(self.engine, **state)
+
+    def where(self, column, op, value):
+        if op not in _OPS:
+            raise ValueError(f"Unknown operator: {op}")
+        low, high = value if op == "between" else (value, value) if op == "==" else (None, None)
+        if op in (">=", ">"):
+            low = value
+        if op in ("<=", "<"):
+            high = value
+        return self._with(ranges=self.ranges + ((column, low, high, op != ">", op != "<"),))
+
+    def between(self, column, low, high):
+        return self.where(column, "between", (low, high))
+
+    def search(self, text):
+        return self._with(text=f"{self.text} {text}".strip() if text else self.text)
+
+    def sort(self, column, ascending=True):
+        return self._with(sort_by=column, ascending=ascending)
+
+    def limit(self, k):
+        return self._with(k=k)
+
+    def rows(self):
+        """Matching row positions in result order."""
+        e = self.engine
+        # (size, rows, test) per condition; range sizes come from the index without materialising rows
+        conditions = []
+        for r in self.ranges:
+            lo, hi = e._range_bounds(*r)
+            conditions.append((hi - lo, lambda r=r: e.range_rows(*r), lambda rows, r=r: e.range_test(rows, *r)))
+        if self.text:
+            matched = e.search_rows(self.text)
+            conditions.append((len(matched), lambda: matched, lambda rows: np.isin(rows, matched, assume_unique=True)))
+        rows = None
+        if conditions:
+            # Drive from the most selective condition and test the others on its rows only
+            conditions.sort(key=lambda c: c[0])
+            rows = np.sort(conditions[0][1]())
+            for _, _, test in conditions[1:]:
+                rows = rows[test(rows)]
+        if self.sort_by is None:
+            rows = np.arange(e.n) if rows is None else rows
+            return rows[:self.k] if self.k is not None else rows
+        order = e.order(self.sort_by, self.ascending)
+        if rows is None:
+            return order[:self.k] if self.k is not None else order
+        k = len(rows) if self.k is None else min(self.k, len(rows))
+        if k == 0:
+            return rows[:0]
+        if len(rows) * 8 < e.n:
+            # Few candidates: rank them by their position in the presorted order
+            r = e.rank(self.sort_by, self.ascending)[rows]
+            top = np.argpartition(r, k - 1)[:k] if k < len(r) else np.arange(len(r))
+            return rows[top[np.argsort(r[top])]]
+        # Many candidates: walk the presorted order until k of them are found
+        member = np.zeros(e.n, dtype=bool)
+        member[rows] = True
+        found, total, start, step = [], 0, 0, max(4 * k, 64)
+        while start < e.n and total < k:
+            block = order[start:start + step]
+            found.append(block[member[block]])
+            total += len(found[-1])
+            start += step
+        return np.concatenate(found)[:k]
+
+    def run(self):
+        """Matching rows as a DataFrame (snapshot index kept, like boolean-mask filtering)."""
+        return self.engine.df.iloc[self.rows()]
+
+    def count(self):
+        return len(self._with(sort_by=None, k=None).rows())
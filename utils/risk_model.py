@@ -0,0 +1,235 @@
+from collections import deque
+import numpy as np
+import pandas as pd
+
+# === RISK MODEL: SHRINKAGE COVARIANCE & PCA FACTORS ===
+# The model keeps sufficient statistics of the daily returns panel (count, sums, cross
+# products and the squared-return cross products the Ledoit-Wolf estimator needs), so new bars are
+# folded in with an O(coins^2) update instead of a full recompute, and the memory used does
+# not grow with history length.
+# Missing returns (before a coin was listed, or gaps) are pairwise-deleted: every pair of coins
+# also keeps its joint observation count and its sums over the rows where both have a return,
+# so each covariance entry (and its Ledoit-Wolf variance term) is normalised by that pair's own
+# overlap, like DataFrame.cov. A short-history coin is neither shrunk towards zero volatility
+# nor decorrelated; coins with fewer than min_obs real observations are left out of the outputs.
+# Pairwise entries need not form a positive semi-definite matrix, so negative eigenvalues of the
+# shrunk matrix are clipped to zero. With a complete panel this is exactly sklearn's ledoit_wolf.
+# As in the NAV engine and the feature pipeline, the latest row is provisional (today's
+# return is measured from an intraday price): it stays out of the running statistics, is
+# added when the model is read and is replaced by the next update until a newer row arrives.
+# With a window, the committed rows are kept as well and each one is subtracted again when
+# it leaves the window, so the model always covers the last `window` rows.
+
+PERIODS_PER_YEAR = 365
+_STATS = ["n", "pairs", "sum_xv", "sum_x2v", "sum_xx", "sum_x2x", "sum_x2x2"]
+
+class RiskModel:
+    """
+    Incremental Ledoit-Wolf covariance and PCA factor model over the last `window` return
+    rows (all rows when window is None).
+    Call update(returns) with a returns panel (index = date, columns = coins); rows at or
+    before the last committed date are ignored, new coins are added on the fly.
+    """
+
+    def __init__(self, window=None):
+        self.window = window
+        self.columns = []
+        self.last_date = None  # last committed row
+        self.n = 0
+        # Sums run over real observations (missing returns are zero-filled and masked by v,
+        # the 0/1 validity row), so every [i, j] entry covers the rows where both coins trade
+        self.pairs = np.zeros((0, 0))     # joint observations, v v^T (diagonal: per coin)
+        self.sum_xv = np.zeros((0, 0))    # sum of x v^T
+        self.sum_x2v = np.zeros((0, 0))   # sum of (x*x) v^T
+        self.sum_xx = np.zeros((0, 0))    # sum of x x^T
+        self.sum_x2x = np.zeros((0, 0))   # sum of (x*x) x^T
+        self.sum_x2x2 = np.zeros((0, 0))  # sum of (x*x) (x*x)^T
+        self.rows = deque()  # committed (values, valid) rows still in the window (only with a window)
+        self.live = None     # provisional latest row: (date, values, valid)
+
+    def _add_columns(self, new):
+        k = len(new)
+        self.columns = self.columns + list(new)
+        for name in _STATS[1:]:
+            old = getattr(self, name)
+            grown = np.zeros((len(self.columns), len(self.columns)))
+            grown[:old.shape[0], :old.shape[1]] = old
+            setattr(self, name, grown)
+
+    def _accumulate(self, stats, X, valid, sign):
+        # Rows stored before a coin was added are narrower: the coin counts as missing there
+        pad = len(self.columns) - X.shape[1]
+        X = np.pad(np.where(valid, X, 0.0), ((0, 0), (0, pad)))
+        V = np.pad(valid, ((0, 0), (0, pad))).astype(float)
+        X2 = X * X
+        stats["n"] += sign * len(X)
+        stats["pairs"] += sign * (V.T @ V)
+        stats["sum_xv"] += sign * (X.T @ V)
+        stats["sum_x2v"] += sign * (X2.T @ V)
+        stats["sum_xx"] += sign * (X.T @ X)
+        stats["sum_x2x"] += sign * (X2.T @ X)
+        stats["sum_x2x2"] += sign * (X2.T @ X2)
+
+    def _committed(self):
+        return {name: getattr(self, name) for name in _STATS}
+
+    def _stats(self):
+        """Committed statistics plus the provisional row (and minus the row it pushes out of the window)."""
+        if self.live is None:
+            return self._committed()
+        stats = {name: np.copy(getattr(self, name)) for name in _STATS}
+        _, X, valid = self.live
+        self._accumulate(stats, X, valid, +1)
+        if self.window is not None and len(self.rows) >= self.window:
+            self._accumulate(stats, *self.rows[0], -1)
+        return stats
+
+    def update(self, returns):
+        """
+        Commits the new rows except the latest, which replaces the provisional row.
+        Returns the number of rows committed.
+        """
+        if self.last_date is not None:
+            returns = returns[returns.index > self.last_date]
+        if returns.empty:
+            return 0
+        new = [c for c in returns.columns if c not in self.columns]
+        if new:
+            self._add_columns(new)
+        X = returns.reindex(columns=self.columns).to_numpy(dtype=float)
+        valid = np.isfinite(X)
+        self.live = (returns.index[-1], X[-1:], valid[-1:])
+        X, valid = X[:-1], valid[:-1]
+        if len(X):
+            committed = self._committed()
+            if self.window is not None:
+                X, valid = X[-self.window:], valid[-self.window:]
+                for i in range(len(X)):
+                    self.rows.append((X[i:i + 1], valid[i:i + 1]))
+                while len(self.rows) > self.window:
+                    self._accumulate(committed, *self.rows.popleft(), -1)
+            self._accumulate(committed, X, valid, +1)
+            self.n = committed["n"]
+            self.last_date = returns.index[-2]
+        return len(X)
+
+    @classmethod
+    def from_returns(cls, returns, window=None):
+        model = cls(window)
+        model.update(returns)
+        return model
+
+    def _active(self, min_obs, stats=None):
+        return np.flatnonzero(np.diag((stats or self._stats())["pairs"]) >= min_obs)
+
+    @staticmethod
+    def _pairwise(st, idx):
+        """Joint counts, pairwise means of i and j over their joint rows, and the ML covariance."""
+        block = np.ix_(idx, idx)
+        pairs = st["pairs"][block]
+        safe = np.maximum(pairs, 1)
+        mean_i = st["sum_xv"][block] / safe  # [i, j]: mean of coin i where j also trades
+        mean_j = mean_i.T
+        S = np.where(pairs > 0, st["sum_xx"][block] / safe - mean_i * mean_j, 0.0)
+        return pairs, safe, mean_i, mean_j, S
+
+    def sample_covariance(self, idx=None, stats=None):
+        """Maximum-likelihood covariance (divides by each pair's joint observations), as used by Ledoit-Wolf."""
+        st = stats or self._stats()
+        idx = np.arange(len(self.columns)) if idx is None else idx
+        return self._pairwise(st, idx)[-1]
+
+    def ledoit_wolf(self, min_obs=20):
+        """
+        Ledoit-Wolf shrinkage towards a scaled identity, from the stored statistics
+        (same estimator as sklearn.covariance.ledoit_wolf on the demeaned panel; with
+        missing returns each entry uses its pair's joint rows).
+        Returns (covariance DataFrame, shrinkage intensity).
+        """
+        st = self._stats()
+        idx = self._active(min_obs, st)
+        if len(idx) == 0 or st["n"] < 2:
+            return pd.DataFrame(), np.nan
+        p = len(idx)
+        pairs, safe, a, b, S = self._pairwise(st, idx)
+        # sum over joint rows of (x_i - a)^2 (x_j - b)^2, expanded into the stored sums
+        block = np.ix_(idx, idx)
+        sum_x2x = st["sum_x2x"][block]  # [i, j]: sum x_i^2 x_j
+        sum_x2v = st["sum_x2v"][block]  # [i, j]: sum x_i^2 where j also trades
+        sum_y2y2 = (st["sum_x2x2"][block] - 2 * b * sum_x2x - 2 * a * sum_x2x.T + b ** 2 * sum_x2v + a ** 2 * sum_x2v.T
+                    + 4 * a * b * st["sum_xx"][block] - 3 * a ** 2 * b ** 2 * pairs)
+        # Variance of each entry's estimate: pi_ij / n_ij (pi_ij / n for a complete panel)
+        pi = np.where(pairs > 0, sum_y2y2 / safe - S ** 2, 0.0)
+        trace_mu = np.trace(S) / p
+        s_norm2 = float((S ** 2).sum())
+        beta = float((pi / safe).sum()) / p
+        delta = (s_norm2 - 2 * trace_mu * np.trace(S) + p * trace_mu ** 2) / p
+        beta = min(beta, delta)
+        shrinkage = 0.0 if beta <= 0 else beta / delta
+        cov = (1 - shrinkage) * S + shrinkage * trace_mu * np.eye(p)
+        eigval, eigvec = np.linalg.eigh(cov)
+        if eigval[0] < 0:  # pairwise entries can be jointly inconsistent
+            cov = (eigvec * np.clip(eigval, 0, None)) @ eigvec.T
+        labels = [self.columns[i] for i in idx]
+        return pd.DataFrame(cov, index=labels, columns=labels), shrinkage
+
+    def factor_model(self, n_factors=3, min_obs=20, periods_per_year=PERIODS_PER_YEAR):
+        """
+        PCA of the shrunk covariance. Returns a dict with
+          'covariance' (DataFrame), 'shrinkage' (float),
+          'explained_variance' (DataFrame per factor: variance, ratio, cumulative),
+          'loadings' (coins x factors, eigenvectors scaled by factor vol),
+          'risk' (per coin: total, factor and idiosyncratic annualised vol, idiosyncratic share),
+          'observations' (real return observations per coin).
+        """
+        cov, shrinkage = self.ledoit_wolf(min_obs)
+        if cov.empty:
+            raise ValueError("Not enough observations for a risk model.")
+        eigval, eigvec = np.linalg.eigh(cov.to_numpy())
+        order = np.argsort(eigval)[::-1]
+        eigval, eigvec = np.clip(eigval[order], 0, None), eigvec[:, order]
+        k = min(n_factors, len(eigval))
+        # Sign convention: each factor loads positively on average (market-like first factor)
+        signs = np.where(eigvec[:, :k].sum(axis=0) < 0, -1.0, 1.0)
+        B = eigvec[:, :k] * signs * np.sqrt(eigval[:k])
+        names = [f"PC{i + 1}" for i in range(k)]
+        total_var = np.diag(cov.to_numpy())
+        factor_var = (B ** 2).sum(axis=1)
+        idio_var = np.clip(total_var - factor_var, 0, None)
+        scale = np.sqrt(periods_per_year)
+        explained = pd.DataFrame({
+            "variance": eigval[:k],
+            "ratio": eigval[:k] / eigval.sum(),
+        }, index=names)
+        explained["cumulative"] = explained["ratio"].cumsum()
+        return {
+            "covariance": cov,
+            "shrinkage": shrinkage,
+            "explained_variance": explained,
+            "loadings": pd.DataFrame(B, index=cov.index, columns=names),
+            "risk": pd.DataFrame({
+                "total_vol": np.sqrt(total_var) * scale,
+                "factor_vol": np.sqrt(factor_var) * scale,
+                "idio_vol": np.sqrt(idio_var) * scale,
+                "idio_share": np.divide(idio_var, total_var, out=np.zeros_like(total_var), where=total_var > 0),
+            }, index=cov.index),
+            "observations": pd.Series(np.diag(self._stats()["pairs"])[self._active(min_obs)], index=cov.index, name="observations"),
+        }
+
+def portfolio_risk(model, weights, periods_per_year=PERIODS_PER_YEAR):
+    """
+    Annualised portfolio volatility split into factor and idiosyncratic parts from a
+    factor_model() result. weights: {coin: weight}; coins missing from the model are ignored.
+    """
+    w = pd.Series(weights, dtype=float).reindex(model["covariance"].index).fillna(0.0)
+    cov = model["covariance"].to_numpy()
+    B = model["loadings"].to_numpy()
+    total = float(w @ cov @ w)
+    exposures = B.T @ w.to_numpy()
+    factor = float(exposures @ exposures)
+    return {
+        "total_vol": np.sqrt(max(total, 0)) * np.sqrt(periods_per_year),
+        "factor_vol": np.sqrt(max(factor, 0)) * np.sqrt(periods_per_year),
+        "idio_vol": np.sqrt(max(total - factor, 0)) * np.sqrt(periods_per_year),
+        "factor_exposures": pd.Series(exposures, index=model["loadings"].columns),
+    }
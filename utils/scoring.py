@@ -0,0 +1,178 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+
+# === BATCH RESILIENCE SCORING ===
+# The resilience score is a weighted sum of factor fields, described here as data instead
+# of code so the weights can be tuned by editing data/scoring_weights.json:
+#   categories - in scoring order; each is a list of terms {"field", "weight"} plus optional
+#                "min" (the field counts as 1 when it is >= min, else 0) or "divide" (the
+#                field is divided first), and an optional category "multiplier";
+#   clip       - bounds applied to the total;
+#   forecast   - (threshold, label) pairs checked from the top, then "forecast_default".
+# The same evaluator runs on scalars (one coin, weighted_score in main.py) and on columns
+# (score_batch, the whole universe at once), and it applies the operations in the same order
+# as the original formulas, so both paths give bit-identical totals and breakdowns.
+
+WEIGHTS_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "scoring_weights.json")
+
+DEFAULT_WEIGHTS = {
+    "categories": [
+        {"name": "Utility/Use Case", "terms": [{"field": "utility", "weight": 1}]},
+        {"name": "Tokenomics & Fundamentals", "terms": [
+            {"field": "deflationary", "weight": 0.3},
+            {"field": "staking_apy", "weight": 0.2, "min": 50},
+            {"field": "team_locked", "weight": 0.3},
+            {"field": "fair_distribution", "weight": 0.2},
+        ]},
+        {"name": "Whale Concentration", "terms": [{"field": "whale_concentration", "weight": -1}]},
+        {"name": "Liquidity & Trading Volume", "terms": [
+            {"field": "liquidity_usd", "weight": 0.4, "min": 500000},
+            {"field": "liquidity_locked", "weight": 0.2},
+            {"field": "daily_volume", "weight": 0.2, "min": 100000},
+            {"field": "organic", "weight": 0.2},
+        ]},
+        {"name": "Social Sentiment & Community", "terms": [
+            {"field": "trending", "weight": 0.4},
+            {"field": "active_community", "weight": 0.4},
+            {"field": "meme_virality", "weight": 0.4, "divide": 5},
+            {"field": "growth", "weight": 0.4},
+            {"field": "hype_volatility", "weight": -0.4},
+        ]},
+        {"name": "Macroeconomic Tailwinds", "terms": [
+            {"field": "interest_rates_low", "weight": 0.34},
+            {"field": "favorable_inflation", "weight": 0.33},
+            {"field": "regulatory_news", "weight": 0.33},
+        ]},
+        {"name": "Transparency & Security", "multiplier": 2, "terms": [
+            {"field": "audited", "weight": 0.3},
+            {"field": "doxxed_team", "weight": 0.2},
+            {"field": "open_source", "weight": 0.2},
+            {"field": "verified_contract", "weight": 0.2},
+            {"field": "active_dev", "weight": 0.1},
+        ]},
+        {"name": "Red Flags", "multiplier": -2, "terms": [
+            {"field": "renounced_ownership", "weight": 1},
+            {"field": "honeypot", "weight": 1},
+            {"field": "rugpull_pattern", "weight": 1},
+        ]},
+    ],
+    "clip": [0, 10],
+    "forecast": [
+        [8, "High breakout potential with strong macro tailwinds."],
+        [6, "Moderate potential; monitor market conditions."],
+    ],
+    "forecast_default": "High risk; weak macro support.",
+}
+
+def validate_weights(weights):
+    """Raises ValueError if a weights dict is malformed; returns it otherwise."""
+    if not weights.get("categories"):
+        raise ValueError("Weights need at least one category.")
+    for cat in weights["categories"]:
+        if not cat.get("name") or not cat.get("terms"):
+            raise ValueError("Every category needs a name and terms.")
+        for term in cat["terms"]:
+            if "field" not in term or not isinstance(term.get("weight"), (int, float)):
+                raise ValueError(f"Category '{cat['name']}' has a term without a field or numeric weight.")
+            if "min" in term and "divide" in term:
+                raise ValueError(f"Term '{term['field']}' cannot have both min and divide.")
+    low, high = weights.get("clip", [0, 10])
+    if low > high:
+        raise ValueError("clip must be [low, high].")
+    thresholds = [t for t, _ in weights.get("forecast", [])]
+    if thresholds != sorted(thresholds, reverse=True):
+        raise ValueError("Forecast thresholds must be in descending order.")
+    return weights
+
+def load_weights(path=None):
+    """Scoring weights from JSON (the defaults when the file does not exist yet)."""
+    path = path or WEIGHTS_PATH
+    if not os.path.exists(path):
+        return json.loads(json.dumps(DEFAULT_WEIGHTS))
+    with open(path) as f:
+        return validate_weights(json.load(f))
+
+def save_weights(weights, path=None):
+    path = path or WEIGHTS_PATH
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(validate_weights(weights), f, indent=2)
+    os.replace(tmp, path)
+
+def factor_fields(weights=None):
+    """Every field the weights read, in first-use order."""
+    weights = weights or DEFAULT_WEIGHTS
+    return list(dict.fromkeys(t["field"] for cat in weights["categories"] for t in cat["terms"]))
+
+def factor_record(utility, tokenomics, whale_concentration, liquidity, social, macro, security, red_flags):
+    """Flattens weighted_score's eight arguments into one {field: value} row."""
+    return {"utility": utility, **tokenomics, "whale_concentration": whale_concentration,
+            **liquidity, **social, **macro, **security, **red_flags}
+
+def _category(values, cat):
+    # Left to right, exactly like w1 * x1 + w2 * x2 + ... written out; works on scalars and arrays
+    score = None
+    for term in cat["terms"]:
+        x = values[term["field"]]
+        if "min" in term:
+            x = x >= term["min"]
+        elif "divide" in term:
+            x = x / term["divide"]
+        part = term["weight"] * x
+        score = part if score is None else score + part
+    return score * cat["multiplier"] if "multiplier" in cat else score
+
+def _score(values, weights):
+    breakdown = {}
+    total = 0
+    for cat in weights["categories"]:
+        breakdown[cat["name"]] = _category(values, cat)
+        total = total + breakdown[cat["name"]]
+    return total, breakdown
+
+def score_record(record, weights=None):
+    """(total, breakdown dict) for one coin's {field: value} record."""
+    weights = weights or load_weights()
+    total, breakdown = _score(record, weights)
+    low, high = weights.get("clip", [0, 10])
+    return max(low, min(high, total)), breakdown
+
+def forecast_label(score, weights=None):
+    weights = weights or load_weights()
+    for threshold, label in weights.get("forecast", []):
+        if score >= threshold:
+            return label
+    return weights["forecast_default"]
+
+def score_batch(df, weights=None):
+    """
+    Scores every row of df (one column per factor field, see factor_fields()) at once.
+    Returns dict with total (array), breakdown (DataFrame, one column per category, df's
+    index) and forecast (array of forecast labels).
+    """
+    weights = weights or load_weights()
+    missing = [f for f in factor_fields(weights) if f not in df.columns]
+    if missing:
+        raise ValueError(f"Missing factor columns: {', '.join(missing)}")
+    # Bool and numeric columns are used as they are (numpy promotes them exactly like Python does)
+    columns = {}
+    for f in factor_fields(weights):
+        values = df[f].to_numpy()
+        columns[f] = values if values.dtype.kind in "biuf" else values.astype(float)
+    total, breakdown = _score(columns, weights)
+    if np.isnan(total).any():
+        raise ValueError("Factor columns contain missing values.")
+    low, high = weights.get("clip", [0, 10])
+    total = np.clip(total.astype(float), low, high)
+    # Bucket = how many forecast thresholds the total reaches (thresholds are descending)
+    forecast = weights.get("forecast", [])
+    thresholds = [t for t, _ in reversed(forecast)]
+    labels = np.array([weights["forecast_default"]] + [label for _, label in reversed(forecast)], dtype=object)
+    return {
+        "total": total,
+        "breakdown": pd.DataFrame(breakdown, index=df.index),
+        "forecast": labels[np.searchsorted(thresholds, total, side="right")],
+    }
@@ -0,0 +1,177 @@
+import glob
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+
+# === PERSISTED SCREENER MODEL & TREE SHAP ===
+# The screener's random forest is trained once per (risk level, feature data version) and
+# saved to data/models with the SHAP attributions of every coin it was trained on, so page
+# reruns only look up cached rows. When the feature store advances to a new version, the
+# previous model keeps serving while the new one trains in a background thread.
+# Attributions are path-dependent TreeSHAP values (what shap.TreeExplainer gives with
+# feature_perturbation="tree_path_dependent"): the value of a feature subset S is the tree's
+# prediction when features outside S follow the training cover at each split. The screener
+# has a handful of features, so all 2^M subsets are evaluated exactly in one top-down pass
+# per tree, vectorised over coins and subsets, instead of the generic permutation explainer.
+
+FEATURES = ["volatility", "sentiment", "correlation_btc", "recent_return"]
+MODEL_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "models")
+KEEP_VERSIONS = 3
+MAX_EXACT_FEATURES = 10
+
+def train_model(X, y, n_estimators=100, max_depth=6, random_state=42):
+    if len(np.unique(y)) < 2:
+        raise ValueError("Need both classes to train the screener model.")
+    clf = RandomForestClassifier(n_estimators=n_estimators, max_depth=max_depth, random_state=random_state)
+    return clf.fit(X, y)
+
+def _subset_values(tree, X, in_subset):
+    """
+    Expected tree output per (subset, row): rows follow their own feature values at
+    splits on features in the subset and the training cover elsewhere.
+    """
+    t = tree.tree_
+    counts = t.value[:, 0, :]
+    leaf_value = counts[:, -1] / counts.sum(axis=1)  # probability of the positive class
+    cover = t.weighted_n_node_samples
+    out = np.zeros((in_subset.shape[0], len(X)))
+    stack = [(0, np.ones_like(out))]  # depth-first, so only one path of weights is alive
+    while stack:
+        node, w = stack.pop()
+        left, right = t.children_left[node], t.children_right[node]
+        if left == -1:
+            out += w * leaf_value[node]
+            continue
+        f = t.feature[node]
+        goes_left = X[:, f] <= t.threshold[node]
+        known = in_subset[:, f][:, None]
+        stack.append((left, w * np.where(known, goes_left[None, :], cover[left] / cover[node])))
+        stack.append((right, w * np.where(known, ~goes_left[None, :], cover[right] / cover[node])))
+    return out
+
+def tree_shap(model, X):
+    """
+    Path-dependent TreeSHAP attributions for the positive-class probability of a fitted
+    RandomForestClassifier. Returns (values array rows x features, expected value); each
+    row sums with the expected value to the model's predicted probability.
+    """
+    X = np.asarray(X, dtype=np.float32)  # sklearn compares thresholds in float32
+    m = X.shape[1]
+    if m > MAX_EXACT_FEATURES:
+        raise ValueError(f"Exact subset enumeration supports up to {MAX_EXACT_FEATURES} features.")
+    subsets = (np.arange(2 ** m)[:, None] >> np.arange(m)) & 1
+    in_subset = subsets.astype(bool)
+    size = subsets.sum(axis=1)
+    fact = np.array([np.prod(np.arange(1, k + 1), dtype=float) for k in range(m + 1)])
+    # Shapley weights: +|S|-1 weight when i is in S (S = T + i), -|S| weight when it is not
+    with_i = fact[np.maximum(size - 1, 0)][:, None] * fact[m - size][:, None] / fact[m]
+    without_i = fact[size][:, None] * fact[np.maximum(m - size - 1, 0)][:, None] / fact[m]
+    coef = np.where(in_subset, with_i, -without_i)
+    values = np.zeros((2 ** m, len(X)))
+    for est in model.estimators_:
+        values += _subset_values(est, X, in_subset)
+    values /= len(model.estimators_)
+    return values.T @ coef, float(values[0, 0])
+
+class ScreenerModelStore:
+    """
+    Trained screener models and their per-coin attributions, in memory and on disk.
+    get() returns a bundle dict (model, features, key, expected_value, shap DataFrame
+    indexed by coin, probabilities) and whether it is the requested version.
+    """
+
+    def __init__(self, directory=None, max_workers=1):
+        self.directory = directory or MODEL_DIR
+        os.makedirs(self.directory, exist_ok=True)
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="screener-train")
+        self._bundles = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"screener_{key}.joblib")
+
+    def load(self, key):
+        with self._lock:
+            bundle = self._bundles.get(key)
+        if bundle is None and os.path.exists(self._path(key)):
+            bundle = joblib.load(self._path(key))
+            with self._lock:
+                self._bundles[key] = bundle
+        return bundle
+
+    def train(self, key, X, y):
+        """Fits, explains every training row, persists (atomic rename) and returns the bundle."""
+        model = train_model(X[FEATURES].to_numpy(), y)
+        values, expected = tree_shap(model, X[FEATURES].to_numpy())
+        bundle = {
+            "key": key,
+            "model": model,
+            "features": FEATURES,
+            "expected_value": expected,
+            "shap": pd.DataFrame(values, index=X.index, columns=FEATURES),
+            "probability": pd.Series(values.sum(axis=1) + expected, index=X.index),
+        }
+        tmp = self._path(key) + ".tmp"
+        joblib.dump(bundle, tmp)
+        os.replace(tmp, self._path(key))
+        with self._lock:
+            self._bundles[key] = bundle
+            self._pending.pop(key, None)
+        self._prune(key.split("_")[0])
+        return bundle
+
+    def _prune(self, prefix):
+        files = sorted(glob.glob(os.path.join(self.directory, f"screener_{prefix}_*.joblib")), key=os.path.getmtime)
+        for path in files[:-KEEP_VERSIONS]:
+            os.remove(path)
+            with self._lock:
+                self._bundles.pop(os.path.basename(path)[len("screener_"):-len(".joblib")], None)
+
+    def latest(self, prefix):
+        """Most recently saved bundle whose key starts with prefix (any data version)."""
+        files = sorted(glob.glob(os.path.join(self.directory, f"screener_{prefix}_*.joblib")), key=os.path.getmtime)
+        for path in reversed(files):
+            key = os.path.basename(path)[len("screener_"):-len(".joblib")]
+            try:
+                return self.load(key)
+            except Exception:
+                continue
+        return None
+
+    def get(self, key, X, y):
+        """
+        Bundle for key. If it does not exist yet but an older version for the same prefix
+        (text before the first '_') does, that one is returned while key trains in the
+        background; with nothing to fall back on, trains now. Returns (bundle, is_current).
+        """
+        bundle = self.load(key)
+        if bundle is not None:
+            return bundle, True
+        previous = self.latest(key.split("_")[0])
+        if previous is None:
+            return self.train(key, X, y), True
+        with self._lock:
+            if key not in self._pending:
+                future = self.pool.submit(self.train, key, X.copy(), np.asarray(y).copy())
+                self._pending[key] = future
+                # A failed job is forgotten so the next rerun tries again
+                future.add_done_callback(lambda f: f.exception() is not None and self._pending.pop(key, None))
+        return previous, False
+
+    def attributions(self, bundle, X):
+        """
+        SHAP rows for the coins in X (index = coin): cached rows where the bundle has them,
+        computed once and added to the in-memory bundle for coins it has not seen.
+        """
+        missing = X.index.difference(bundle["shap"].index)
+        if len(missing):
+            values, _ = tree_shap(bundle["model"], X.loc[missing, bundle["features"]].to_numpy())
+            extra = pd.DataFrame(values, index=missing, columns=bundle["features"])
+            with self._lock:
+                bundle["shap"] = pd.concat([bundle["shap"], extra])
+        return bundle["shap"].reindex(X.index)
@@ -0,0 +1,279 @@
+import os
+import time
+from collections import deque
+import numpy as np
+import pandas as pd
+
+# === EVENT-DRIVEN STREAMING BACKTESTS ===
+# For long intraday histories that do not fit the vectorized panels in utils/backtest.py.
+# Bars are streamed from CSV files in data/history through a generator in chunks, and the
+# strategy, open position and performance statistics live in small __slots__ objects that are
+# updated bar by bar. Memory use is bounded by the indicator windows, the equity-curve sample
+# size and the number of trades kept, never by the length of the history.
+# Path-dependent exits (stop-loss, take-profit, trailing stop) are checked against each bar's
+# high/low before the strategy sees its close.
+
+HISTORY_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "history")
+HISTORY_COLUMNS = ["timestamp", "open", "high", "low", "close", "volume"]
+SECONDS_PER_YEAR = 365 * 24 * 3600
+
+def history_path(coin_id, history_dir=None):
+    return os.path.join(history_dir or HISTORY_DIR, f"{coin_id}.csv")
+
+def list_history(history_dir=None):
+    """Coin ids with an on-disk history file."""
+    history_dir = history_dir or HISTORY_DIR
+    if not os.path.isdir(history_dir):
+        return []
+    return sorted(os.path.splitext(f)[0] for f in os.listdir(history_dir) if f.endswith(".csv"))
+
+def save_history(coin_id, bars, history_dir=None):
+    """
+    Appends bars to data/history/<coin_id>.csv, keeping timestamps strictly increasing.
+    bars: DataFrame with timestamp (or date) and close (or price); open/high/low default to
+    close and volume to 0 when missing. Returns the number of rows written.
+    """
+    path = history_path(coin_id, history_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    df = bars.rename(columns={"date": "timestamp", "price": "close"}).copy()
+    for col in ["open", "high", "low"]:
+        if col not in df:
+            df[col] = df["close"]
+    if "volume" not in df:
+        df["volume"] = 0.0
+    df = df[HISTORY_COLUMNS].sort_values("timestamp")
+    df["timestamp"] = pd.to_datetime(df["timestamp"])
+    if os.path.exists(path):
+        last = pd.read_csv(path, usecols=["timestamp"]).iloc[-1:]  # file is append-only and sorted
+        if not last.empty:
+            df = df[df["timestamp"] > pd.Timestamp(last["timestamp"].iloc[0])]
+        df.to_csv(path, mode="a", header=False, index=False)
+    else:
+        df.to_csv(path, index=False)
+    return len(df)
+
+def stream_bars(source, chunksize=100_000):
+    """
+    Yields (timestamp_seconds, open, high, low, close) tuples from a history CSV path or buffer,
+    reading `chunksize` rows at a time.
+    """
+    reader = pd.read_csv(source, usecols=["timestamp", "open", "high", "low", "close"], chunksize=chunksize)
+    for chunk in reader:
+        ts = pd.to_datetime(chunk["timestamp"]).to_numpy(dtype="datetime64[s]").astype(np.int64).tolist()
+        cols = [chunk[c].to_numpy(dtype=float).tolist() for c in ["open", "high", "low", "close"]]
+        yield from zip(ts, *cols)
+
+def frame_bars(df):
+    """Same tuples as stream_bars for an in-memory DataFrame (date/price columns are accepted)."""
+    df = df.rename(columns={"date": "timestamp", "price": "close"})
+    close = df["close"].to_numpy(dtype=float)
+    cols = [df[c].to_numpy(dtype=float) if c in df else close for c in ["open", "high", "low"]]
+    ts = pd.to_datetime(df["timestamp"]).to_numpy(dtype="datetime64[s]").astype(np.int64)
+    return zip(ts.tolist(), *[c.tolist() for c in cols], close.tolist())
+
+# --- Strategies: constant-memory indicators, one close at a time ---
+class RollingMean:
+    """Running mean over the last `window` values (None until the window is full)."""
+    __slots__ = ("window", "values", "total")
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque(maxlen=window)
+        self.total = 0.0
+
+    def update(self, x):
+        if len(self.values) == self.window:
+            self.total -= self.values[0]
+        self.values.append(x)
+        self.total += x
+        return self.total / self.window if len(self.values) == self.window else None
+
+class SmaCrossStrategy:
+    """Enters when the fast SMA crosses above the slow SMA, exits when it crosses below."""
+    __slots__ = ("fast", "slow", "above")
+
+    def __init__(self, fast=7, slow=21):
+        self.fast = RollingMean(fast)
+        self.slow = RollingMean(slow)
+        self.above = False
+
+    def on_close(self, close):
+        """Returns 1 (enter long), 0 (exit) or None (no signal)."""
+        f, s = self.fast.update(close), self.slow.update(close)
+        if f is None or s is None:
+            return None
+        above = f > s
+        if above == self.above:
+            return None
+        self.above = above
+        return 1 if above else 0
+
+class RsiStrategy:
+    """Enters when RSI (calc_rsi) drops below oversold, exits when it rises above overbought."""
+    __slots__ = ("up", "down", "prev", "overbought", "oversold")
+
+    def __init__(self, window=14, overbought=70, oversold=30):
+        self.up = RollingMean(window)
+        self.down = RollingMean(window)
+        self.prev = None
+        self.overbought = overbought
+        self.oversold = oversold
+
+    def on_close(self, close):
+        if self.prev is None:
+            self.prev = close
+            return None
+        delta = close - self.prev
+        self.prev = close
+        up, down = self.up.update(max(delta, 0.0)), self.down.update(max(-delta, 0.0))
+        if up is None:
+            return None
+        rsi = 100.0 if down == 0 else 100 - 100 / (1 + up / down)
+        if rsi > self.overbought:
+            return 0
+        if rsi < self.oversold:
+            return 1
+        return None
+
+# --- Engine state ---
+class Position:
+    __slots__ = ("units", "entry_price", "entry_ts", "entry_equity", "stop", "take", "peak")
+
+    def __init__(self, units, entry_price, entry_ts, entry_equity, stop, take):
+        self.units = units
+        self.entry_price = entry_price
+        self.entry_ts = entry_ts
+        self.entry_equity = entry_equity
+        self.stop = stop
+        self.take = take
+        self.peak = entry_price
+
+class RunningStats:
+    """Welford mean/variance of bar returns plus running peak and max drawdown."""
+    __slots__ = ("n", "mean", "m2", "peak", "max_drawdown")
+
+    def __init__(self, equity):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.peak = equity
+        self.max_drawdown = 0.0
+
+    def update(self, ret, equity):
+        self.n += 1
+        d = ret - self.mean
+        self.mean += d / self.n
+        self.m2 += d * (ret - self.mean)
+        if equity > self.peak:
+            self.peak = equity
+        elif 1 - equity / self.peak > self.max_drawdown:
+            self.max_drawdown = 1 - equity / self.peak
+
+class EquitySampler:
+    """Keeps at most max_points (timestamp, equity) samples by halving the resolution when full."""
+    __slots__ = ("max_points", "stride", "count", "points")
+
+    def __init__(self, max_points=2000):
+        self.max_points = max_points
+        self.stride = 1
+        self.count = 0
+        self.points = []
+
+    def add(self, ts, equity):
+        if self.count % self.stride == 0:
+            self.points.append((ts, equity))
+            if len(self.points) >= self.max_points:
+                self.points = self.points[::2]
+                self.stride *= 2
+        self.count += 1
+
+def run_streaming_backtest(bars, strategy, stop_loss=None, take_profit=None, trailing_stop=None, size=1.0,
+                           fee_bps=10.0, slippage_bps=5.0, initial_capital=1.0, max_points=2000, max_trades=1000):
+    """
+    Event-driven long-only backtest over an iterable of (timestamp_seconds, open, high, low, close).
+    Signals are filled at the bar close; stop_loss/take_profit/trailing_stop are fractions
+    (0.1 = 10%) checked against the next bars' low/high, filling at the stop level (or the
+    open if the bar gaps through it). A stop-loss is assumed to fill first if both are hit.
+    Returns a dict with 'metrics' (Series), 'equity' (sampled Series), 'trades' (last
+    max_trades trades) and throughput ('bars', 'seconds', 'bars_per_sec').
+    """
+    cost = (fee_bps + slippage_bps) / 1e4
+    cash = initial_capital
+    pos = None
+    equity = prev_equity = initial_capital
+    stats = RunningStats(initial_capital)
+    sampler = EquitySampler(max_points)
+    trades = deque(maxlen=max_trades)
+    n_trades = wins = exposed = 0
+    first_ts = last_ts = None
+    start = time.perf_counter()
+
+    def close_position(ts, price, reason):
+        nonlocal cash, pos, n_trades, wins
+        cash += pos.units * price * (1 - cost)
+        ret = cash / pos.entry_equity - 1
+        trades.append((pos.entry_ts, ts, pos.entry_price, price, ret, reason))
+        n_trades += 1
+        wins += ret > 0
+        pos = None
+
+    for ts, o, h, l, c in bars:
+        if first_ts is None:
+            first_ts = ts
+        last_ts = ts
+        if pos is not None:
+            trail = pos.peak * (1 - trailing_stop) if trailing_stop else None
+            stop = max(pos.stop or 0.0, trail or 0.0) or None
+            if stop is not None and l <= stop:
+                close_position(ts, min(o, stop), "trailing_stop" if trail is not None and stop == trail else "stop_loss")
+            elif pos.take is not None and h >= pos.take:
+                close_position(ts, max(o, pos.take), "take_profit")
+            elif h > pos.peak:
+                pos.peak = h
+        signal = strategy.on_close(c)
+        if signal == 1 and pos is None:
+            entry_equity = cash
+            units = cash * size * (1 - cost) / c
+            cash -= units * c + cash * size * cost
+            pos = Position(units, c, ts, entry_equity,
+                           c * (1 - stop_loss) if stop_loss else None,
+                           c * (1 + take_profit) if take_profit else None)
+        elif signal == 0 and pos is not None:
+            close_position(ts, c, "signal")
+        if pos is not None:
+            exposed += 1
+        equity = cash + (pos.units * c if pos is not None else 0.0)
+        stats.update(equity / prev_equity - 1, equity)
+        prev_equity = equity
+        sampler.add(ts, equity)
+
+    if pos is not None:
+        close_position(last_ts, c, "end")
+    elapsed = time.perf_counter() - start
+    n_bars = stats.n
+    years = max((last_ts or 0) - (first_ts or 0), 1) / SECONDS_PER_YEAR
+    bars_per_year = max(n_bars - 1, 1) / years
+    std = np.sqrt(stats.m2 / (stats.n - 1)) if stats.n > 1 else 0.0
+    final = equity / initial_capital
+    metrics = pd.Series({
+        "total_return": final - 1,
+        "cagr": final ** (1 / years) - 1 if n_bars > 1 else np.nan,
+        "sharpe": stats.mean / std * np.sqrt(bars_per_year) if std > 0 else np.nan,
+        "max_drawdown": stats.max_drawdown,
+        "win_rate": wins / n_trades if n_trades else np.nan,
+        "trades": n_trades,
+        "exposure": exposed / n_bars if n_bars else np.nan,
+    })
+    points = sampler.points + ([(last_ts, equity)] if sampler.points and sampler.points[-1][0] != last_ts else [])
+    equity_curve = pd.Series([p[1] for p in points], index=pd.to_datetime([p[0] for p in points], unit="s"), name="equity")
+    trades_df = pd.DataFrame(list(trades), columns=["entry_time", "exit_time", "entry_price", "exit_price", "return", "exit_reason"])
+    for col in ["entry_time", "exit_time"]:
+        trades_df[col] = pd.to_datetime(trades_df[col], unit="s")
+    return {
+        "metrics": metrics,
+        "equity": equity_curve,
+        "trades": trades_df,
+        "bars": n_bars,
+        "seconds": elapsed,
+        "bars_per_sec": n_bars / elapsed if elapsed > 0 else np.nan,
+    }
@@ -0,0 +1,193 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+
+# === SCENARIO STRESS TESTS ===
+# A scenario is a plain dict (stored in a JSON library, so it can be re-run in batch) that
+# turns into one return shock per coin:
+#   absolute   - explicit returns per coin, e.g. {"bitcoin": -0.3}, "default" for the rest;
+#   relative   - moves in units of each coin's own daily volatility (e.g. -3 sigma);
+#   beta       - shocks on driver coins are mapped to factor moves through the risk-model
+#                loadings and propagated to every coin, with optional multipliers
+#                ("meme coins take 2x their beta");
+#   historical - replays each coin's cumulative return over a date window, or over the
+#                worst window of a given length in the loaded history. Enough history is
+#                loaded to cover dated windows (history_days); one that is still not
+#                covered raises ValueError rather than replaying as a flat 0%.
+# All scenarios stack into a scenarios x coins shock matrix and all saved portfolios into a
+# portfolios x coins value matrix, so the whole P&L table is one matrix product.
+
+SCENARIO_TYPES = ["absolute", "relative", "beta", "historical"]
+LIBRARY_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "stress_scenarios.json")
+
+DEFAULT_SCENARIOS = [
+    {"name": "BTC -30%, memes 2x beta", "type": "beta", "drivers": {"bitcoin": -0.30}, "multipliers": {}, "default_multiplier": 1.0,
+     "meme_multiplier": 2.0},
+    {"name": "Everything -3 sigma (1 week)", "type": "relative", "sigmas": {}, "default": -3.0, "horizon": 7},
+    {"name": "ETH -25%", "type": "absolute", "shocks": {"ethereum": -0.25}, "default": 0.0},
+    {"name": "Worst week in history", "type": "historical", "worst_window": 7},
+]
+
+def validate_scenario(scenario):
+    """Raises ValueError if a scenario dict is malformed; returns it otherwise."""
+    if not scenario.get("name"):
+        raise ValueError("Scenario needs a name.")
+    kind = scenario.get("type")
+    if kind not in SCENARIO_TYPES:
+        raise ValueError(f"Unknown scenario type: {kind}")
+    required = {"absolute": ["shocks"], "relative": [], "beta": ["drivers"], "historical": []}[kind]
+    for key in required:
+        if key not in scenario:
+            raise ValueError(f"Scenario '{scenario['name']}' is missing '{key}'.")
+    if kind == "historical" and not (("start" in scenario and "end" in scenario) or "worst_window" in scenario):
+        raise ValueError(f"Scenario '{scenario['name']}' needs start/end dates or worst_window.")
+    return scenario
+
+def load_scenarios(path=None):
+    """Scenario library from JSON (the defaults when the file does not exist yet)."""
+    path = path or LIBRARY_PATH
+    if not os.path.exists(path):
+        return [dict(s) for s in DEFAULT_SCENARIOS]
+    with open(path) as f:
+        return [validate_scenario(s) for s in json.load(f)]
+
+def save_scenarios(scenarios, path=None):
+    path = path or LIBRARY_PATH
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump([validate_scenario(s) for s in scenarios], f, indent=2)
+    os.replace(tmp, path)  # atomic, so a concurrent reader never sees half a file
+
+def history_days(scenarios, days, today=None):
+    """Days of daily history to load so every dated historical scenario is covered (at least days)."""
+    starts = [pd.Timestamp(s["start"]) for s in scenarios if s.get("type") == "historical" and "start" in s]
+    if not starts:
+        return days
+    today = pd.Timestamp(today if today is not None else pd.Timestamp.now()).normalize()
+    return max(days, (today - min(starts)).days + 2)
+
+def _window_returns(prices, start, end):
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    # A window the panel does not cover would replay as a flat 0% for every coin
+    if prices.empty or start < prices.index[0].normalize() or end > prices.index[-1]:
+        first, last = (prices.index[0], prices.index[-1]) if not prices.empty else (None, None)
+        raise ValueError(f"Scenario window {start:%Y-%m-%d} to {end:%Y-%m-%d} is outside the loaded price history"
+                         + (f" ({first:%Y-%m-%d} to {last:%Y-%m-%d})." if first is not None else "."))
+    window = prices.loc[start:end]
+    if len(window) < 2:
+        return pd.Series(np.nan, index=prices.columns)
+    return window.ffill().iloc[-1] / window.bfill().iloc[0] - 1
+
+def worst_window(prices, length):
+    """(start, end) of the `length`-day window with the worst equal-weighted return."""
+    # The first bar has no return, so a window ending at position p starts at p - length >= 0
+    rets = prices.pct_change(fill_method=None).iloc[1:]
+    market = np.log1p(rets.mean(axis=1).fillna(0.0)).rolling(length).sum()
+    if market.dropna().empty:
+        raise ValueError("Not enough history for the worst-window scenario.")
+    end = market.idxmin()
+    start = prices.index[prices.index.get_loc(end) - length]
+    if start >= end:
+        raise ValueError("Worst window has no length.")
+    return start, end
+
+def _propagate(drivers, loadings, assets):
+    """Factor move implied by the driver shocks (least squares on their loadings), applied to every coin."""
+    known = [a for a in drivers if a in loadings.index]
+    out = pd.Series(0.0, index=assets)
+    if not known:
+        return out
+    B = loadings.reindex(assets).fillna(0.0).to_numpy()
+    f = np.linalg.lstsq(loadings.loc[known].to_numpy(), np.array([drivers[a] for a in known]), rcond=None)[0]
+    return pd.Series(B @ f, index=assets)
+
+def scenario_shocks(scenario, assets, prices=None, loadings=None, volatility=None, meme_coins=()):
+    """
+    Return shock per coin for one scenario.
+    prices: price panel (historical); loadings: coins x factors (beta); volatility: daily
+    volatility per coin (relative); meme_coins: coins that get 'meme_multiplier'.
+    """
+    validate_scenario(scenario)
+    kind = scenario["type"]
+    if kind == "absolute":
+        shocks = pd.Series(scenario.get("default", 0.0), index=assets, dtype=float)
+        for a, r in scenario["shocks"].items():
+            if a in shocks.index:
+                shocks[a] = r
+    elif kind == "relative":
+        if volatility is None:
+            raise ValueError("Relative scenarios need coin volatilities.")
+        sigmas = pd.Series(scenario.get("default", 0.0), index=assets, dtype=float)
+        for a, k in scenario.get("sigmas", {}).items():
+            if a in sigmas.index:
+                sigmas[a] = k
+        vol = volatility.reindex(assets).fillna(volatility.median())
+        shocks = sigmas * vol * np.sqrt(scenario.get("horizon", 1))
+    elif kind == "beta":
+        if loadings is None:
+            raise ValueError("Beta scenarios need factor loadings.")
+        shocks = _propagate(scenario["drivers"], loadings, assets)
+        mult = pd.Series(scenario.get("default_multiplier", 1.0), index=assets, dtype=float)
+        for a in meme_coins:
+            if a in mult.index:
+                mult[a] = scenario.get("meme_multiplier", 1.0)
+        for a, m in scenario.get("multipliers", {}).items():
+            if a in mult.index:
+                mult[a] = m
+        shocks = shocks * mult
+        for a, r in scenario["drivers"].items():  # drivers move exactly as specified
+            if a in shocks.index:
+                shocks[a] = r
+    else:
+        if prices is None:
+            raise ValueError("Historical scenarios need a price panel.")
+        if "worst_window" in scenario:
+            start, end = worst_window(prices, int(scenario["worst_window"]))
+        else:
+            start, end = scenario["start"], scenario["end"]
+        replay = _window_returns(prices, start, end).reindex(assets)
+        # Coins without prices in the window follow the others through the factor loadings
+        missing = replay.isna()
+        if missing.any() and loadings is not None and (~missing).any():
+            replay[missing] = _propagate(replay[~missing].to_dict(), loadings, assets)[missing]
+        shocks = replay.fillna(0.0)
+    return shocks.clip(lower=-1.0)
+
+def scenario_assets(held, scenarios):
+    """
+    Coins the stress inputs (price panel, risk model) must cover: the held coins plus every
+    beta scenario's drivers, which need loadings even when no portfolio holds them.
+    """
+    drivers = [a for s in scenarios if s.get("type") == "beta" for a in s.get("drivers", {})]
+    return tuple(sorted(set(held) | set(drivers)))
+
+def shock_matrix(scenarios, assets, **inputs):
+    """Scenarios x coins DataFrame of return shocks."""
+    rows = [scenario_shocks(s, assets, **inputs).to_numpy() for s in scenarios]
+    return pd.DataFrame(np.array(rows).reshape(len(scenarios), len(assets)), index=[s["name"] for s in scenarios], columns=assets)
+
+def exposure_matrix(holdings, prices):
+    """
+    Portfolios x coins position values from PortfolioStore.holdings() (portfolio, asset,
+    amount) and the latest available price per coin.
+    """
+    units = holdings.pivot_table(index="portfolio", columns="asset", values="amount", aggfunc="sum", fill_value=0.0)
+    last = prices.ffill().iloc[-1].reindex(units.columns).fillna(0.0)
+    return units * last
+
+def run_stress_tests(exposures, scenarios, **inputs):
+    """
+    P&L of every portfolio under every scenario in one matrix product.
+    Returns a dict with 'pnl' and 'pnl_pct' (portfolios x scenarios), 'shocks'
+    (scenarios x coins) and 'value' (portfolio values).
+    """
+    assets = list(exposures.columns)
+    shocks = shock_matrix(scenarios, assets, **inputs)
+    V = exposures.to_numpy(dtype=float)
+    pnl = pd.DataFrame(V @ shocks.to_numpy().T, index=exposures.index, columns=shocks.index)
+    value = exposures.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct = pnl.div(value.where(value > 0), axis=0)
+    return {"pnl": pnl, "pnl_pct": pct, "shocks": shocks, "value": value}
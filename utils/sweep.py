@@ -0,0 +1,174 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from utils.backtest import PERIODS_PER_YEAR
+
+# === BROADCASTED PARAMETER SWEEPS ===
+# Evaluates a whole strategy parameter grid for one price series in a single array
+# computation: indicators are computed once per window (axis 0), then signals, positions,
+# returns and metrics are broadcast across the parameter axes with time as the last axis.
+# Same conventions as utils/backtest.py (enter at the close, fees on turnover).
+# When the grid would not fit in the memory budget, the first parameter axis is split into
+# chunks that run in a process pool.
+
+METRICS = ["total_return", "cagr", "sharpe", "max_drawdown", "trades", "exposure"]
+DEFAULT_MAX_BYTES = 256 * 1024 ** 2
+
+def rolling_means(values, windows):
+    """SMA of a 1-D array for several windows at once -> (len(windows), T), NaN during warm-up."""
+    windows = np.asarray(windows)
+    cs = np.concatenate([[0.0], np.cumsum(values)])
+    t = np.arange(1, len(values) + 1)
+    start = np.maximum(t[None, :] - windows[:, None], 0)
+    sums = cs[t][None, :] - cs[start]
+    out = sums / windows[:, None]
+    out[t[None, :] < windows[:, None]] = np.nan
+    return out
+
+def rsi_matrix(values, windows):
+    """RSI (as calc_rsi in main.py) for several windows at once -> (len(windows), T)."""
+    delta = np.concatenate([[np.nan], np.diff(values)])
+    up = np.clip(delta, 0, None)
+    down = -np.clip(delta, None, 0)
+    # rolling means over the diff series (first value is NaN, so shift the warm-up by one)
+    ma_up = rolling_means(np.nan_to_num(up), windows)
+    ma_down = rolling_means(np.nan_to_num(down), windows)
+    t = np.arange(len(values))
+    warm = t[None, :] < np.asarray(windows)[:, None]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = 100 - 100 / (1 + ma_up / ma_down)
+    rsi[warm] = np.nan
+    return rsi
+
+def ffill_last_axis(marks):
+    """Forward-fills NaNs along the last axis (vectorized), then fills leading NaNs with 0."""
+    T = marks.shape[-1]
+    valid = ~np.isnan(marks)
+    idx = np.where(valid, np.arange(T), 0)
+    np.maximum.accumulate(idx, axis=-1, out=idx)
+    filled = np.take_along_axis(marks, idx, axis=-1)
+    return np.nan_to_num(filled, nan=0.0)
+
+def grid_backtest(positions, returns, cost, size=1.0, periods_per_year=PERIODS_PER_YEAR):
+    """
+    Backtests a positions array of shape (..., T) against a returns vector (T,).
+    size scales positions (scalar or a (T,) array such as volatility_target_size).
+    Returns {metric: array of shape (...)}.
+    """
+    positions = positions * size
+    held = np.zeros_like(positions)
+    held[..., 1:] = positions[..., :-1]
+    turnover = np.abs(np.diff(positions, axis=-1, prepend=0.0))
+    strat = held * returns - turnover * cost
+    log_eq = np.cumsum(np.log1p(strat), axis=-1)
+    final = np.exp(log_eq[..., -1])
+    years = max(positions.shape[-1] - 1, 1) / periods_per_year
+    std = strat.std(axis=-1, ddof=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = np.where(std > 0, strat.mean(axis=-1) / std * np.sqrt(periods_per_year), np.nan)
+    drawdown = 1 - np.exp(log_eq - np.maximum(np.maximum.accumulate(log_eq, axis=-1), 0.0))
+    entries = ((positions != 0) & (held == 0)).sum(axis=-1)
+    return {
+        "total_return": final - 1,
+        "cagr": final ** (1 / years) - 1,
+        "sharpe": sharpe,
+        "max_drawdown": drawdown.max(axis=-1),
+        "trades": entries,
+        "exposure": (positions != 0).mean(axis=-1),
+    }
+
+def _size_array(size, prices):
+    """Scalar size as is; a per-bar Series/DataFrame (volatility_target_size) aligned to prices as a (T,) array."""
+    if np.isscalar(size):
+        return float(size)
+    if isinstance(size, (pd.Series, pd.DataFrame)) and isinstance(prices, (pd.Series, pd.DataFrame)):
+        size = size.reindex(prices.index)
+    size = np.nan_to_num(np.asarray(size, dtype=float).reshape(-1))
+    if len(size) != len(prices):
+        raise ValueError("size must be a scalar or have one value per price bar.")
+    return size
+
+def _returns(values):
+    return np.concatenate([[0.0], values[1:] / values[:-1] - 1])
+
+def _sma_chunk(values, fast, slow, cost, size, periods_per_year):
+    sma = rolling_means(values, np.concatenate([fast, slow]))
+    sma_fast, sma_slow = sma[:len(fast)], sma[len(fast):]
+    positions = (sma_fast[:, None, :] > sma_slow[None, :, :]).astype(float)
+    res = grid_backtest(positions, _returns(values), cost, size, periods_per_year)
+    invalid = fast[:, None] >= slow[None, :]
+    for k in res:
+        res[k] = np.where(invalid, np.nan, res[k].astype(float))
+    return res
+
+def _rsi_chunk(values, windows, overbought, oversold, cost, size, periods_per_year):
+    rsi = rsi_matrix(values, windows)[:, None, None, :]
+    entries = rsi < np.asarray(oversold)[None, None, :, None]
+    exits = rsi > np.asarray(overbought)[None, :, None, None]
+    marks = np.where(exits, 0.0, np.where(entries, 1.0, np.nan))
+    positions = ffill_last_axis(marks)
+    return grid_backtest(positions, _returns(values), cost, size, periods_per_year)
+
+def _run_chunked(chunk_fn, first_axis, other_args, bytes_per_item, max_bytes, max_workers):
+    """Runs chunk_fn over slices of the first parameter axis, in-process or in a process pool."""
+    per_chunk = max(1, int(max_bytes // max(bytes_per_item, 1)))
+    if per_chunk >= len(first_axis):
+        return chunk_fn(first_axis, *other_args)
+    chunks = [first_axis[i:i + per_chunk] for i in range(0, len(first_axis), per_chunk)]
+    workers = max_workers or min(len(chunks), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        parts = list(pool.map(chunk_fn, chunks, *[[a] * len(chunks) for a in other_args]))
+    return {k: np.concatenate([p[k] for p in parts], axis=0) for k in parts[0]}
+
+def _sma_first_axis(fast, values, slow, cost, size, periods_per_year):
+    return _sma_chunk(values, fast, slow, cost, size, periods_per_year)
+
+def _rsi_first_axis(windows, values, overbought, oversold, cost, size, periods_per_year):
+    return _rsi_chunk(values, windows, overbought, oversold, cost, size, periods_per_year)
+
+def _to_frame(res, axes):
+    index = pd.MultiIndex.from_product(list(axes.values()), names=list(axes.keys()))
+    df = pd.DataFrame({k: np.asarray(v, dtype=float).ravel() for k, v in res.items()}, index=index)
+    return df.dropna(how="all").reset_index()
+
+def sweep_sma(prices, fast_windows, slow_windows, fee_bps=10.0, slippage_bps=5.0, size=1.0,
+              periods_per_year=PERIODS_PER_YEAR, max_bytes=DEFAULT_MAX_BYTES, max_workers=None):
+    """
+    SMA crossover for every (fast, slow) pair at once. Pairs with fast >= slow are skipped.
+    Returns a DataFrame with columns fast, slow and METRICS.
+    """
+    values = np.asarray(prices, dtype=float)
+    fast = np.asarray(list(fast_windows), dtype=int)
+    slow = np.asarray(list(slow_windows), dtype=int)
+    cost = (fee_bps + slippage_bps) / 1e4
+    # ~6 float arrays of (slow, T) live at once per fast window
+    bytes_per_fast = 6 * 8 * len(slow) * len(values)
+    res = _run_chunked(_sma_first_axis, fast, (values, slow, cost, _size_array(size, prices), periods_per_year), bytes_per_fast, max_bytes, max_workers)
+    return _to_frame(res, {"fast": fast, "slow": slow})
+
+def sweep_rsi(prices, windows, overbought_levels, oversold_levels, fee_bps=10.0, slippage_bps=5.0, size=1.0,
+              periods_per_year=PERIODS_PER_YEAR, max_bytes=DEFAULT_MAX_BYTES, max_workers=None):
+    """
+    RSI threshold strategy for every (window, overbought, oversold) combination at once.
+    Returns a DataFrame with columns window, overbought, oversold and METRICS.
+    """
+    values = np.asarray(prices, dtype=float)
+    windows = np.asarray(list(windows), dtype=int)
+    overbought = np.asarray(list(overbought_levels), dtype=float)
+    oversold = np.asarray(list(oversold_levels), dtype=float)
+    cost = (fee_bps + slippage_bps) / 1e4
+    bytes_per_window = 8 * 8 * len(overbought) * len(oversold) * len(values)
+    res = _run_chunked(_rsi_first_axis, windows, (values, overbought, oversold, cost, _size_array(size, prices), periods_per_year),
+                       bytes_per_window, max_bytes, max_workers)
+    return _to_frame(res, {"window": windows, "overbought": overbought, "oversold": oversold})
+
+def heatmap(results, x, y, metric="sharpe", agg="max"):
+    """Pivot of a sweep result: rows = y, columns = x, values = metric (aggregated over other params)."""
+    return results.pivot_table(index=y, columns=x, values=metric, aggfunc=agg)
+
+def top_k(results, metric="sharpe", k=10, ascending=None):
+    """Best k parameter sets by metric (max_drawdown is ranked ascending by default)."""
+    if ascending is None:
+        ascending = metric == "max_drawdown"
+    return results.dropna(subset=[metric]).sort_values(metric, ascending=ascending).head(k).reset_index(drop=True)
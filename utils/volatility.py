@@ -0,0 +1,152 @@
+import numpy as np
+import pandas as pd
+
+# === HISTORICAL VOLATILITY ESTIMATORS ===
+# Every estimator works on whole panels (index = bar timestamp, columns = coins), so the
+# full universe is estimated in one vectorized pass. Results are annualised with the
+# bar frequency inferred from the index (crypto trades 365 days a year).
+
+ESTIMATORS = ["close_to_close", "ewma", "parkinson", "garman_klass", "yang_zhang"]
+ESTIMATOR_LABELS = {
+    "close_to_close": "Close-to-Close",
+    "ewma": "EWMA (RiskMetrics)",
+    "parkinson": "Parkinson (High-Low)",
+    "garman_klass": "Garman-Klass",
+    "yang_zhang": "Yang-Zhang",
+}
+DEFAULT_WINDOWS_DAYS = [7, 14, 30, 60, 90]
+MIN_WINDOW_BARS = 7  # fewer bars than this is noise, not a volatility estimate
+INTRADAY_OHLC_DAYS = 30  # longest CoinGecko OHLC request that still returns 4-hour candles
+
+def ohlc_panels(ohlc_dict):
+    """
+    Given {coin: DataFrame[date, open, high, low, close]}, returns
+    {'open': panel, 'high': panel, 'low': panel, 'close': panel} aligned on date.
+    """
+    panels = {}
+    for field in ["open", "high", "low", "close"]:
+        panels[field] = pd.DataFrame({c: df.set_index("date")[field] for c, df in ohlc_dict.items()}).sort_index()
+    return panels
+
+def close_only_panels(price_df):
+    """Panels for close-only data (fetch_coin_history); range-based estimators come out as NaN."""
+    nan = pd.DataFrame(np.nan, index=price_df.index, columns=price_df.columns)
+    return {"open": nan, "high": nan, "low": nan, "close": price_df}
+
+def bar_days(index):
+    """Median bar length in days for a DatetimeIndex (defaults to daily bars)."""
+    if len(index) < 2:
+        return 1.0
+    spacing = pd.Series(index).diff().dropna().median()
+    return max(spacing / pd.Timedelta(days=1), 1e-6)
+
+def window_in_bars(days, index):
+    return max(2, int(round(days / bar_days(index))))
+
+def _annualise(variance, index):
+    return np.sqrt(variance.clip(lower=0) * (365.0 / bar_days(index)))
+
+def _window_sums(df, window, power=1):
+    """
+    Rolling sum of df**power over `window` rows for all columns at once (cumulative-sum trick).
+    Windows containing a missing value are NaN, matching pandas rolling(window) defaults.
+    """
+    values = df.to_numpy(dtype=float)
+    valid = np.isfinite(values)
+    filled = np.where(valid, values, 0.0) ** power
+    zeros = np.zeros((1, values.shape[1]))
+    cs = np.vstack([zeros, np.cumsum(filled, axis=0)])
+    cnt = np.vstack([zeros, np.cumsum(valid, axis=0)])
+    sums = np.full(values.shape, np.nan)
+    if window <= len(values):
+        full = (cnt[window:] - cnt[:-window]) == window
+        sums[window - 1:] = np.where(full, cs[window:] - cs[:-window], np.nan)
+    return sums
+
+def rolling_mean(df, window):
+    return pd.DataFrame(_window_sums(df, window) / window, index=df.index, columns=df.columns)
+
+def rolling_var(df, window):
+    """Sample variance (ddof=1) over a rolling window, vectorized across columns."""
+    s1 = _window_sums(df, window)
+    s2 = _window_sums(df, window, power=2)
+    var = (s2 - s1 ** 2 / window) / (window - 1)
+    return pd.DataFrame(np.maximum(var, 0.0), index=df.index, columns=df.columns)
+
+def log_terms(panels):
+    """
+    Log-price building blocks shared by all estimators, computed once per panel:
+    close-to-close returns, squared high/low and close/open ranges, overnight gaps
+    and the Rogers-Satchell term.
+    """
+    close = panels["close"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        o, h, l, c = (np.log(panels[f].reindex_like(close).to_numpy(dtype=float)) for f in ["open", "high", "low", "close"])
+    prev_c = np.vstack([np.full((1, c.shape[1]), np.nan), c[:-1]])
+    wrap = lambda a: pd.DataFrame(a, index=close.index, columns=close.columns)
+    return {
+        "ret": wrap(c - prev_c),
+        "hl2": wrap((h - l) ** 2),
+        "co": wrap(c - o),
+        "overnight": wrap(o - prev_c),
+        "rs": wrap((h - c) * (h - o) + (l - c) * (l - o)),
+    }
+
+def close_to_close(terms, window):
+    return rolling_var(terms["ret"], window)
+
+def ewma(terms, window, lam=0.94):
+    # The decay is the RiskMetrics lambda; window only sets the warm-up period
+    return (terms["ret"] ** 2).ewm(alpha=1 - lam, min_periods=window).mean()
+
+def parkinson(terms, window):
+    return rolling_mean(terms["hl2"], window) / (4 * np.log(2))
+
+def garman_klass(terms, window):
+    return rolling_mean(0.5 * terms["hl2"] - (2 * np.log(2) - 1) * terms["co"] ** 2, window)
+
+def yang_zhang(terms, window):
+    k = 0.34 / (1.34 + (window + 1) / (window - 1))
+    return (rolling_var(terms["overnight"], window)
+            + k * rolling_var(terms["co"], window)
+            + (1 - k) * rolling_mean(terms["rs"], window))
+
+_VARIANCE_FNS = {
+    "close_to_close": close_to_close,
+    "ewma": ewma,
+    "parkinson": parkinson,
+    "garman_klass": garman_klass,
+    "yang_zhang": yang_zhang,
+}
+
+def rolling_volatility_panel(panels, window_days=30, estimator="close_to_close", terms=None):
+    """Annualised rolling volatility for every coin in the panel (DataFrame, same shape as close)."""
+    index = panels["close"].index
+    terms = terms if terms is not None else log_terms(panels)
+    variance = _VARIANCE_FNS[estimator](terms, window_in_bars(window_days, index))
+    return _annualise(variance, index)
+
+def volatility_term_structure(panels, windows_days=None, estimators=None, min_bars=MIN_WINDOW_BARS):
+    """
+    Latest annualised volatility for every (estimator, window) pair and every coin.
+    Windows that span fewer than min_bars candles (e.g. 7 days of 4-day candles) or more
+    than the history are left out.
+    Returns a DataFrame indexed by (estimator, window_days) with one column per coin.
+    """
+    windows_days = windows_days or DEFAULT_WINDOWS_DAYS
+    estimators = estimators or ESTIMATORS
+    n_bars = len(panels["close"])
+    terms = log_terms(panels)
+    rows = {}
+    for est in estimators:
+        for w in windows_days:
+            bars = w / bar_days(panels["close"].index)
+            if round(bars) < min_bars or window_in_bars(w, panels["close"].index) > n_bars - 1:
+                continue
+            vol = rolling_volatility_panel(panels, w, est, terms)
+            rows[(est, w)] = vol.ffill().iloc[-1] if not vol.empty else np.nan
+    if not rows:
+        return pd.DataFrame(columns=panels["close"].columns)
+    out = pd.DataFrame(rows).T
+    out.index.names = ["estimator", "window_days"]
+    return out
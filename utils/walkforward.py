@@ -0,0 +1,141 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+from utils.backtest import run_backtest, sma_crossover_positions, rsi_threshold_positions
+from utils.sweep import sweep_sma, sweep_rsi, top_k
+
+# === WALK-FORWARD VALIDATION ===
+# History is split into rolling train/test folds. On every fold the strategy parameters are
+# chosen by a grid sweep on the train window only, then traded on the following test window.
+# (coin, fold) tasks run in a process pool; the price panel is placed once in shared memory
+# and workers attach to it by name instead of receiving a pickled copy per task.
+# The test-window positions of all folds are stitched and run through the backtesting
+# engine, giving one out-of-sample equity curve per coin.
+
+STRATEGIES = {
+    "sma": {
+        "sweep": sweep_sma,
+        "positions": sma_crossover_positions,
+        "params": ["fast", "slow"],
+        "grid": {"fast": range(3, 31), "slow": range(10, 91)},
+    },
+    "rsi": {
+        "sweep": sweep_rsi,
+        "positions": rsi_threshold_positions,
+        "params": ["window", "overbought", "oversold"],
+        "grid": {"window": range(7, 31), "overbought": range(60, 91, 5), "oversold": range(10, 41, 5)},
+    },
+}
+
+def walk_forward_folds(n_bars, train_bars, test_bars, step=None, anchored=False):
+    """
+    Rolling (or anchored, expanding) folds over n_bars as a list of
+    (train_start, train_end, test_start, test_end) row positions (end exclusive).
+    Test windows follow their train window directly and do not overlap.
+    """
+    step = step or test_bars
+    folds = []
+    start = 0
+    while start + train_bars + test_bars <= n_bars:
+        train_start = 0 if anchored else start
+        train_end = start + train_bars
+        folds.append((train_start, train_end, train_end, train_end + test_bars))
+        start += step
+    return folds
+
+def _attach(shm_name, shape):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    return shm, np.ndarray(shape, dtype=float, buffer=shm.buf)
+
+def _fold_task(shm_name, shape, col, fold, strategy, grid, metric, fee_bps, slippage_bps):
+    """
+    Optimises one coin on one train window and returns its test-window positions.
+    Runs in a worker process; reads prices from the shared panel.
+    """
+    shm, panel = _attach(shm_name, shape)
+    try:
+        values = panel[:fold[3], col].copy()
+    finally:
+        shm.close()
+    train = values[fold[0]:fold[1]]
+    if np.isnan(values[fold[0]:]).any():
+        # Coin not listed (or gaps) in this fold: stay flat
+        return col, fold, None, np.nan, np.zeros(fold[3] - fold[2])
+    spec = STRATEGIES[strategy]
+    results = spec["sweep"](train, *[grid[p] for p in spec["params"]], fee_bps=fee_bps, slippage_bps=slippage_bps)
+    best = top_k(results, metric, 1)
+    if best.empty:
+        return col, fold, None, np.nan, np.zeros(fold[3] - fold[2])
+    params = {p: best[p].iloc[0].item() for p in spec["params"]}
+    # Indicators see everything up to the end of the test window, so warm-up uses train bars
+    positions = spec["positions"](pd.Series(values), **params).iloc[:, 0].to_numpy()
+    return col, fold, params, float(best[metric].iloc[0]), positions[fold[2]:fold[3]]
+
+def run_walk_forward(prices, strategy="sma", train_bars=60, test_bars=15, step=None, anchored=False,
+                     grid=None, metric="sharpe", fee_bps=10.0, slippage_bps=5.0, max_workers=None):
+    """
+    Walk-forward validation for every coin in a price panel (index = date, columns = coins).
+    grid: {param: values} overriding STRATEGIES[strategy]["grid"].
+    max_workers: process pool size (0 runs the tasks in this process).
+    Returns a dict with
+      'folds': one row per (coin, fold) with dates, chosen parameters, in-sample and OOS scores
+      'returns', 'equity', 'positions', 'trades', 'metrics': run_backtest output on the
+      stitched out-of-sample positions (test windows only)
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown strategy: {strategy}")
+    prices = prices.to_frame() if isinstance(prices, pd.Series) else prices
+    prices = prices.astype(float)
+    grid = {**STRATEGIES[strategy]["grid"], **(grid or {})}
+    grid = {k: list(v) for k, v in grid.items()}
+    folds = walk_forward_folds(len(prices), train_bars, test_bars, step, anchored)
+    if not folds:
+        raise ValueError("Not enough history for one train/test fold.")
+
+    values = np.ascontiguousarray(prices.to_numpy(dtype=float))
+    shm = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+    try:
+        np.ndarray(values.shape, dtype=float, buffer=shm.buf)[:] = values
+        tasks = [(shm.name, values.shape, col, fold, strategy, grid, metric, fee_bps, slippage_bps)
+                 for col in range(values.shape[1]) for fold in folds]
+        if max_workers == 0:
+            outputs = [_fold_task(*t) for t in tasks]
+        else:
+            workers = max_workers or min(len(tasks), os.cpu_count() or 1)
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                outputs = list(pool.map(_fold_task, *zip(*tasks)))
+    finally:
+        shm.close()
+        shm.unlink()
+
+    # Stitch the test windows; a later fold overwrites overlaps, gaps (step > test_bars) stay flat
+    oos_prices = prices.iloc[folds[0][2]:folds[-1][3]]
+    oos_positions = pd.DataFrame(0.0, index=oos_prices.index, columns=prices.columns)
+    fold_rows = []
+    for col, fold, params, in_sample, positions in outputs:
+        window = prices.index[fold[2]:fold[3]]
+        oos_positions.loc[window, prices.columns[col]] = positions
+        fold_rows.append({
+            "asset": prices.columns[col],
+            "fold": folds.index(fold) + 1,
+            "train_start": prices.index[fold[0]],
+            "train_end": prices.index[fold[1] - 1],
+            "test_start": window[0],
+            "test_end": window[-1],
+            **(params or {}),
+            f"in_sample_{metric}": in_sample,
+        })
+    result = run_backtest(oos_prices, oos_positions, fee_bps=fee_bps, slippage_bps=slippage_bps)
+    folds_df = pd.DataFrame(fold_rows)
+    for p in STRATEGIES[strategy]["params"]:
+        # Flat folds leave gaps, which would otherwise turn integer windows into floats
+        if p in folds_df and (folds_df[p].dropna() % 1 == 0).all():
+            folds_df[p] = folds_df[p].astype("Int64")
+    log_growth = np.log1p(result["returns"])
+    folds_df["oos_return"] = [
+        np.expm1(log_growth.loc[r["test_start"]:r["test_end"], r["asset"]].sum()) for r in fold_rows
+    ]
+    result["folds"] = folds_df
+    return result